@@ -0,0 +1,143 @@
+'''
+Benchmark cases for rockpile
+=================================
+
+Every case is timed, its SQL queries are counted and its peak memory is measured as
+the growth of the resident set size (RSS), which includes the memory allocated by C
+libraries such as libxml2. A case fails when it runs more queries or uses more memory
+than its budget, so regressions break the run.
+
+Parsing cases run in a new Python process each, so their peak only depends on the
+parsed file. Database cases share the in-memory database and run in the benchmark
+process, the peak of the process is reset before each one (Linux only, the memory of
+other platforms is not measured).
+
+'''
+
+import gc
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from io import BytesIO
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from benchmarks.generators import create_project, generate_strings, write_strings_xml
+from benchmarks.memory import max_rss, reset_max_rss
+from rockpile import models
+from rockpile.search import search_strings
+from rockpile.writers import write_android_strings, write_mo, write_po
+
+
+Result = namedtuple('Result', ['name', 'size', 'seconds', 'peak_memory', 'queries', 'max_queries', 'max_memory'])
+
+# Directory of the benchmarks package, the parsing processes run there
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Peak memory of parsing a strings.xml file of any size in streaming mode
+STREAMING_MAX_MEMORY = 32 * 1024 * 1024
+
+
+def bulk_batches(num_rows, num_fields=5):
+    """
+    Returns the number of INSERT statements of a bulk_create on the current database
+    """
+
+    batch_size = connection.ops.bulk_batch_size([None] * num_fields, [None] * num_rows) or num_rows
+    return int(math.ceil(float(num_rows) / max(batch_size, 1)))
+
+
+def measure(name, size, func, max_queries=None, max_memory=None):
+    """
+    Runs ``func`` in this process and returns its ``Result``
+    """
+
+    gc.collect()
+    reset = reset_max_rss()
+    start_rss = max_rss()
+
+    with CaptureQueriesContext(connection) as queries:
+        start = time.time()
+        func()
+        seconds = time.time() - start
+
+    peak_memory = max_rss() - start_rss if reset and start_rss is not None else None
+    return Result(name, size, seconds, peak_memory, len(queries), max_queries, max_memory)
+
+
+def measure_parsing(name, size, path, streaming, max_memory=None):
+    """
+    Parses a ``strings.xml`` file in a new process and returns its ``Result``, see
+    ``benchmarks.parsing``
+    """
+
+    output = subprocess.check_output([sys.executable, '-m', 'benchmarks.parsing', path,
+                                      'streaming' if streaming else 'tree'], cwd=ROOT_DIR)
+    measured = json.loads(output.decode('utf-8'))
+    return Result(name, size, measured['seconds'], measured['peak_memory'], 0, 0, max_memory)
+
+
+def bench_android_parsing(sizes):
+    """
+    Parses synthetic ``strings.xml`` files into a dict and with the streaming mode,
+    whose memory does not depend on the size of the file
+    """
+
+    for size in sizes:
+        with tempfile.NamedTemporaryFile(suffix='.xml') as file_obj:
+            write_strings_xml(file_obj, size)
+            file_obj.flush()
+
+            yield measure_parsing('AndroidStrings()', size, file_obj.name, False)
+            yield measure_parsing('AndroidStrings.iter_strings()', size, file_obj.name, True, STREAMING_MAX_MEMORY)
+
+
+def bench_project(num_locales, num_strings):
+    """
+    Imports, queries and exports a project of ``num_locales`` x ``num_strings`` strings
+    """
+
+    project = create_project(num_locales, num_strings)
+    translation = models.Translation.objects.filter(project=project).first()
+    manager = models.TranslatedString.objects
+
+    # Imports a new locale: the diff, three bulk inserts (the last one to the revision log),
+    # the removal of the new strings from the work queue and a few bookkeeping queries
+    new_translation = models.Translation.objects.create(project=project, language='xx')
+    strings = generate_strings(num_strings)
+    yield measure('import_strings()', num_strings, lambda: new_translation.import_strings(strings),
+                  9 + 2 * bulk_batches(num_strings) + bulk_batches(num_strings, 4) + int(math.ceil(num_strings / 300.0)))
+
+    changed = generate_strings(num_strings, prefix='changed')
+    yield measure('import_strings() (changes)', num_strings, lambda: new_translation.import_strings(changed),
+                  8 + int(math.ceil(num_strings / 300.0)) + bulk_batches(num_strings, 4))
+
+    # Copies the strings of a locale with INSERT ... SELECT, the queries do not depend on the size
+    yield measure('Translation.clone()', num_strings, lambda: translation.clone('yy', translators=True), 10)
+
+    for method in ('strings', 'validated', 'not_validated'):
+        yield measure('TranslatedString.objects.%s()' % method, num_strings,
+                      lambda: list(getattr(manager, method)(translation)), 1)
+
+    yield measure('SourceString.objects.untranslated()', num_strings,
+                  lambda: list(models.SourceString.objects.untranslated(translation)), 1)
+
+    total_strings = num_locales * num_strings
+    yield measure('MemoryTrigram.objects.matches()', total_strings,
+                  lambda: models.MemoryTrigram.objects.matches(translation.language, 'key_%d' % (num_strings // 2)), 2)
+
+    yield measure('search_strings()', total_strings,
+                  lambda: search_strings(str(num_strings // 2), project=project), 2)
+    yield measure('percentage_completed (%d locales)' % num_locales, total_strings,
+                  lambda: [t.percentage_completed for t in models.Translation.objects.filter(project=project)], 1)
+    yield measure('Translation.objects.with_completion()', total_strings,
+                  lambda: list(models.Translation.objects.with_completion().filter(project=project)), 1)
+
+    for writer in (write_android_strings, write_po, write_mo):
+        yield measure('%s()' % writer.__name__, num_strings, lambda: writer(translation, BytesIO()), 1)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+'''
+Synthetic data generators for the rockpile benchmarks
+======================================================
+
+'''
+
+from collections import OrderedDict
+
+from django.contrib.auth.models import User
+from lxml import etree
+
+from rockpile import models
+
+
+LANGUAGES = [code for code, name in models.TRANSLATED_LANGUAGES]
+
+
+def generate_strings(num_strings, prefix='value'):
+    """
+    Returns an ordered mapping of ``num_strings`` synthetic keys to values
+    """
+
+    return OrderedDict(('key_%d' % i, u'%s %d ñ' % (prefix, i)) for i in range(num_strings))
+
+
+def write_strings_xml(file_obj, num_strings):
+    """
+    Writes a synthetic Android ``strings.xml`` file with ``num_strings`` strings
+    """
+
+    with etree.xmlfile(file_obj, encoding='utf-8') as xml_file:
+        xml_file.write_declaration()
+        with xml_file.element('resources'):
+            for key, value in generate_strings(num_strings).items():
+                element = etree.Element('string', name=key)
+                element.text = value
+                xml_file.write(u'\n    ', element)
+            xml_file.write(u'\n')
+
+
+def create_project(num_locales, num_strings, validated_ratio=0.5):
+    """
+    Creates a project with ``num_locales`` translations of ``num_strings`` strings each,
+    using the bulk importer. Returns the project.
+    """
+
+    user = User.objects.create_user(username='benchmark_%d' % User.objects.count())
+    owner = models.Owner.objects.create(user=user)
+    translator = models.Translator.objects.create(user=user)
+    project = models.TranslationProject.objects.create(name='Benchmark', owner=owner)
+
+    for language in LANGUAGES[:num_locales]:
+        translation = models.Translation.objects.create(project=project, language=language)
+        translation.translators.add(translator)
+        translation.import_strings(generate_strings(num_strings, prefix=language))
+
+        validated = list(models.TranslatedString.objects.strings(translation).values_list('pk', flat=True)[
+            :int(num_strings * validated_ratio)])
+        for start in range(0, len(validated), 500):
+            models.TranslatedString.objects.filter(pk__in=validated[start:start + 500]).update(validated_by=translator)
+
+    # The strings were validated with bulk updates, which skip the receivers
+    models.Translation.objects.rebuild_counters()
+    models.MemoryTrigram.objects.index(models.TranslatedString.objects.filter(translation__project=project))
+    return project
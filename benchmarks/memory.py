@@ -0,0 +1,41 @@
+'''
+Memory measurements for the rockpile benchmarks
+================================================
+
+Peak memory is read as the resident set size (RSS) of the process, so it includes
+the memory allocated by C libraries, which ``tracemalloc`` does not see.
+
+'''
+
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def max_rss():
+    """
+    Returns the peak RSS of the process in bytes, or None if it is not available
+    """
+
+    if resource is None:
+        return None
+    # Kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def reset_max_rss():
+    """
+    Resets the peak RSS of the process to its current RSS, returns whether the
+    platform supports it (Linux)
+    """
+
+    try:
+        with open('/proc/self/clear_refs', 'w') as file_obj:
+            file_obj.write('5')
+    except (IOError, OSError):
+        return False
+    return True
@@ -0,0 +1,42 @@
+'''
+Parsing benchmark process for rockpile
+=======================================
+
+Parses a ``strings.xml`` file into a dict (``tree``) or with the streaming mode
+(``streaming``) and prints the seconds and the RSS growth in bytes as JSON. It runs
+in a new process for every file, see ``benchmarks.cases.measure_parsing``::
+
+    $ python -m benchmarks.parsing strings.xml streaming
+
+'''
+
+import json
+import sys
+import time
+
+from django.conf import settings
+
+from benchmarks.memory import max_rss
+
+
+def parse(path, mode):
+    from rockpile.adapters import AndroidStrings
+
+    start_rss = max_rss()
+    start = time.time()
+
+    with open(path, 'rb') as file_obj:
+        if mode == 'streaming':
+            sum(1 for _ in AndroidStrings.iter_strings(file_obj))
+        else:
+            AndroidStrings(file_obj)
+
+    seconds = time.time() - start
+    peak_memory = None if start_rss is None else max_rss() - start_rss
+    return {'seconds': seconds, 'peak_memory': peak_memory}
+
+
+if __name__ == '__main__':
+    # The default settings, the parsing is not instrumented
+    settings.configure()
+    print(json.dumps(parse(*sys.argv[1:3])))
@@ -13,6 +13,9 @@ Gettext
 
 There is a library called `polib` supporting from python 2.4 to python 3.X (*rosetta* is using it)
 
+Compiled `.mo` files are read without polib, they are memory mapped and looked up
+through the hash table included in the format.
+
 
 Android
 ++++++++++++++
@@ -29,9 +32,38 @@ Each `strings.xml` file represents one language.
 
 '''
 
+import mmap
+import struct
 from collections import MutableMapping, OrderedDict
+
+import polib
 from lxml import etree
 
+from rockpile.instrumentation import instrument
+
+
+MO_MAGIC = 0x950412de
+
+MO_HEADER_SIZE = 28
+
+
+def hashpjw(data):
+    """
+    Returns the hash used by the hash table of ``.mo`` files (same as GNU gettext)
+
+    :param data: Encoded msgid
+    :type data: bytes
+    """
+
+    value = 0
+    for char in bytearray(data):
+        value = ((value << 4) + char) & 0xffffffff
+        high = value & 0xf0000000
+        if high:
+            value ^= high >> 24
+            value ^= high
+    return value
+
 
 class TranslatableStrings(MutableMapping):
     """
@@ -115,10 +147,189 @@ class AndroidStrings(TranslatableStrings):
 
         super(AndroidStrings, self).__init__()
 
-        # LXML parses the XML and stores data in a python dict for an easier use
-        self._xml = etree.parse(file_obj)
+        # Stores data in order, the XML tree is discarded while it is parsed
+        with instrument('adapter.parse', adapter='android') as operation:
+            self._data = OrderedDict(self.iter_strings(file_obj))
+            operation.rows = len(self._data)
+
+    @staticmethod
+    def iter_strings(file_obj):
+        """
+        Yields ``(name, text)`` pairs for every ``<string>`` in the file without
+        building the whole XML tree, so memory stays flat no matter how big the file is.
+
+        Usage:
+
+        >>> for name, text in AndroidStrings.iter_strings(my_fd):
+        ...     print(name, text)
+        app_name My app name
+
+        :param file_obj: File-like object containing XML
+        :type file_obj: file-like obj
+        """
+
+        for _, element in etree.iterparse(file_obj, events=('end',)):
+            parent = element.getparent()
+
+            # Only direct children of <resources> are complete resources, nested
+            # elements (e.g. <xliff:g>) are handled along with their parent
+            if parent is None or parent.getparent() is not None:
+                continue
+
+            if element.tag == 'string':
+                yield element.attrib['name'], element.text
+
+            # Frees the processed element and the siblings that were already yielded
+            element.clear()
+            while element.getprevious() is not None:
+                del parent[0]
+
+
+class PoStrings(TranslatableStrings):
+    """
+    Helper class to support gettext .po files, it uses polib for parsing
+
+    Usage:
+
+    >>> po_strings = PoStrings(my_fd)
+    >>> po_strings['Hello world']
+    'Hola mundo'
+    """
+
+    def __init__(self, file_obj):
+        """
+        Constructor
+
+        :param file_obj: File-like object containing the PO file
+        :type file_obj: file-like obj
+        """
+
+        super(PoStrings, self).__init__()
+
+        with instrument('adapter.parse', adapter='po') as operation:
+            content = file_obj.read()
+            if isinstance(content, bytes):
+                content = content.decode(polib.detect_encoding(content))
+
+            # Stores data in order, plural entries use their first form
+            self._data = OrderedDict()
+            for entry in polib.pofile(content):
+                if not entry.obsolete:
+                    self._data[entry.msgid] = entry.msgstr or entry.msgstr_plural.get(0, u'')
+            operation.rows = len(self._data)
+
+
+class MoStrings(TranslatableStrings):
+    """
+    Helper class to read compiled gettext .mo files.
+
+    The file is memory mapped and keys are looked up through the hash table of the
+    format (or a binary search when there is no hash table), so opening a catalog is
+    instant and nothing is unpacked into a dict. It is read-only.
+
+    Usage:
+
+    >>> mo_strings = MoStrings(my_fd)
+    >>> mo_strings['Hello world']
+    'Hola mundo'
+    """
+
+    def __init__(self, file_obj):
+        """
+        Constructor
+
+        :param file_obj: Real file opened in binary mode containing the MO file
+        :type file_obj: file
+        """
+
+        super(MoStrings, self).__init__()
+
+        self._mmap = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic = struct.unpack('<I', self._mmap[:4])[0]
+        if magic == MO_MAGIC:
+            self._byte_order = '<'
+        elif magic == struct.unpack('>I', struct.pack('<I', MO_MAGIC))[0]:
+            self._byte_order = '>'
+        else:
+            raise ValueError('Invalid .mo file: bad magic number')
+
+        (_, self._num_entries, self._originals_offset, self._translations_offset, self._hash_table_size,
+         self._hash_table_offset) = self._unpack('6I', 4)
+
+        # The metadata is the translation of the empty msgid, it is not a string
+        self._has_metadata = self._num_entries > 0 and self._original(0) == b''
+        self._charset = 'utf-8'
+        if self._has_metadata:
+            self._charset = polib.detect_encoding(self._translation(0), binary_mode=True)
+
+    def _unpack(self, fmt, offset):
+        return struct.unpack_from(self._byte_order + fmt, self._mmap, offset)
+
+    def _string(self, table_offset, index):
+        length, offset = self._unpack('2I', table_offset + 8 * index)
+        return self._mmap[offset:offset + length]
+
+    def _original(self, index):
+        # Plural entries store "singular\0plural"
+        return self._string(self._originals_offset, index).split(b'\0')[0]
+
+    def _translation(self, index):
+        return self._string(self._translations_offset, index).split(b'\0')[0]
+
+    def _lookup(self, key):
+        """
+        Returns the index of the encoded key or None if it is missing
+        """
+
+        if self._hash_table_size > 2:
+            value = hashpjw(key)
+            position = value % self._hash_table_size
+            increment = 1 + value % (self._hash_table_size - 2)
+            while True:
+                entry = self._unpack('I', self._hash_table_offset + 4 * position)[0]
+                if entry == 0:
+                    return None
+                if self._original(entry - 1) == key:
+                    return entry - 1
+                position = (position + increment) % self._hash_table_size
+
+        # msgfmt sorts the originals, so they can be binary searched
+        low, high = 0, self._num_entries
+        while low < high:
+            middle = (low + high) // 2
+            original = self._original(middle)
+            if original == key:
+                return middle
+            elif original < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        return None
+
+    def __len__(self):
+        return self._num_entries - self._has_metadata
+
+    def __getitem__(self, key):
+        index = self._lookup(key.encode(self._charset)) if key else None
+        if index is None:
+            raise KeyError(key)
+        return self._translation(index).decode(self._charset)
+
+    def __setitem__(self, key, value):
+        raise TypeError('MoStrings is read-only')
+
+    def __delitem__(self, key):
+        raise TypeError('MoStrings is read-only')
+
+    def __iter__(self):
+        for index in range(self._has_metadata, self._num_entries):
+            yield self._original(index).decode(self._charset)
+
+    def close(self):
+        """
+        Unmaps the file
+        """
 
-        # Stores data in order
-        self._data = OrderedDict()
-        for element in self._xml.findall("./string"):
-            self._data[element.attrib['name']] = element.text
+        self._mmap.close()
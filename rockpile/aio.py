@@ -0,0 +1,88 @@
+'''
+Asynchronous API for rockpile
+=================================
+
+Awaitable counterparts of the blocking calls of rockpile, for ASGI applications and
+other asyncio code. The ORM of the supported Django versions is synchronous, so every
+call runs as a whole in a thread pool and returns an asyncio future: there is a single
+thread hop per call instead of one per query, and the event loop is never blocked.
+
+Independent calls, such as lookups for several locales, run concurrently::
+
+    es, fr = await asyncio.gather(aget_catalog(es_translation), aget_catalog(fr_translation))
+
+The calls run outside the transaction of the caller, each worker thread uses its own
+database connection. The size of the pool is set with ``ROCKPILE_ASYNC_WORKERS`` (10).
+
+This module requires Python 3.4 or newer.
+
+'''
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from rockpile.catalog import get_catalog
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Returns the thread pool that runs the blocking calls
+    """
+
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'ROCKPILE_ASYNC_WORKERS', 10))
+        return _executor
+
+
+def _call(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # Worker threads live longer than requests, their connections follow CONN_MAX_AGE
+        close_old_connections()
+
+
+def run_in_executor(func, *args, **kwargs):
+    """
+    Runs a blocking function in the thread pool, returns an awaitable future with its
+    result
+
+    :param func: Function to run, it may query the database
+    :type func: callable
+    """
+
+    return asyncio.get_event_loop().run_in_executor(get_executor(), partial(_call, func, args, kwargs))
+
+
+def alist(queryset):
+    """
+    Evaluates a queryset in the thread pool, the awaitable returns a list
+
+    :param queryset: Queryset to evaluate
+    :type queryset: django.db.models.query.QuerySet
+    """
+
+    return run_in_executor(list, queryset)
+
+
+def aget_catalog(translation):
+    """
+    Awaitable ``rockpile.catalog.get_catalog``
+
+    :param translation: Translation instance or primary key
+    :type translation: rockpile.models.Translation or int
+    """
+
+    return run_in_executor(get_catalog, translation)
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class RockpileConfig(AppConfig):
+    name = 'rockpile'
+    verbose_name = 'Rockpile'
+
+    def ready(self):
+        # Connects the signal receivers
+        from rockpile import receivers  # NOQA
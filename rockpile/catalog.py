@@ -0,0 +1,185 @@
+'''
+Catalogs for rockpile
+=================================
+
+A catalog is the mapping of source strings to translated strings of a translation:
+
+::
+    {'Hello world': 'Hola mundo', 'app_name': 'Hola rockpile'}
+
+Catalogs are built once and stored in Django's cache framework, so reading them
+does not hit the database until a string of the translation changes.
+
+
+Cache keys
+++++++++++++++
+
+Every translation has a version number stored under ``rockpile:catalog:<pk>:version``
+which is bumped whenever one of its strings changes. The catalog itself is stored
+under ``rockpile:catalog:<pk>:<version>``, so bumping the version invalidates the
+catalog for every process sharing the cache and old entries simply expire.
+
+The cache alias and the timeout of the catalogs are configured with the
+``ROCKPILE_CATALOG_CACHE`` (``'default'``) and ``ROCKPILE_CATALOG_TIMEOUT``
+(one day) settings.
+
+'''
+
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from rockpile.instrumentation import instrument
+from rockpile.models import TranslatedString
+
+
+def get_cache():
+    """
+    Returns the cache used to store catalogs
+    """
+
+    return caches[getattr(settings, 'ROCKPILE_CATALOG_CACHE', 'default')]
+
+
+def version_key(translation):
+    """
+    Returns the cache key of the catalog version of a translation
+
+    :param translation: Translation instance or primary key
+    :type translation: rockpile.models.Translation or int
+    """
+
+    return 'rockpile:catalog:%s:version' % getattr(translation, 'pk', translation)
+
+
+def catalog_key(translation, version):
+    """
+    Returns the cache key of the catalog of a translation for a version
+
+    :param translation: Translation instance or primary key
+    :type translation: rockpile.models.Translation or int
+    :param version: Catalog version, see ``get_version``
+    :type version: int
+    """
+
+    return 'rockpile:catalog:%s:%s' % (getattr(translation, 'pk', translation), version)
+
+
+def _initial_version():
+    """
+    Returns a version for translations without one in the cache. It is time based, so
+    a version evicted from the cache is never reused for different contents.
+    """
+
+    return int(time.time() * 1000000)
+
+
+def get_version(translation):
+    """
+    Returns the current catalog version of a translation
+
+    :param translation: Translation instance or primary key
+    :type translation: rockpile.models.Translation or int
+    """
+
+    cache = get_cache()
+    key = version_key(translation)
+
+    version = cache.get(key)
+    if version is None:
+        # Another process may be initializing it at the same time, the first one wins
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key) or _initial_version()
+
+    return version
+
+
+def bump_version(translation):
+    """
+    Bumps the catalog version of a translation and returns the new one
+
+    :param translation: Translation instance or primary key
+    :type translation: rockpile.models.Translation or int
+    """
+
+    cache = get_cache()
+    key = version_key(translation)
+
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _initial_version()
+        cache.set(key, version, None)
+        return version
+
+
+def invalidate_catalog(translation):
+    """
+    Bumps the catalog version of a translation after a change in its strings.
+
+    Inside a transaction the version is bumped again on commit, otherwise another
+    process could cache the data from before the commit under the new version.
+
+    :param translation: Translation instance or primary key
+    :type translation: rockpile.models.Translation or int
+    """
+
+    bump_version(translation)
+
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump_version(translation))
+
+
+def build_catalog(translation):
+    """
+    Builds the catalog of a translation from the database
+
+    :param translation: Translation instance or primary key
+    :type translation: rockpile.models.Translation or int
+    """
+
+    with instrument('catalog.build', translation=getattr(translation, 'pk', translation)) as operation:
+        strings = TranslatedString.objects.strings(translation).order_by()
+        catalog = dict(strings.values_list('key__value', 'value').iterator())
+        operation.rows = len(catalog)
+
+    return catalog
+
+
+def get_catalog(translation):
+    """
+    Returns the catalog of a translation, it is only built when the cached one is
+    missing or outdated.
+
+    Usage:
+
+    >>> get_catalog(translation)['Hello world']
+    'Hola mundo'
+
+    :param translation: Translation instance or primary key
+    :type translation: rockpile.models.Translation or int
+    """
+
+    return get_versioned_catalog(translation)[1]
+
+
+def get_versioned_catalog(translation):
+    """
+    Returns the current version and the catalog of a translation, see ``get_catalog``
+
+    :param translation: Translation instance or primary key
+    :type translation: rockpile.models.Translation or int
+    """
+
+    cache = get_cache()
+    version = get_version(translation)
+    key = catalog_key(translation, version)
+
+    catalog = cache.get(key)
+    if catalog is None:
+        catalog = build_catalog(translation)
+        cache.set(key, catalog, getattr(settings, 'ROCKPILE_CATALOG_TIMEOUT', 60 * 60 * 24))
+
+    return version, catalog
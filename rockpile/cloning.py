@@ -0,0 +1,137 @@
+'''
+Cloning of translations for rockpile
+=================================
+
+Adds languages to a project without loading strings into Python: the strings of a
+translation are copied with a single ``INSERT ... SELECT``, so creating a locale takes
+the same number of queries for ten strings or a million.
+
+'''
+
+from django.db import connection, transaction
+from django.db.models import Max
+
+from rockpile.instrumentation import instrument
+from rockpile.models import QueuedString, SourceString, StringChange, Translation, TranslatedString
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def copy_strings(source, target):
+    """
+    Copies the strings of a translation into another one with a single query, keeping
+    their positions. Copies are not validated. Returns the number of copied strings.
+
+    The signal receivers do not run, the caller updates the denormalized data.
+
+    :param source: Translation to copy from
+    :type source: rockpile.models.Translation
+    :param target: Translation that receives the strings
+    :type target: rockpile.models.Translation
+    """
+
+    # Ordered, so primary keys follow the positions too
+    sql = (
+        'INSERT INTO {table} (key_id, value, translation_id, validated_by_id, position) '
+        'SELECT key_id, value, %s, NULL, position FROM {table} WHERE translation_id = %s ORDER BY position, id'
+    ).format(table=_table(TranslatedString))
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [target.pk, source.pk])
+        return cursor.rowcount
+
+
+def record_copied_strings(target):
+    """
+    Starts the revision log of a translation with a change per string, with a single
+    query. Returns the last revision.
+
+    The primary keys of the strings are used as revisions: they are unique and
+    increasing, and the next changes get higher revisions.
+
+    :param target: Translation whose strings were just copied
+    :type target: rockpile.models.Translation
+    """
+
+    sql = (
+        'INSERT INTO {changes} (translation_id, revision, {key}, value) '
+        'SELECT s.translation_id, s.id, k.value, s.value FROM {strings} s JOIN {sources} k ON k.id = s.key_id '
+        'WHERE s.translation_id = %s'
+    ).format(changes=_table(StringChange), key=connection.ops.quote_name('key'), strings=_table(TranslatedString),
+             sources=_table(SourceString))
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [target.pk])
+
+    return TranslatedString.objects.strings(target).aggregate(Max('pk'))['pk__max'] or 0
+
+
+def clone_translation(translation, language, translators=False):
+    """
+    Creates a translation of the same project for another language with a copy of the
+    strings of a translation, in the same order. The copies are not validated, so they
+    are not in the translation memory.
+
+    Usage:
+
+    >>> clone_translation(translation, 'pt-br', translators=True).num_strings
+    2
+
+    :param translation: Translation to copy
+    :type translation: rockpile.models.Translation
+    :param language: Language code of the new translation
+    :type language: str
+    :param translators: Whether the translators of ``translation`` are added to the new one
+    :type translators: bool
+    """
+
+    with instrument('clone', translation=translation.pk) as operation, transaction.atomic():
+        # Locks the source, strings are not changed meanwhile and the counters match the copy
+        source = Translation.objects.select_for_update().get(pk=translation.pk)
+
+        clone = Translation.objects.create(project_id=source.project_id, language=language)
+        if translators:
+            clone.translators.add(*source.translators.all())
+
+        operation.rows = copy_strings(source, clone)
+        revision = record_copied_strings(clone)
+
+        Translation.objects.filter(pk=clone.pk).update(num_strings=source.num_strings,
+                                                       content_hash=source.content_hash, revision=revision)
+        clone.num_strings, clone.content_hash, clone.revision = source.num_strings, source.content_hash, revision
+
+    return clone
+
+
+def add_language(project, language, translators=None, source=None):
+    """
+    Adds a translation for a language to a project and fills its work queue with the
+    strings still to translate, see ``QueuedStringManager``.
+
+    :param project: Project of the new translation
+    :type project: rockpile.models.TranslationProject
+    :param language: Language code of the new translation
+    :type language: str
+    :param translators: Translators of the new translation
+    :type translators: list
+    :param source: Translation of the project whose strings are copied, see ``clone_translation``
+    :type source: rockpile.models.Translation
+    """
+
+    if source is not None and source.project_id != project.pk:
+        raise ValueError('The source translation belongs to another project')
+
+    with transaction.atomic():
+        if source is not None:
+            translation = clone_translation(source, language)
+        else:
+            translation = Translation.objects.create(project=project, language=language)
+
+        if translators:
+            translation.translators.add(*translators)
+
+        QueuedString.objects.enqueue(translation)
+
+    return translation
@@ -0,0 +1,202 @@
+'''
+Diff engine for rockpile
+=================================
+
+Compares translatable strings (see :mod:`rockpile.adapters`) with the strings stored
+for a translation and applies the differences with bulk queries.
+
+Only keys and a short hash of every stored value are kept in memory, and applying a
+changeset only touches the rows that actually changed.
+
+'''
+
+import hashlib
+from collections import OrderedDict, namedtuple
+
+from django.db import transaction
+from django.db.models import Case, TextField, Value, When
+
+from rockpile.catalog import invalidate_catalog
+from rockpile.models import (POSITION_GAP, MemoryTrigram, QueuedString, SourceString, StringChange, Translation,
+                             TranslatedString, string_content_hash)
+
+
+# Rows per UPDATE or DELETE statement, each row takes up to three parameters and SQLite allows 999
+BATCH_SIZE = 300
+
+
+class Changeset(namedtuple('Changeset', ['added', 'removed', 'modified'])):
+    """
+    Differences between translatable strings and a translation:
+
+    * ``added``: ordered mapping of new keys to their values
+    * ``removed``: set of keys that are no longer present
+    * ``modified``: mapping of keys to their new values
+    """
+
+    __slots__ = ()
+
+    @property
+    def is_empty(self):
+        """
+        Returns True when there are no differences
+        """
+
+        return not (self.added or self.removed or self.modified)
+
+
+def value_hash(value):
+    """
+    Returns a short digest of a translated value used to detect changes
+    """
+
+    return hashlib.sha1((value or u'').encode('utf-8')).digest()[:8]
+
+
+def diff_strings(translation, strings):
+    """
+    Returns the changeset that turns the strings of a translation into the given ones
+
+    Usage:
+
+    >>> diff_strings(translation, AndroidStrings(my_fd))
+    Changeset(added=OrderedDict([('new_key', 'Nuevo')]), removed=frozenset(), modified={})
+
+    :param translation: Translation to compare with
+    :type translation: rockpile.models.Translation
+    :param strings: Mapping of translation keys to translated values
+    :type strings: rockpile.adapters.TranslatableStrings
+    """
+
+    stored = dict(
+        (key, value_hash(value))
+        for key, value in TranslatedString.objects.strings(translation).order_by().values_list(
+            'key__value', 'value').iterator()
+    )
+
+    added = OrderedDict((key, value or u'') for key, value in strings.items() if key not in stored)
+    removed = frozenset(stored) - frozenset(strings)
+    modified = dict(
+        (key, strings[key] or u'') for key in frozenset(strings) & frozenset(stored)
+        if value_hash(strings[key]) != stored[key]
+    )
+
+    return Changeset(added, removed, modified)
+
+
+def bulk_update_values(values):
+    """
+    Sets new values for many translated strings using one ``UPDATE`` per batch.
+
+    Validation is cleared on the updated strings because their text changed.
+
+    :param values: List of ``(pk, value)`` pairs
+    :type values: list
+    """
+
+    for start in range(0, len(values), BATCH_SIZE):
+        batch = values[start:start + BATCH_SIZE]
+        new_value = Case(*[When(pk=pk, then=Value(value)) for pk, value in batch], output_field=TextField())
+        TranslatedString.objects.filter(pk__in=[pk for pk, _ in batch]).update(value=new_value, validated_by=None)
+
+
+def bulk_delete(pks):
+    """
+    Deletes many translated strings using one ``DELETE`` per batch, without collecting
+    related rows or sending signals.
+
+    The only rows depending on translated strings are their ``MemoryTrigram`` entries,
+    the caller must remove the strings from the translation memory first (only
+    validated strings are indexed) and update the denormalized data.
+
+    :param pks: List of primary keys
+    :type pks: list
+    """
+
+    for start in range(0, len(pks), BATCH_SIZE):
+        queryset = TranslatedString.objects.filter(pk__in=pks[start:start + BATCH_SIZE])
+        queryset._raw_delete(queryset.db)
+
+
+def apply_changeset(translation, changeset):
+    """
+    Applies a changeset to a translation in a single transaction.
+
+    Keys that are not yet source strings of the project are created, new translated
+    strings are inserted, modified ones are updated (losing their validation) and
+    removed ones are deleted. Source strings are shared by all the translations of the
+    project and are never deleted.
+
+    :param translation: Translation that receives the changes
+    :type translation: rockpile.models.Translation
+    :param changeset: Changes returned by ``diff_strings``
+    :type changeset: rockpile.diff.Changeset
+    """
+
+    if changeset.is_empty:
+        return
+
+    with transaction.atomic():
+        sources = SourceString.objects.for_values(translation.project_id, changeset.added)
+
+        # New strings are appended, the last position is looked up once instead of once per row
+        position = TranslatedString.objects.last_position(translation)
+
+        new_strings = []
+        content_hash = 0
+        for key, value in changeset.added.items():
+            position += POSITION_GAP
+            new_strings.append(TranslatedString(key_id=sources[key], value=value, translation=translation,
+                                                position=position))
+            content_hash += string_content_hash(sources[key], value)
+        TranslatedString.objects.bulk_create(new_strings)
+
+        # Bulk inserts skip the receiver that removes translated strings from the work queue
+        added_keys = [sources[key] for key in changeset.added]
+        for start in range(0, len(added_keys), BATCH_SIZE):
+            QueuedString.objects.complete(translation, added_keys[start:start + BATCH_SIZE])
+
+        unvalidated = []
+        if changeset.modified or changeset.removed:
+            # Only the changed strings are kept in memory, with their old values
+            changed_keys = frozenset(changeset.modified) | changeset.removed
+            translated_strings = dict(
+                (key, (pk, key_id, validated_by_id, value))
+                for key, pk, key_id, validated_by_id, value in
+                TranslatedString.objects.strings(translation).order_by().values_list(
+                    'key__value', 'pk', 'key_id', 'validated_by_id', 'value').iterator()
+                if key in changed_keys
+            )
+
+            modified_values = []
+            for key, value in changeset.modified.items():
+                pk, key_id, validated_by_id, old_value = translated_strings[key]
+                modified_values.append((pk, value))
+                content_hash += string_content_hash(key_id, value) - string_content_hash(key_id, old_value)
+                if validated_by_id is not None:
+                    unvalidated.append(pk)
+            bulk_update_values(modified_values)
+
+            removed_pks = []
+            for key in changeset.removed:
+                pk, key_id, validated_by_id, old_value = translated_strings[key]
+                removed_pks.append(pk)
+                content_hash -= string_content_hash(key_id, old_value)
+                if validated_by_id is not None:
+                    unvalidated.append(pk)
+
+            # Only validated strings are in the translation memory, the removed ones are
+            # unindexed before bulk_delete
+            for start in range(0, len(unvalidated), BATCH_SIZE):
+                MemoryTrigram.objects.unindex(unvalidated[start:start + BATCH_SIZE])
+
+            bulk_delete(removed_pks)
+
+        # Bulk queries skip the signals that maintain the progress counters, content hash
+        # and revision log
+        Translation.objects.update_counters(translation, len(new_strings) - len(changeset.removed), -len(unvalidated),
+                                            content_hash)
+        StringChange.objects.record(translation, list(changeset.added.items()) + list(changeset.modified.items()) +
+                                    [(key, None) for key in changeset.removed])
+
+        invalidate_catalog(translation)
@@ -0,0 +1,114 @@
+'''
+Exports for rockpile
+=================================
+
+Renders a translation to a downloadable file with the writers of
+:mod:`rockpile.writers`. The rendered files (bundles) are identified by the content
+hash of the translation, which is kept up to date whenever one of its strings
+changes, and by its order revision, bumped whenever strings are moved, so:
+
+* The ``ETag`` of a bundle is known without reading the strings, unchanged
+  translations are answered with ``304 Not Modified``.
+* Bundles are cached by content under ``rockpile:export:<pk>:<format>:<hash>:...``
+  and rendered once per content. A gzip compressed copy is cached with them.
+
+Bundles use the cache of the catalogs (see :mod:`rockpile.catalog`) and expire after
+``ROCKPILE_EXPORT_TIMEOUT`` seconds (one day).
+
+'''
+
+import gzip
+from collections import OrderedDict, namedtuple
+from io import BytesIO
+
+from django.conf import settings
+
+from rockpile.catalog import get_cache
+from rockpile.instrumentation import instrument
+from rockpile.writers import write_android_strings, write_mo, write_po
+
+
+ExportFormat = namedtuple('ExportFormat', ['writer', 'content_type', 'filename'])
+
+Bundle = namedtuple('Bundle', ['body', 'gzipped_body'])
+
+EXPORT_FORMATS = OrderedDict([
+    ('android', ExportFormat(write_android_strings, 'application/xml; charset=utf-8', 'strings.xml')),
+    ('po', ExportFormat(write_po, 'text/x-gettext-translation; charset=utf-8', '{language}.po')),
+    ('mo', ExportFormat(write_mo, 'application/x-gettext-translation', '{language}.mo')),
+])
+
+
+def bundle_etag(translation, format, gzipped=False):
+    """
+    Returns the quoted ``ETag`` of the bundle of a translation, it only depends on
+    the stored content hash, counters and order revision
+
+    :param translation: Translation to export
+    :type translation: rockpile.models.Translation
+    :param format: One of ``EXPORT_FORMATS``
+    :type format: str
+    :param gzipped: Whether the body is gzip compressed
+    :type gzipped: bool
+    """
+
+    return '"%d-%s-%x-%d-%d%s"' % (translation.pk, format, translation.content_hash, translation.num_strings,
+                                   translation.order_revision, '-gzip' if gzipped else '')
+
+
+def bundle_key(translation, format):
+    """
+    Returns the cache key of the bundle of a translation for its current content
+    """
+
+    return 'rockpile:export:%d:%s:%x:%d:%d' % (translation.pk, format, translation.content_hash,
+                                               translation.num_strings, translation.order_revision)
+
+
+def render_bundle(translation, format):
+    """
+    Renders a translation with the writer of a format and compresses it
+
+    :param translation: Translation to export
+    :type translation: rockpile.models.Translation
+    :param format: One of ``EXPORT_FORMATS``
+    :type format: str
+    """
+
+    body = BytesIO()
+    EXPORT_FORMATS[format].writer(translation, body)
+
+    # A fixed mtime makes the compressed body depend only on the content
+    gzipped_body = BytesIO()
+    with gzip.GzipFile(fileobj=gzipped_body, mode='wb', mtime=0) as file_obj:
+        file_obj.write(body.getvalue())
+
+    return Bundle(body.getvalue(), gzipped_body.getvalue())
+
+
+def get_bundle(translation, format):
+    """
+    Returns the bundle of a translation, it is only rendered when the cached one is
+    missing or its content changed.
+
+    Usage:
+
+    >>> get_bundle(translation, 'android').body
+    b'<?xml version=...'
+
+    :param translation: Translation to export
+    :type translation: rockpile.models.Translation
+    :param format: One of ``EXPORT_FORMATS``
+    :type format: str
+    """
+
+    cache = get_cache()
+    key = bundle_key(translation, format)
+
+    bundle = cache.get(key)
+    if bundle is None:
+        with instrument('export.render', format=format, translation=translation.pk):
+            bundle = render_bundle(translation, format)
+        cache.set(key, bundle, getattr(settings, 'ROCKPILE_EXPORT_TIMEOUT', 60 * 60 * 24))
+
+    return bundle
@@ -0,0 +1,169 @@
+'''
+Importers for rockpile
+=================================
+
+Bulk loading of translatable strings (see :mod:`rockpile.adapters`) into the database.
+
+Importing goes through a fixed number of queries no matter how many strings the
+adapter contains: the strings of the translation are compared in one query (see
+:mod:`rockpile.diff`) and new and changed rows are written with batched ``INSERT``
+and ``UPDATE`` statements.
+
+Whole Android ``res/`` directories are imported with ``import_android_resources``,
+parsing the ``values-xx/strings.xml`` files of every language in parallel.
+
+'''
+
+import os
+import re
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from rockpile.adapters import AndroidStrings
+from rockpile.diff import apply_changeset, diff_strings
+from rockpile.instrumentation import instrument
+from rockpile.models import Translation
+
+
+ImportResult = namedtuple('ImportResult', ['created', 'updated'])
+
+
+def import_strings(translation, strings):
+    """
+    Imports translatable strings into a translation.
+
+    Keys that are not yet source strings of the project are created as source strings,
+    then new translated strings are inserted and changed ones are updated. Strings
+    missing from the adapter are kept. The whole import runs in a single transaction.
+
+    Usage:
+
+    >>> import_strings(translation, AndroidStrings(my_fd))
+    ImportResult(created=69, updated=0)
+
+    :param translation: Translation that receives the strings
+    :type translation: rockpile.models.Translation
+    :param strings: Mapping of translation keys to translated values
+    :type strings: rockpile.adapters.TranslatableStrings
+    """
+
+    with instrument('import', translation=translation.pk) as operation:
+        changeset = diff_strings(translation, strings)._replace(removed=frozenset())
+        apply_changeset(translation, changeset)
+        operation.rows = len(changeset.added) + len(changeset.modified)
+
+    return ImportResult(created=len(changeset.added), updated=len(changeset.modified))
+
+
+# values, values-es, values-pt-rBR or values-b+sr+Latn
+ANDROID_VALUES_RE = re.compile(r'^values(?:-(?P<language>[a-z]{2,3})(?:-r(?P<region>[A-Z]{2}))?|-b\+(?P<tag>[\w+]+))?$')
+
+
+def android_language(folder_name):
+    """
+    Returns the language code of an Android resources folder, an empty string for the
+    default ``values`` folder or None for folders without language qualifier
+    (e.g. ``values-land``).
+
+    >>> android_language('values-pt-rBR')
+    'pt-br'
+
+    :param folder_name: Folder name
+    :type folder_name: str
+    """
+
+    match = ANDROID_VALUES_RE.match(folder_name)
+    if match is None:
+        return None
+    if match.group('tag'):
+        return match.group('tag').replace('+', '-').lower()
+    if match.group('region'):
+        return '%s-%s' % (match.group('language'), match.group('region').lower())
+    return match.group('language') or ''
+
+
+def find_android_strings(res_dir):
+    """
+    Returns the ``(language, path)`` pairs of the ``strings.xml`` files of a ``res/``
+    directory, sorted by language
+
+    :param res_dir: Path of the ``res/`` directory
+    :type res_dir: str
+    """
+
+    found = []
+    for folder_name in sorted(os.listdir(res_dir)):
+        language = android_language(folder_name)
+        path = os.path.join(res_dir, folder_name, 'strings.xml')
+        if language is not None and os.path.isfile(path):
+            found.append((language, path))
+    return found
+
+
+def parse_android_strings(path):
+    """
+    Parses a ``strings.xml`` file in a worker process, returns the ``(name, text)`` pairs
+
+    :param path: Path of the file
+    :type path: str
+    """
+
+    with open(path, 'rb') as file_obj:
+        return list(AndroidStrings.iter_strings(file_obj))
+
+
+def import_android_resources(project, res_dir, workers=None, default_language=None, progress=None):
+    """
+    Imports every ``values-xx/strings.xml`` file of an Android ``res/`` directory into
+    the translation of the project for that language, creating missing translations.
+
+    Files are parsed in a pool of processes while the parent process writes the parsed
+    strings with bulk queries as they arrive.
+
+    Usage:
+
+    >>> import_android_resources(project, 'app/src/main/res', workers=4)
+    {'es': ImportResult(created=69, updated=0), 'fr': ImportResult(created=69, updated=0)}
+
+    :param project: Project that receives the translations
+    :type project: rockpile.models.TranslationProject
+    :param res_dir: Path of the ``res/`` directory
+    :type res_dir: str
+    :param workers: Number of worker processes, one per CPU by default
+    :type workers: int
+    :param default_language: Language of the default ``values`` folder, it is skipped if not given.
+                             A ``ValueError`` is raised if another folder has the same language.
+    :type default_language: str
+    :param progress: Called with ``(language, number of imported locales, total locales, ImportResult)``
+                     after every locale
+    :type progress: callable
+    """
+
+    locales = []
+    for language, path in find_android_strings(res_dir):
+        language = language or default_language
+        if language:
+            locales.append((language, path))
+
+    # Both files would be imported into the same translation, in no particular order
+    languages = [language for language, _ in locales]
+    duplicated = sorted(set(language for language in languages if languages.count(language) > 1))
+    if duplicated:
+        raise ValueError('More than one strings.xml file for the language(s): %s' % ', '.join(duplicated))
+
+    results = OrderedDict()
+    if not locales:
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = dict((executor.submit(parse_android_strings, path), language) for language, path in locales)
+
+        for future in as_completed(futures):
+            language = futures[future]
+            translation, _ = Translation.objects.get_or_create(project=project, language=language)
+            results[language] = import_strings(translation, OrderedDict(future.result()))
+
+            if progress is not None:
+                progress(language, len(results), len(locales), results[language])
+
+    return results
@@ -0,0 +1,217 @@
+'''
+Instrumentation for rockpile
+=================================
+
+The main rockpile operations report how long they took, how many rows they
+processed and how many SQL queries they ran to an instrumentation backend:
+
+* ``adapter.parse``: parsing a file with an adapter
+* ``import``: importing strings into a translation
+* ``clone``: copying the strings of a translation into a new one
+* ``export``: writing a translation with one of the writers
+* ``catalog.build``: building a catalog that was not cached
+* ``completion.rebuild``: recomputing the progress counters
+
+The backend is configured with the ``ROCKPILE_INSTRUMENTATION_BACKEND`` setting:
+
+* ``rockpile.instrumentation.NullBackend`` (default): measures nothing, no overhead
+* ``rockpile.instrumentation.LoggingBackend``: logs to the ``rockpile.instrumentation`` logger
+* ``rockpile.instrumentation.MemoryBackend``: keeps the measurements, useful for tests
+
+Any class with a ``record(operation)`` method can be used to feed a metrics pipeline.
+
+Queries are counted on every database connection of the thread by wrapping their
+cursors, the query log (``connection.queries``) is left as configured.
+
+'''
+
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections
+from django.db.backends.utils import CursorWrapper
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger('rockpile.instrumentation')
+
+
+class Operation(object):
+    """
+    Measurement of a single operation
+    """
+
+    def __init__(self, name, tags):
+        self.name = name
+        self.tags = tags
+        self.rows = None
+        self.duration = None
+        self.queries = None
+
+    def __repr__(self):
+        return '<Operation %s %r: %s rows, %s queries, %.6fs>' % (self.name, self.tags, self.rows, self.queries,
+                                                                   self.duration or 0)
+
+
+class CountingCursorWrapper(CursorWrapper):
+    """
+    Cursor that adds the queries it runs to a ``QueryCounter``
+    """
+
+    def __init__(self, cursor, db, counter):
+        super(CountingCursorWrapper, self).__init__(cursor, db)
+        self.counter = counter
+
+    def execute(self, sql, params=None):
+        self.counter.queries += 1
+        return super(CountingCursorWrapper, self).execute(sql, params)
+
+    def executemany(self, sql, param_list):
+        self.counter.queries += 1
+        return super(CountingCursorWrapper, self).executemany(sql, param_list)
+
+
+class QueryCounter(object):
+    """
+    Counts the queries run on the database connections of the thread inside a
+    ``with`` block. The cursors made by the connections meanwhile are wrapped, with or
+    without the query log.
+    """
+
+    CURSOR_FACTORIES = ('make_cursor', 'make_debug_cursor')
+
+    def __init__(self):
+        self.queries = 0
+        self._replaced = []
+
+    def __enter__(self):
+        for db in connections.all():
+            for name in self.CURSOR_FACTORIES:
+                self._replaced.append((db, name, db.__dict__.get(name)))
+                setattr(db, name, self._counting(db, getattr(db, name)))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Restored in reverse order, so nested counters unwind their own wrappers
+        for db, name, previous in reversed(self._replaced):
+            if previous is None:
+                delattr(db, name)
+            else:
+                setattr(db, name, previous)
+        self._replaced = []
+
+    def _counting(self, db, make_cursor):
+        def make_counting_cursor(cursor):
+            return CountingCursorWrapper(make_cursor(cursor), db, self)
+        return make_counting_cursor
+
+
+class BaseBackend(object):
+    """
+    Base class of the instrumentation backends
+    """
+
+    # Backends that discard the measurements set it to False to skip measuring
+    measures = True
+
+    def record(self, operation):
+        """
+        Receives a finished operation
+
+        :param operation: Measured operation
+        :type operation: rockpile.instrumentation.Operation
+        """
+
+        raise NotImplementedError
+
+
+class NullBackend(BaseBackend):
+    """
+    Discards everything without measuring
+    """
+
+    measures = False
+
+    def record(self, operation):
+        pass
+
+
+class LoggingBackend(BaseBackend):
+    """
+    Logs every operation with the ``rockpile.instrumentation`` logger
+    """
+
+    def record(self, operation):
+        logger.info('%s %r: %.3fs, %s rows, %d queries', operation.name, operation.tags, operation.duration,
+                    operation.rows, operation.queries)
+
+
+class MemoryBackend(BaseBackend):
+    """
+    Keeps every operation in ``operations``
+    """
+
+    def __init__(self):
+        self.operations = []
+
+    def record(self, operation):
+        self.operations.append(operation)
+
+
+_backend = None
+
+
+def get_backend():
+    """
+    Returns the configured instrumentation backend
+    """
+
+    global _backend
+    if _backend is None:
+        backend_path = getattr(settings, 'ROCKPILE_INSTRUMENTATION_BACKEND', 'rockpile.instrumentation.NullBackend')
+        _backend = import_string(backend_path)()
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    global _backend
+    if setting == 'ROCKPILE_INSTRUMENTATION_BACKEND':
+        _backend = None
+
+
+@contextmanager
+def instrument(name, **tags):
+    """
+    Measures the operation run inside the block, the block may set the number of
+    processed rows on the yielded operation.
+
+    Usage:
+
+    >>> with instrument('import', translation=translation.pk) as operation:
+    ...     operation.rows = len(strings)
+
+    :param name: Operation name
+    :type name: str
+    """
+
+    backend = get_backend()
+    operation = Operation(name, tags)
+
+    if not backend.measures:
+        yield operation
+        return
+
+    start = time.time()
+    counter = QueryCounter()
+    try:
+        with counter:
+            yield operation
+    finally:
+        operation.duration = time.time() - start
+        operation.queries = counter.queries
+        backend.record(operation)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from rockpile.models import StringChange, Translation
+
+
+class Command(BaseCommand):
+    help = 'Compacts the revision log of translations into snapshots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('translation_ids', nargs='*', type=int,
+                            help='Translations to compact, all of them by default')
+        parser.add_argument('--keep', type=int, default=1000,
+                            help='Number of recent revisions that are not compacted')
+
+    def handle(self, *args, **options):
+        translations = Translation.objects.all()
+        if options['translation_ids']:
+            translations = translations.filter(pk__in=options['translation_ids'])
+
+        deleted = 0
+        for pk, revision in translations.values_list('pk', 'revision'):
+            deleted += StringChange.objects.compact(pk, revision - options['keep'])
+        self.stdout.write('Deleted %d obsolete change(s)' % deleted)
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rockpile.importers import import_android_resources
+from rockpile.models import TranslationProject
+
+
+class Command(BaseCommand):
+    help = 'Imports the strings.xml files of an Android res/ directory into a project, one per language'
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_id', type=int)
+        parser.add_argument('res_dir')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Number of parsing processes, one per CPU by default')
+        parser.add_argument('--default-language', default=None,
+                            help='Language of the default values/ folder, it is skipped if not given')
+
+    def handle(self, *args, **options):
+        try:
+            project = TranslationProject.objects.get(pk=options['project_id'])
+        except TranslationProject.DoesNotExist:
+            raise CommandError('Project %s does not exist' % options['project_id'])
+
+        def progress(language, imported, total, result):
+            self.stdout.write('[%d/%d] %s: %d created, %d updated' % (imported, total, language, result.created,
+                                                                      result.updated))
+
+        try:
+            results = import_android_resources(project, options['res_dir'], workers=options['workers'],
+                                               default_language=options['default_language'], progress=progress)
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write('Imported %d locale(s)' % len(results))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from rockpile.models import Translation
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the progress counters of translations from their strings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('translation_ids', nargs='*', type=int,
+                            help='Translations to rebuild, all of them by default')
+
+    def handle(self, *args, **options):
+        queryset = Translation.objects.all()
+        if options['translation_ids']:
+            queryset = queryset.filter(pk__in=options['translation_ids'])
+
+        rebuilt = Translation.objects.rebuild_counters(queryset)
+        self.stdout.write('Rebuilt counters of %d translation(s)' % rebuilt)
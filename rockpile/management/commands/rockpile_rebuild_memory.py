@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rockpile.models import MemoryTrigram, TranslatedString
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the translation memory from the validated strings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('translation_ids', nargs='*', type=int,
+                            help='Translations to rebuild, all of them by default')
+
+    def handle(self, *args, **options):
+        strings = TranslatedString.objects.all()
+        if options['translation_ids']:
+            strings = strings.filter(translation__in=options['translation_ids'])
+
+        with transaction.atomic():
+            indexed = MemoryTrigram.objects.index(strings)
+        self.stdout.write('Indexed %d validated string(s)' % indexed)
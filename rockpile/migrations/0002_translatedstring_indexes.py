@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 09:54
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# Partial indexes for the ordered TranslatedStringManager.keys and .not_validated lists,
+# only PostgreSQL and SQLite support them
+PARTIAL_INDEXES = [
+    ('rockpile_ts_keys_idx', ['translation_id', '_order'], 'key_id IS NULL'),
+    ('rockpile_ts_not_validated_idx', ['translation_id', '_order'], 'key_id IS NOT NULL AND validated_by_id IS NULL'),
+]
+
+PARTIAL_INDEX_VENDORS = ('postgresql', 'sqlite')
+
+
+def create_partial_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor not in PARTIAL_INDEX_VENDORS:
+        return
+
+    db_table = apps.get_model('rockpile', 'TranslatedString')._meta.db_table
+    for name, columns, condition in PARTIAL_INDEXES:
+        schema_editor.execute('CREATE INDEX %s ON %s (%s) WHERE %s' % (
+            schema_editor.quote_name(name),
+            schema_editor.quote_name(db_table),
+            ', '.join(schema_editor.quote_name(column) for column in columns),
+            condition,
+        ))
+
+
+def drop_partial_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor not in PARTIAL_INDEX_VENDORS:
+        return
+
+    for name, columns, condition in PARTIAL_INDEXES:
+        schema_editor.execute('DROP INDEX %s' % schema_editor.quote_name(name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rockpile', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='translatedstring',
+            index_together=set([('translation', 'key'), ('translation', 'validated_by')]),
+        ),
+        migrations.RunPython(create_partial_indexes, drop_partial_indexes),
+    ]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 10:00
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+from rockpile.migrations._partial_indexes import create_partial_indexes, drop_partial_indexes
+
+
+# Partial indexes of 0002, they cover the same columns as the new index
+PARTIAL_INDEXES = [
+    ('rockpile_ts_keys_idx', 'TranslatedString', ['translation_id', '_order'], 'key_id IS NULL'),
+    ('rockpile_ts_not_validated_idx', 'TranslatedString', ['translation_id', '_order'],
+     'key_id IS NOT NULL AND validated_by_id IS NULL'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rockpile', '0002_translatedstring_indexes'),
+    ]
+
+    # Django finds the index to remove by its columns, so the partial indexes on the
+    # same columns are dropped meanwhile. SQLite would also lose them rebuilding the table.
+    operations = [
+        migrations.RunPython(drop_partial_indexes(PARTIAL_INDEXES), create_partial_indexes(PARTIAL_INDEXES)),
+        migrations.AlterIndexTogether(
+            name='translatedstring',
+            index_together=set([('translation', 'key'), ('translation', 'validated_by'), ('translation', '_order')]),
+        ),
+        migrations.RunPython(create_partial_indexes(PARTIAL_INDEXES), drop_partial_indexes(PARTIAL_INDEXES)),
+    ]
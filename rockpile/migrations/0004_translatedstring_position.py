@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import F
+
+from rockpile.migrations._partial_indexes import create_partial_indexes, drop_partial_indexes
+
+
+POSITION_GAP = 1024
+
+# Partial indexes of 0002, now ordered by position
+OLD_PARTIAL_INDEXES = [
+    ('rockpile_ts_keys_idx', 'TranslatedString', ['translation_id', '_order'], 'key_id IS NULL'),
+    ('rockpile_ts_not_validated_idx', 'TranslatedString', ['translation_id', '_order'],
+     'key_id IS NOT NULL AND validated_by_id IS NULL'),
+]
+
+PARTIAL_INDEXES = [
+    ('rockpile_ts_keys_idx', 'TranslatedString', ['translation_id', 'position'], 'key_id IS NULL'),
+    ('rockpile_ts_not_validated_idx', 'TranslatedString', ['translation_id', 'position'],
+     'key_id IS NOT NULL AND validated_by_id IS NULL'),
+]
+
+
+def copy_order_to_position(apps, schema_editor):
+    TranslatedString = apps.get_model('rockpile', 'TranslatedString')
+    TranslatedString.objects.update(position=(F('_order') + 1) * POSITION_GAP)
+
+
+def copy_position_to_order(apps, schema_editor):
+    TranslatedString = apps.get_model('rockpile', 'TranslatedString')
+    Translation = apps.get_model('rockpile', 'Translation')
+    for translation in Translation.objects.all():
+        pks = TranslatedString.objects.filter(translation=translation).order_by('position', 'pk').values_list(
+            'pk', flat=True)
+        for order, pk in enumerate(pks):
+            TranslatedString.objects.filter(pk=pk).update(_order=order)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rockpile', '0003_translatedstring_order_index'),
+    ]
+
+    # SQLite rebuilds the table when altering it, which loses the partial indexes, so
+    # they are dropped first and created again at the end
+    operations = [
+        migrations.RunPython(drop_partial_indexes(OLD_PARTIAL_INDEXES), create_partial_indexes(OLD_PARTIAL_INDEXES)),
+        migrations.AddField(
+            model_name='translatedstring',
+            name='position',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Position'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_order_to_position, copy_position_to_order),
+        migrations.AlterIndexTogether(
+            name='translatedstring',
+            index_together=set([('translation', 'key'), ('translation', 'validated_by'),
+                                ('translation', 'position', 'id')]),
+        ),
+        migrations.AlterOrderWithRespectTo(
+            name='translatedstring',
+            order_with_respect_to=None,
+        ),
+        migrations.AlterModelOptions(
+            name='translatedstring',
+            options={'ordering': ('position',)},
+        ),
+        migrations.RunPython(create_partial_indexes(PARTIAL_INDEXES), drop_partial_indexes(PARTIAL_INDEXES)),
+    ]
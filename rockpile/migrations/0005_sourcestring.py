@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+from rockpile.migrations._partial_indexes import create_partial_indexes, drop_partial_indexes
+
+
+# Partial indexes of 0004
+OLD_PARTIAL_INDEXES = [
+    ('rockpile_ts_keys_idx', 'TranslatedString', ['translation_id', 'position'], 'key_id IS NULL'),
+    ('rockpile_ts_not_validated_idx', 'TranslatedString', ['translation_id', 'position'],
+     'key_id IS NOT NULL AND validated_by_id IS NULL'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rockpile', '0004_translatedstring_position'),
+    ]
+
+    # The strings move to the new key in three migrations, each one in its own
+    # transaction: PostgreSQL does not allow altering a table with pending deferred
+    # constraint checks from the data changes. SQLite rebuilds the table when altering
+    # it, which loses the partial indexes, so they are dropped here and created again
+    # at the end of 0005_sourcestring_key.
+    operations = [
+        migrations.RunPython(drop_partial_indexes(OLD_PARTIAL_INDEXES), create_partial_indexes(OLD_PARTIAL_INDEXES)),
+        migrations.CreateModel(
+            name='SourceString',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('value', models.TextField(verbose_name='Source value')),
+                ('hash', models.CharField(max_length=40, editable=False, verbose_name='Hash')),
+                ('project', models.ForeignKey(verbose_name='Project', to='rockpile.TranslationProject')),
+            ],
+            options={
+                'ordering': ('pk',),
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='sourcestring',
+            unique_together=set([('project', 'hash')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='translatedstring',
+            index_together=set([('translation', 'validated_by'), ('translation', 'position', 'id')]),
+        ),
+        migrations.AddField(
+            model_name='translatedstring',
+            name='source',
+            field=models.ForeignKey(to='rockpile.SourceString', null=True),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+
+from django.db import migrations
+
+
+POSITION_GAP = 1024
+
+
+def move_main_strings_to_sources(apps, schema_editor):
+    SourceString = apps.get_model('rockpile', 'SourceString')
+    TranslatedString = apps.get_model('rockpile', 'TranslatedString')
+    TranslationProject = apps.get_model('rockpile', 'TranslationProject')
+
+    for project_id in TranslationProject.objects.values_list('pk', flat=True):
+        main_strings = {}
+        for pk, value in TranslatedString.objects.filter(translation__project=project_id, key__isnull=True).values_list(
+                'pk', 'value'):
+            main_strings.setdefault(value, []).append(pk)
+
+        SourceString.objects.bulk_create([
+            SourceString(project_id=project_id, value=value, hash=hashlib.sha1(value.encode('utf-8')).hexdigest())
+            for value in main_strings
+        ])
+
+        for source_id, value in SourceString.objects.filter(project=project_id).values_list('pk', 'value'):
+            TranslatedString.objects.filter(key__in=main_strings[value]).update(source=source_id)
+
+    # Main strings are no longer needed, their translated strings are detached first so
+    # they are not deleted in cascade
+    TranslatedString.objects.filter(key__isnull=False).update(key=None)
+    TranslatedString.objects.filter(source__isnull=True).delete()
+
+
+def move_sources_to_main_strings(apps, schema_editor):
+    TranslatedString = apps.get_model('rockpile', 'TranslatedString')
+
+    for string in TranslatedString.objects.filter(source__isnull=False).select_related('source'):
+        main_string = TranslatedString.objects.create(value=string.source.value, translation_id=string.translation_id,
+                                                      position=string.position - POSITION_GAP // 2)
+        TranslatedString.objects.filter(pk=string.pk).update(key=main_string)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rockpile', '0005_sourcestring'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_main_strings_to_sources, move_sources_to_main_strings),
+    ]
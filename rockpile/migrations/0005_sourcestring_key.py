@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+from rockpile.migrations._partial_indexes import create_partial_indexes, drop_partial_indexes
+
+
+# Every translated string has a key now
+PARTIAL_INDEXES = [
+    ('rockpile_ts_not_validated_idx', 'TranslatedString', ['translation_id', 'position'], 'validated_by_id IS NULL'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rockpile', '0005_sourcestring_copy'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='translatedstring',
+            name='key',
+        ),
+        migrations.RenameField(
+            model_name='translatedstring',
+            old_name='source',
+            new_name='key',
+        ),
+        migrations.AlterField(
+            model_name='translatedstring',
+            name='key',
+            field=models.ForeignKey(verbose_name='Translation key', to='rockpile.SourceString'),
+        ),
+        migrations.AlterIndexTogether(
+            name='translatedstring',
+            index_together=set([('translation', 'key'), ('translation', 'validated_by'),
+                                ('translation', 'position', 'id')]),
+        ),
+        migrations.RunPython(create_partial_indexes(PARTIAL_INDEXES), drop_partial_indexes(PARTIAL_INDEXES)),
+    ]
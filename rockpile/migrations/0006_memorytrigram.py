@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 10:15
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils.encoding import force_text
+
+
+# Trigram rows per INSERT
+BATCH_SIZE = 5000
+
+
+def trigrams(value):
+    text = u' %s ' % u' '.join(force_text(value).lower().split())
+    return set(text[index:index + 3] for index in range(len(text) - 2))
+
+
+def index_validated_strings(apps, schema_editor):
+    MemoryTrigram = apps.get_model('rockpile', 'MemoryTrigram')
+    TranslatedString = apps.get_model('rockpile', 'TranslatedString')
+
+    # The strings are streamed and the trigrams inserted in batches, like
+    # MemoryTrigramManager.index
+    batch = []
+    for pk, language, value in TranslatedString.objects.filter(validated_by__isnull=False).order_by().values_list(
+            'pk', 'translation__language', 'key__value').iterator():
+        string_trigrams = trigrams(value)
+        batch.extend(MemoryTrigram(string_id=pk, language=language, trigram=trigram, num_trigrams=len(string_trigrams))
+                     for trigram in string_trigrams)
+
+        if len(batch) >= BATCH_SIZE:
+            MemoryTrigram.objects.bulk_create(batch)
+            batch = []
+
+    if batch:
+        MemoryTrigram.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rockpile', '0005_sourcestring_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemoryTrigram',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(max_length=7, verbose_name='Language')),
+                ('trigram', models.CharField(max_length=3, verbose_name='Trigram')),
+                ('num_trigrams', models.PositiveIntegerField(verbose_name='Number of trigrams of the source')),
+                ('string', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rockpile.TranslatedString', verbose_name='Translated string')),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='memorytrigram',
+            index_together=set([('language', 'trigram', 'num_trigrams', 'string')]),
+        ),
+        migrations.RunPython(index_validated_strings, migrations.RunPython.noop),
+    ]
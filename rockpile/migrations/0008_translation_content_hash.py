@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+import struct
+
+from django.db import migrations, models
+
+
+def string_content_hash(key_id, value):
+    return struct.unpack('>I', hashlib.sha1((u'%d:%s' % (key_id, value)).encode('utf-8')).digest()[:4])[0]
+
+
+def compute_content_hashes(apps, schema_editor):
+    Translation = apps.get_model('rockpile', 'Translation')
+    TranslatedString = apps.get_model('rockpile', 'TranslatedString')
+
+    for translation_id in Translation.objects.values_list('pk', flat=True):
+        content_hash = sum(string_content_hash(key_id, value) for key_id, value in
+                           TranslatedString.objects.filter(translation=translation_id).values_list('key_id', 'value'))
+        Translation.objects.filter(pk=translation_id).update(content_hash=content_hash)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rockpile', '0007_translatedstring_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translation',
+            name='content_hash',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Content hash'),
+        ),
+        migrations.RunPython(compute_content_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 10:28
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rockpile', '0008_translation_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedString',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('claim', models.CharField(blank=True, editable=False, max_length=32, verbose_name='Claim')),
+                ('lease_expires', models.DateTimeField(editable=False, null=True, verbose_name='Lease expires')),
+                ('claimed_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='rockpile.Translator', verbose_name='Claimed by')),
+                ('key', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rockpile.SourceString', verbose_name='Translation key')),
+                ('translation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rockpile.Translation', verbose_name='Translation')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='queuedstring',
+            unique_together=set([('translation', 'key')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='queuedstring',
+            index_together=set([('translation', 'id')]),
+        ),
+    ]
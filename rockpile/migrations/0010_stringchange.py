@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def record_existing_strings(apps, schema_editor):
+    StringChange = apps.get_model('rockpile', 'StringChange')
+    Translation = apps.get_model('rockpile', 'Translation')
+    TranslatedString = apps.get_model('rockpile', 'TranslatedString')
+
+    # The log of every translation starts with its current strings
+    for translation_id in Translation.objects.values_list('pk', flat=True):
+        strings = TranslatedString.objects.filter(translation=translation_id).order_by('position', 'pk').values_list(
+            'key__value', 'value')
+        StringChange.objects.bulk_create([
+            StringChange(translation_id=translation_id, revision=index + 1, key=key, value=value)
+            for index, (key, value) in enumerate(strings)
+        ])
+        Translation.objects.filter(pk=translation_id).update(revision=len(strings))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rockpile', '0009_queuedstring'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translation',
+            name='revision',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Revision'),
+        ),
+        migrations.AddField(
+            model_name='translation',
+            name='compacted_revision',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Compacted revision'),
+        ),
+        migrations.CreateModel(
+            name='StringChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('revision', models.BigIntegerField(verbose_name='Revision')),
+                ('key', models.TextField(verbose_name='Translation key')),
+                ('value', models.TextField(null=True, verbose_name='Translation value')),
+                ('translation', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING,
+                                                  to='rockpile.Translation', verbose_name='Translation')),
+            ],
+            options={
+                'ordering': ('revision',),
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='stringchange',
+            unique_together=set([('translation', 'revision')]),
+        ),
+        migrations.RunPython(record_existing_strings, migrations.RunPython.noop),
+    ]
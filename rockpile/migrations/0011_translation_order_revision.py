@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rockpile', '0010_stringchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translation',
+            name='order_revision',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Order revision'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+from rockpile.migrations._search import SEARCH_DOCUMENT, SEARCH_INDEX_NAME, create_search_index
+
+
+def recreate_postgresql_index(document):
+    """
+    Returns a RunPython function that replaces the PostgreSQL search index with one of
+    another document expression, SQLite does not parse markup
+    """
+
+    def recreate(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+
+        schema_editor.execute('DROP INDEX %s' % schema_editor.quote_name(SEARCH_INDEX_NAME))
+        create_search_index(apps, schema_editor, document)
+    return recreate
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rockpile', '0011_translation_order_revision'),
+    ]
+
+    # Words inside markup were left out of the index of 0007
+    operations = [
+        migrations.RunPython(recreate_postgresql_index(SEARCH_DOCUMENT), recreate_postgresql_index('{value}')),
+    ]
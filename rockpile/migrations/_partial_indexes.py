@@ -0,0 +1,46 @@
+'''
+Helpers to manage the partial indexes of rockpile in migrations.
+
+Django can not declare partial indexes, they are created with raw SQL on the
+backends that support them. SQLite rebuilds a table when altering it and loses them,
+so migrations altering a table with partial indexes drop them first and create them
+again at the end.
+
+Indexes are given as ``(name, model_name, columns, condition)`` tuples.
+'''
+
+PARTIAL_INDEX_VENDORS = ('postgresql', 'sqlite')
+
+
+def create_partial_indexes(indexes):
+    """
+    Returns a RunPython function that creates the indexes
+    """
+
+    def create(apps, schema_editor):
+        if schema_editor.connection.vendor not in PARTIAL_INDEX_VENDORS:
+            return
+
+        for name, model_name, columns, condition in indexes:
+            db_table = apps.get_model('rockpile', model_name)._meta.db_table
+            schema_editor.execute('CREATE INDEX %s ON %s (%s) WHERE %s' % (
+                schema_editor.quote_name(name),
+                schema_editor.quote_name(db_table),
+                ', '.join(schema_editor.quote_name(column) for column in columns),
+                condition,
+            ))
+    return create
+
+
+def drop_partial_indexes(indexes):
+    """
+    Returns a RunPython function that drops the indexes
+    """
+
+    def drop(apps, schema_editor):
+        if schema_editor.connection.vendor not in PARTIAL_INDEX_VENDORS:
+            return
+
+        for index in indexes:
+            schema_editor.execute('DROP INDEX %s' % schema_editor.quote_name(index[0]))
+    return drop
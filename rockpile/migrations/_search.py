@@ -0,0 +1,61 @@
+'''
+Helpers to manage the full-text search index of translated strings in migrations.
+
+PostgreSQL indexes ``to_tsvector('simple', <document>)`` with a GIN expression index,
+which the database keeps up to date on every write. The document is the value with
+``<`` and ``>`` replaced by control characters, otherwise the parser takes markup for
+tags and leaves its words out. SQLite keeps an FTS5 external content
+table in sync with triggers. A table rebuild drops the triggers, so migrations altering
+the translated strings table drop the search index first and create it again at the
+end, like the partial indexes (see ``_partial_indexes``).
+
+See :mod:`rockpile.search` for the queries.
+'''
+
+SEARCH_INDEX_NAME = 'rockpile_ts_search_idx'
+# PostgreSQL document of a value, see rockpile.search
+SEARCH_DOCUMENT = "translate({value}, '<>', chr(14) || chr(15))"
+SEARCH_TABLE_NAME = 'rockpile_translatedstring_fts'
+SEARCH_TRIGGERS = {
+    'rockpile_ts_search_insert': 'AFTER INSERT ON {table} BEGIN {insert}; END',
+    'rockpile_ts_search_delete': 'AFTER DELETE ON {table} BEGIN {delete}; END',
+    'rockpile_ts_search_update': 'AFTER UPDATE OF value ON {table} BEGIN {delete}; {insert}; END',
+}
+
+
+def create_search_index(apps, schema_editor, document=SEARCH_DOCUMENT):
+    quote_name = schema_editor.quote_name
+    db_table = apps.get_model('rockpile', 'TranslatedString')._meta.db_table
+
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("CREATE INDEX %s ON %s USING GIN (to_tsvector('simple', %s))" % (
+            quote_name(SEARCH_INDEX_NAME), quote_name(db_table), document.format(value=quote_name('value'))))
+
+    elif schema_editor.connection.vendor == 'sqlite':
+        search_table = quote_name(SEARCH_TABLE_NAME)
+        schema_editor.execute("CREATE VIRTUAL TABLE %s USING fts5(value, content=%s, content_rowid='id')" % (
+            search_table, quote_name(db_table)))
+
+        statements = {
+            'table': quote_name(db_table),
+            'insert': 'INSERT INTO %s (rowid, value) VALUES (new.id, new.value)' % search_table,
+            'delete': "INSERT INTO %s (%s, rowid, value) VALUES ('delete', old.id, old.value)" % (search_table,
+                                                                                                  search_table),
+        }
+        for name, trigger in sorted(SEARCH_TRIGGERS.items()):
+            schema_editor.execute('CREATE TRIGGER %s %s' % (quote_name(name), trigger.format(**statements)))
+
+        # Indexes the existing strings
+        schema_editor.execute("INSERT INTO %s (%s) VALUES ('rebuild')" % (search_table, search_table))
+
+
+def drop_search_index(apps, schema_editor):
+    quote_name = schema_editor.quote_name
+
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX %s' % quote_name(SEARCH_INDEX_NAME))
+
+    elif schema_editor.connection.vendor == 'sqlite':
+        for name in sorted(SEARCH_TRIGGERS):
+            schema_editor.execute('DROP TRIGGER %s' % quote_name(name))
+        schema_editor.execute('DROP TABLE %s' % quote_name(SEARCH_TABLE_NAME))
@@ -4,15 +4,56 @@ Translation models for rockpile
 
 '''
 
-from django.db import models
+import hashlib
+import math
+import struct
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import (Case, Count, Exists, ExpressionWrapper, F, FloatField, Max, Min, OuterRef, Q, Value,
+                              When)
 from django.conf.global_settings import LANGUAGES
 from django.conf import settings
+from django.utils import timezone
+from django.utils.encoding import force_text
 from django.utils.translation import ugettext_lazy as _
 
 
 # Translated list of languages (#TODO: I'm not completeley sure if this works...)
 TRANSLATED_LANGUAGES = [(lang_code, _(lang_name)) for lang_code, lang_name in LANGUAGES]
 
+# Distance between consecutive strings, strings can be inserted between two others
+# without touching any other row until the gap is exhausted
+POSITION_GAP = 1024
+
+# Rows per UPDATE statement when renumbering, each row takes three parameters and SQLite allows 999
+RENUMBER_BATCH_SIZE = 300
+
+# Hashes per lookup query of source strings, SQLite allows 999 parameters
+SOURCE_BATCH_SIZE = 900
+
+# Trigram rows per INSERT when indexing the translation memory
+MEMORY_BATCH_SIZE = 5000
+
+# Untranslated strings handed to a translator per claim of the work queue
+CLAIM_BATCH_SIZE = 20
+
+# Changes per DELETE statement when compacting the revision log, SQLite allows 999 parameters
+COMPACT_BATCH_SIZE = 900
+
+# Result of StringChangeManager.delta: last revision, whether the client has to replace
+# its catalog and the changed strings
+Delta = namedtuple('Delta', ['revision', 'reset', 'strings'])
+
+# Result of TranslatedStringManager.validate and unvalidate: number of updated strings
+# and their translations with the new counters
+ValidationResult = namedtuple('ValidationResult', ['updated', 'translations'])
+
+# Relations shown next to every string in listings, see TranslatedStringManager.for_display
+DISPLAY_RELATED_FIELDS = ('key', 'validated_by__user')
+
 
 class Translator(models.Model):
     """
@@ -39,29 +80,148 @@ class TranslationProject(models.Model):
     owner = models.ForeignKey(Owner)
     name = models.CharField(_('Project name'), max_length=255)
 
+    def add_language(self, language, translators=None, source=None):
+        """
+        Adds a translation for a language to this project, see ``rockpile.cloning.add_language``
 
-class TranslatedStringManager(models.Manager):
+        :param language: Language code of the new translation
+        :type language: str
+        :param translators: Translators of the new translation
+        :type translators: list
+        :param source: Translation whose strings are copied into the new one
+        :type source: rockpile.models.Translation
+        """
 
-    def strings(self, translation):
+        from rockpile.cloning import add_language
+
+        return add_language(self, language, translators, source)
+
+
+def source_hash(value):
+    """
+    Returns the hex digest that identifies a source string within its project
+    """
+
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+
+def string_content_hash(key_id, value):
+    """
+    Returns the contribution of a translated string to the content hash of its
+    translation, a 32 bits integer
+    """
+
+    return struct.unpack('>I', hashlib.sha1((u'%d:%s' % (key_id, value)).encode('utf-8')).digest()[:4])[0]
+
+
+def counted_state(translation_id, key_id, validated_by_id, value):
+    """
+    Returns how a string counts towards the denormalized data of its translation,
+    see ``TranslatedString.counted_state``
+    """
+
+    return (translation_id, int(key_id is not None), int(validated_by_id is not None),
+            string_content_hash(key_id, value) if key_id is not None else 0)
+
+
+class SourceStringManager(models.Manager):
+
+    def for_translation(self, translation):
         """
-        Returns a queryset with translated strings
+        Returns a queryset with the source strings translated in a translation
+        """
+
+        return self.get_queryset().filter(pk__in=TranslatedString.objects.filter(translation=translation).values('key'))
+
+    def untranslated(self, translation):
+        """
+        Returns a queryset with the source strings of the project of a translation that
+        are not translated in it yet, using a single anti-join
+        """
+
+        translated = TranslatedString.objects.filter(translation=translation, key=OuterRef('pk'))
+        return self.get_queryset().filter(project__translation=translation).annotate(
+            translated=Exists(translated)).filter(translated=False)
+
+    def for_values(self, project, values):
         """
+        Returns a ``{value: pk}`` mapping with the source strings of a project for the
+        given values, creating the missing ones with bulk queries
 
-        return self.get_queryset().filter(translation=translation, key__isnull=False)
+        :param project: Project instance or primary key
+        :type project: rockpile.models.TranslationProject or int
+        :param values: Source texts
+        :type values: iterable
+        """
+
+        project_id = getattr(project, 'pk', project)
+        hashes = dict((source_hash(value), value) for value in values)
+        sources = self._lookup(project_id, list(hashes))
+
+        missing = [value for value in hashes.values() if value not in sources]
+        if missing:
+            try:
+                with transaction.atomic():
+                    self.bulk_create([SourceString(project_id=project_id, value=value, hash=source_hash(value))
+                                      for value in missing])
+            except IntegrityError:
+                # Another import of the same project created some of them meanwhile
+                for value in missing:
+                    self.get_or_create(project_id=project_id, hash=source_hash(value), defaults={'value': value})
+
+            # bulk_create does not set primary keys on every backend
+            sources.update(self._lookup(project_id, [source_hash(value) for value in missing]))
+
+        return sources
+
+    def _lookup(self, project_id, hashes):
+        sources = {}
+        for start in range(0, len(hashes), SOURCE_BATCH_SIZE):
+            sources.update(self.get_queryset().filter(
+                project=project_id, hash__in=hashes[start:start + SOURCE_BATCH_SIZE]).values_list('value', 'pk'))
+        return sources
+
+
+class SourceString(models.Model):
+    """
+    Represents a text to translate. Source strings belong to a project and are shared
+    by all of its translations, a text is stored once per project.
+
+    The text can not be edited once saved: catalogs, exports, the revision log and the
+    translation memory refer to it. A different text is a new source string.
+    """
 
-    def keys(self, translation):
+    project = models.ForeignKey(TranslationProject, verbose_name=_("Project"))
+    value = models.TextField(_("Source value"))
+    hash = models.CharField(_("Hash"), max_length=40, editable=False)
+    objects = SourceStringManager()
+
+    class Meta:
+        ordering = ('pk',)
+        unique_together = [['project', 'hash']]
+
+    def save(self, *args, **kwargs):
+        self.hash = source_hash(self.value)
+        if self.pk is not None and SourceString.objects.filter(pk=self.pk).exclude(hash=self.hash).exists():
+            raise ValueError('The value of a source string can not be changed')
+        super(SourceString, self).save(*args, **kwargs)
+
+
+class TranslatedStringManager(models.Manager):
+
+    def strings(self, translation):
         """
-        Returns a queryset with "main" strings
+        Returns a queryset with translated strings
         """
 
-        return self.get_queryset().filter(translation=translation, key__isnull=True)
+        return self.get_queryset().filter(translation=translation)
 
     def validated(self, translation):
         """
         Returns a queryset with validated strings
         """
 
-        return self.get_queryset().filter(translation=translation).exclude(validated_by__isnull=True)
+        return self.get_queryset().filter(translation=translation, validated_by__isnull=False)
 
     def not_validated(self, translation):
         """
@@ -70,39 +230,392 @@ class TranslatedStringManager(models.Manager):
 
         return self.strings(translation).filter(validated_by__isnull=True)
 
+    def for_display(self, translation):
+        """
+        Returns a queryset with all the strings of a translation that fetches their keys,
+        validators and validator users in the same query, so listing them takes a single
+        query no matter how many strings there are
+        """
+
+        return self.get_queryset().filter(translation=translation).select_related(*DISPLAY_RELATED_FIELDS)
+
+    def astrings(self, translation):
+        """
+        Awaitable list of ``strings``, see :mod:`rockpile.aio`
+        """
+
+        from rockpile.aio import alist
+
+        return alist(self.strings(translation))
+
+    def avalidated(self, translation):
+        """
+        Awaitable list of ``validated``, see :mod:`rockpile.aio`
+        """
+
+        from rockpile.aio import alist
+
+        return alist(self.validated(translation))
+
+    def anot_validated(self, translation):
+        """
+        Awaitable list of ``not_validated``, see :mod:`rockpile.aio`
+        """
+
+        from rockpile.aio import alist
+
+        return alist(self.not_validated(translation))
+
+    def afor_display(self, translation):
+        """
+        Awaitable list of ``for_display``, see :mod:`rockpile.aio`
+        """
+
+        from rockpile.aio import alist
+
+        return alist(self.for_display(translation))
+
+    def last_position(self, translation):
+        """
+        Returns the position of the last string of a translation or 0 if it is empty
+        """
+
+        return self.get_queryset().filter(translation=translation).aggregate(Max('position'))['position__max'] or 0
+
+    def renumber(self, translation):
+        """
+        Spreads the positions of the strings of a translation ``POSITION_GAP`` apart,
+        keeping their order. It is only needed when there is no room left between
+        two strings.
+        """
+
+        with transaction.atomic():
+            pks = list(self.get_queryset().filter(translation=translation).order_by('position', 'pk').values_list(
+                'pk', flat=True))
+
+            for start in range(0, len(pks), RENUMBER_BATCH_SIZE):
+                batch = pks[start:start + RENUMBER_BATCH_SIZE]
+                whens = [When(pk=pk, then=Value((start + index + 1) * POSITION_GAP))
+                         for index, pk in enumerate(batch)]
+                self.get_queryset().filter(pk__in=batch).update(
+                    position=Case(*whens, output_field=models.BigIntegerField()))
+
+            Translation.objects.reordered(translation)
+
+    def validate(self, pks, translator):
+        """
+        Validates many strings with a single ``UPDATE``, the queries do not depend on
+        the number of strings or translations. Only the strings of the translations of
+        ``translator`` that are not validated yet are updated.
+
+        The counters are updated in the same transaction and returned with the
+        affected translations, so ``percentage_completed`` does not need a new query.
+
+        Usage:
+
+        >>> result = TranslatedString.objects.validate([1, 2, 3], translator)
+        >>> result.updated, result.translations[0].percentage_completed
+        (3, 75.0)
+
+        :param pks: Primary keys of the strings
+        :type pks: list
+        :param translator: Translator that validates the strings
+        :type translator: rockpile.models.Translator
+        """
+
+        return self._set_validated_by(pks, translator, translator)
+
+    def unvalidate(self, pks, translator):
+        """
+        Removes the validation of many strings, see ``validate``
+
+        :param pks: Primary keys of the strings
+        :type pks: list
+        :param translator: Translator that removes the validation, it must be a
+                           translator of the translations of the strings
+        :type translator: rockpile.models.Translator
+        """
+
+        return self._set_validated_by(pks, translator, None)
+
+    def _set_validated_by(self, pks, translator, validated_by):
+        queryset = self.get_queryset().filter(pk__in=pks, translation__translators=translator,
+                                              validated_by__isnull=validated_by is not None)
+
+        with transaction.atomic():
+            # The rows are locked, so the changes are those of the strings updated below
+            # even if other transactions change them meanwhile
+            rows = list(queryset.select_for_update().order_by('pk').values_list('pk', 'translation', 'key_id',
+                                                                              'value'))
+            if not rows:
+                return ValidationResult(0, [])
+
+            locked_pks = [pk for pk, _, _, _ in rows]
+            sources = dict(SourceString.objects.filter(pk__in=set(key_id for _, _, key_id, _ in rows)).values_list(
+                'pk', 'value'))
+            changes = {}
+            for _, translation_id, key_id, value in rows:
+                changes.setdefault(translation_id, []).append((sources[key_id], value))
+
+            updated = self.get_queryset().filter(pk__in=locked_pks).update(validated_by=validated_by)
+
+            # The bookkeeping of every translation is grouped, the queries do not grow
+            # with the number of translations
+            sign = 1 if validated_by is not None else -1
+            Translation.objects.filter(pk__in=changes).update(num_validated_strings=F('num_validated_strings') + Case(
+                *[When(pk=translation_id, then=Value(sign * len(strings)))
+                  for translation_id, strings in changes.items()],
+                output_field=models.IntegerField()))
+            StringChange.objects.record_many(changes)
+
+            # Bulk updates skip the receivers that maintain the translation memory, only
+            # the strings whose validation changed are indexed or unindexed
+            if validated_by is not None:
+                MemoryTrigram.objects.index(self.get_queryset().filter(pk__in=locked_pks))
+            else:
+                MemoryTrigram.objects.unindex(locked_pks)
+
+            translations = list(Translation.objects.filter(pk__in=changes).order_by('pk'))
+
+        return ValidationResult(updated, translations)
+
 
 class TranslatedString(models.Model):
     """
     Represents the lowest level of the translation, a single string.
 
-    A string is linked to a translation and also has a reference to another string that
-    will act as the "key" of the translated string.
+    A string is linked to a translation and to the source string of its project that
+    acts as the "key" of the translated string.
 
     A string may be validated by a translator.
     """
 
-    key = models.ForeignKey("self", verbose_name=_("Translation key"), db_index=True, null=True)
+    key = models.ForeignKey(SourceString, verbose_name=_("Translation key"))
     value = models.TextField(_("Translation value"))
     translation = models.ForeignKey("Translation", verbose_name=_("Translation"))
     validated_by = models.ForeignKey(Translator, verbose_name=_("Validated by"), null=True)
+    position = models.BigIntegerField(_("Position"), editable=False)
     objects = TranslatedStringManager()
 
     class Meta:
-        order_with_respect_to = 'translation'
+        ordering = ('position',)
+        # Match the filters of TranslatedStringManager, see also the partial indexes in migrations
+        index_together = [
+            ['translation', 'key'],
+            ['translation', 'validated_by'],
+            # Ordered lists and keyset pagination (see rockpile.pagination), the pk breaks ties
+            ['translation', 'position', 'id'],
+        ]
+
+    def save(self, *args, **kwargs):
+        # New strings go to the end of their translation
+        if self.position is None:
+            self.position = TranslatedString.objects.last_position(self.translation_id) + POSITION_GAP
+
+        super(TranslatedString, self).save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers how the loaded string counts towards the denormalized data of its translation
+        """
+
+        instance = super(TranslatedString, cls).from_db(db, field_names, values)
+        instance._track_counted_state(field_names)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super(TranslatedString, self).refresh_from_db(using=using, fields=fields, **kwargs)
+        self._track_counted_state(fields)
+
+    def _track_counted_state(self, field_names=None):
+        """
+        Stores the values used by the denormalized data, see ``counted_state``
+        """
+
+        if field_names is None or set(field_names).issuperset(['translation_id', 'key_id', 'validated_by_id',
+                                                                'value']):
+            self._counted_state = self.counted_state
+            # The revision log records the removal of the stored key when it changes
+            self._stored_key = (self.translation_id, self.key_id)
+
+    @property
+    def counted_state(self):
+        """
+        Returns how this string counts towards the progress counters and content hash
+        of its translation as a ``(translation_id, strings, validated_strings, content_hash)``
+        tuple
+        """
+
+        return counted_state(self.translation_id, self.key_id, self.validated_by_id, self.value)
 
     @property
     def is_validated(self):
         """
         Shortcut method to check if a string has been validated
         """
-        return bool(self.validated_by)
+        return self.validated_by_id is not None
 
-    @property
-    def is_main_string(self):
+    def move_after(self, other=None):
+        """
+        Moves the string right after another string of its translation, or to the
+        beginning if ``other`` is None.
+
+        Only this string is updated, unless there is no room left between both strings
+        and the translation has to be renumbered. Unsaved strings just get the position
+        and are inserted there when saved.
+
+        :param other: String that will precede this one
+        :type other: rockpile.models.TranslatedString
+        """
+
+        others = TranslatedString.objects.filter(translation=self.translation_id)
+        if self.pk is not None:
+            others = others.exclude(pk=self.pk)
+
+        while True:
+            previous = 0
+            if other is not None:
+                previous = TranslatedString.objects.filter(pk=other.pk).values_list('position', flat=True).get()
+
+            following = others.filter(position__gt=previous).aggregate(Min('position'))['position__min']
+            if following is None:
+                self.position = previous + POSITION_GAP
+                break
+            elif following - previous > 1:
+                self.position = (previous + following) // 2
+                break
+
+            TranslatedString.objects.renumber(self.translation_id)
+
+        if self.pk is not None:
+            TranslatedString.objects.filter(pk=self.pk).update(position=self.position)
+            Translation.objects.reordered(self.translation_id)
+
+    def move_before(self, other):
+        """
+        Moves the string right before another string of its translation, see ``move_after``
+
+        :param other: String that will follow this one
+        :type other: rockpile.models.TranslatedString
+        """
+
+        others = TranslatedString.objects.filter(translation=self.translation_id)
+        if self.pk is not None:
+            others = others.exclude(pk=self.pk)
+
+        position = TranslatedString.objects.filter(pk=other.pk).values_list('position', flat=True).get()
+        self.move_after(others.filter(position__lt=position).order_by('-position').first())
+
+
+class TranslationManager(models.Manager):
+
+    def update_counters(self, translation, strings=0, validated_strings=0, content_hash=0):
+        """
+        Atomically adds the given amounts to the progress counters and content hash of
+        a translation
+
+        :param translation: Translation instance or primary key
+        :type translation: rockpile.models.Translation or int
+        :param strings: Amount added to ``num_strings``
+        :type strings: int
+        :param validated_strings: Amount added to ``num_validated_strings``
+        :type validated_strings: int
+        :param content_hash: Amount added to ``content_hash``, see ``string_content_hash``
+        :type content_hash: int
+        """
+
+        if not strings and not validated_strings and not content_hash:
+            return
+
+        translation_id = getattr(translation, 'pk', translation)
+        self.get_queryset().filter(pk=translation_id).update(
+            num_strings=F('num_strings') + strings,
+            num_validated_strings=F('num_validated_strings') + validated_strings,
+            content_hash=F('content_hash') + content_hash,
+        )
+
+        # Keeps the instance in memory in sync with the database
+        if isinstance(translation, Translation):
+            translation.num_strings += strings
+            translation.num_validated_strings += validated_strings
+            translation.content_hash += content_hash
+
+    def reordered(self, translation):
+        """
+        Atomically bumps the order revision of a translation after its strings moved
+
+        :param translation: Translation instance or primary key
+        :type translation: rockpile.models.Translation or int
+        """
+
+        translation_id = getattr(translation, 'pk', translation)
+        self.get_queryset().filter(pk=translation_id).update(order_revision=F('order_revision') + 1)
+
+        if isinstance(translation, Translation):
+            translation.order_revision += 1
+
+    def rebuild_counters(self, queryset=None):
+        """
+        Recomputes the progress counters and content hash from scratch to fix any drift,
+        returns the number of translations whose counters were wrong
+
+        :param queryset: Translations to rebuild, all of them by default
+        :type queryset: django.db.models.query.QuerySet
+        """
+
+        from rockpile.instrumentation import instrument
+
+        if queryset is None:
+            queryset = self.get_queryset()
+
+        rebuilt = 0
+        with instrument('completion.rebuild') as operation:
+            for translation in self.with_completion().filter(pk__in=queryset.values('pk')):
+                # The content hash can not be computed with SQL
+                content_hash = sum(string_content_hash(key_id, value) for key_id, value in
+                                   TranslatedString.objects.strings(translation).order_by().values_list(
+                                       'key_id', 'value').iterator())
+
+                stored = (translation.num_strings, translation.num_validated_strings, translation.content_hash)
+                if stored != (translation.total_strings, translation.validated_strings, content_hash):
+                    self.get_queryset().filter(pk=translation.pk).update(
+                        num_strings=translation.total_strings,
+                        num_validated_strings=translation.validated_strings,
+                        content_hash=content_hash,
+                    )
+                    rebuilt += 1
+            operation.rows = rebuilt
+
+        return rebuilt
+
+    def awith_completion(self):
         """
-        Shortcut method to check if a string is the original string to translate
+        Awaitable list of ``with_completion``, see :mod:`rockpile.aio`
         """
-        return self.key is None
+
+        from rockpile.aio import alist
+
+        return alist(self.with_completion())
+
+    def with_completion(self):
+        """
+        Returns a queryset annotated with the completion stats of every translation
+        using a single grouped query:
+
+        * ``total_strings``: number of translated strings
+        * ``validated_strings``: number of validated strings
+        * ``completion``: percentage of completion
+        """
+
+        percentage = ExpressionWrapper(F('validated_strings') * 100.0 / F('total_strings'), output_field=FloatField())
+
+        return self.get_queryset().annotate(
+            total_strings=Count('translatedstring__key'),
+            validated_strings=Count('translatedstring__validated_by'),
+        ).annotate(
+            completion=Case(When(total_strings=0, then=Value(0.0)), default=percentage, output_field=FloatField()),
+        )
 
 
 class Translation(models.Model):
@@ -114,6 +627,16 @@ class Translation(models.Model):
     language = models.CharField(_("Language"), max_length=7, choices=TRANSLATED_LANGUAGES)
     translators = models.ManyToManyField(Translator, verbose_name=_("Translators"))
     project = models.ForeignKey(TranslationProject, verbose_name=_("Project"))
+    num_strings = models.PositiveIntegerField(_("Number of strings"), default=0, editable=False)
+    num_validated_strings = models.PositiveIntegerField(_("Number of validated strings"), default=0, editable=False)
+    # Sum of the string_content_hash of the strings, it changes with any key or value
+    content_hash = models.BigIntegerField(_("Content hash"), default=0, editable=False)
+    # Last revision of the revision log and revision of its last compaction, see StringChange
+    revision = models.BigIntegerField(_("Revision"), default=0, editable=False)
+    compacted_revision = models.BigIntegerField(_("Compacted revision"), default=0, editable=False)
+    # Changes whenever strings are moved, the content hash does not depend on their order
+    order_revision = models.BigIntegerField(_("Order revision"), default=0, editable=False)
+    objects = TranslationManager()
 
     @property
     def percentage_completed(self):
@@ -121,9 +644,466 @@ class Translation(models.Model):
         Returns the percentage of completion for this translation
         """
 
-        num_strings = TranslatedString.objects.strings(self).count()
+        # Already computed by TranslationManager.with_completion
+        if hasattr(self, 'completion'):
+            return self.completion
+
+        return self._percentage(self.num_strings, self.num_validated_strings)
+
+    @staticmethod
+    def _percentage(num_strings, num_validated_strings):
         if num_strings:
-            num_validated_strings = TranslatedString.objects.validated(self).count()
             return num_validated_strings * 100.0 / num_strings
         else:
             return 0.0
+
+    def apercentage_completed(self):
+        """
+        Awaitable ``percentage_completed`` with the counters read again from the
+        database, see :mod:`rockpile.aio`
+        """
+
+        from rockpile.aio import run_in_executor
+
+        def percentage_completed():
+            counters = Translation.objects.filter(pk=self.pk).values_list('num_strings', 'num_validated_strings').get()
+            return self._percentage(*counters)
+
+        return run_in_executor(percentage_completed)
+
+    def clone(self, language, translators=False):
+        """
+        Creates a translation for another language with a copy of the strings of this
+        one, see ``rockpile.cloning.clone_translation``
+
+        :param language: Language code of the new translation
+        :type language: str
+        :param translators: Whether the translators are added to the new translation
+        :type translators: bool
+        """
+
+        from rockpile.cloning import clone_translation
+
+        return clone_translation(self, language, translators)
+
+    def import_strings(self, strings):
+        """
+        Imports translatable strings into this translation using bulk queries
+
+        :param strings: Mapping of translation keys to translated values
+        :type strings: rockpile.adapters.TranslatableStrings
+        """
+
+        from rockpile.importers import import_strings
+
+        return import_strings(self, strings)
+
+
+def trigrams(value):
+    """
+    Returns the set of trigrams of a text, compared case insensitively and with its
+    whitespace collapsed
+    """
+
+    text = u' %s ' % u' '.join(force_text(value).lower().split())
+    return set(text[index:index + 3] for index in range(len(text) - 2))
+
+
+class MemoryTrigramManager(models.Manager):
+
+    def index(self, strings):
+        """
+        Adds translated strings to the translation memory, replacing their previous
+        entries. Only validated strings are indexed, their number is returned.
+
+        :param strings: Translated strings to index
+        :type strings: django.db.models.query.QuerySet
+        """
+
+        self.unindex(strings.values('pk'))
+
+        batch = []
+        indexed = 0
+        for pk, language, value in strings.filter(validated_by__isnull=False).order_by().values_list(
+                'pk', 'translation__language', 'key__value').iterator():
+            string_trigrams = trigrams(value)
+            batch.extend(MemoryTrigram(string_id=pk, language=language, trigram=trigram,
+                                       num_trigrams=len(string_trigrams))
+                         for trigram in string_trigrams)
+            indexed += 1
+
+            if len(batch) >= MEMORY_BATCH_SIZE:
+                self.bulk_create(batch)
+                batch = []
+
+        if batch:
+            self.bulk_create(batch)
+
+        return indexed
+
+    def unindex(self, strings):
+        """
+        Removes translated strings from the translation memory
+
+        :param strings: Translated strings or their primary keys
+        :type strings: django.db.models.query.QuerySet or list
+        """
+
+        self.get_queryset().filter(string__in=strings).delete()
+
+    def matches(self, language, value, limit=5, min_similarity=0.5):
+        """
+        Returns the validated strings of a language whose source is the most similar to a
+        text, best first. Every string has a ``similarity`` attribute, the Dice coefficient
+        of both trigram sets (1.0 for equal texts).
+
+        Only the posting lists of the trigrams of the text are read, and sources too short
+        or too long to reach ``min_similarity`` are skipped by the index.
+
+        :param language: Language code of the translations
+        :type language: str
+        :param value: Source text to look up
+        :type value: str
+        :param limit: Maximum number of matches
+        :type limit: int
+        :param min_similarity: Minimum similarity of the matches, between 0 and 1
+        :type min_similarity: float
+        """
+
+        from rockpile.instrumentation import instrument
+
+        value_trigrams = trigrams(value)
+        if not value_trigrams:
+            return []
+
+        with instrument('memory.matches', language=language) as operation:
+            matches = self._matches(language, value_trigrams, limit, min_similarity)
+            operation.rows = len(matches)
+
+        return matches
+
+    def _matches(self, language, value_trigrams, limit, min_similarity):
+        size = len(value_trigrams)
+        queryset = self.get_queryset().filter(language=language, trigram__in=value_trigrams)
+        if min_similarity > 0:
+            # Rounding errors must not discard sources right on the bounds
+            queryset = queryset.filter(num_trigrams__range=(
+                int(math.ceil(size * min_similarity / (2 - min_similarity) - 1e-9)),
+                int(math.floor(size * (2 - min_similarity) / min_similarity + 1e-9)),
+            ))
+
+        similarity = ExpressionWrapper(F('shared') * 2.0 / (F('num_trigrams') + size), output_field=FloatField())
+        candidates = list(queryset.values('string', 'num_trigrams').annotate(shared=Count('pk')).annotate(
+            similarity=similarity).filter(similarity__gte=min_similarity).order_by(
+            '-similarity', 'string').values_list('string', 'similarity')[:limit])
+
+        strings = TranslatedString.objects.select_related('key').in_bulk([pk for pk, _ in candidates])
+        matches = []
+        for pk, string_similarity in candidates:
+            # Deleted after the candidates were read
+            if pk not in strings:
+                continue
+            string = strings[pk]
+            string.similarity = string_similarity
+            matches.append(string)
+        return matches
+
+
+class MemoryTrigram(models.Model):
+    """
+    Entry of the inverted index of the translation memory, a trigram of the source
+    string of a validated translated string. See ``MemoryTrigramManager.matches``.
+    """
+
+    string = models.ForeignKey(TranslatedString, verbose_name=_("Translated string"))
+    language = models.CharField(_("Language"), max_length=7)
+    trigram = models.CharField(_("Trigram"), max_length=3)
+    num_trigrams = models.PositiveIntegerField(_("Number of trigrams of the source"))
+    objects = MemoryTrigramManager()
+
+    class Meta:
+        # Posting list of a trigram, ranged by the size of the sources
+        index_together = [['language', 'trigram', 'num_trigrams', 'string']]
+
+
+class QueuedStringManager(models.Manager):
+
+    def enqueue(self, translation):
+        """
+        Adds the source strings of the project that are not translated in a translation
+        nor queued yet to its work queue, returns how many were added.
+
+        Strings leave the queue when they are translated, call it again after adding
+        source strings to the project or removing translated strings.
+
+        :param translation: Translation instance or primary key
+        :type translation: rockpile.models.Translation or int
+        """
+
+        translation_id = getattr(translation, 'pk', translation)
+        quote_name = connections[self.db].ops.quote_name
+
+        # A single INSERT ... SELECT, the strings are not loaded in Python
+        sql = (
+            "INSERT INTO {queue} (translation_id, key_id, claim) "
+            "SELECT %s, k.id, '' FROM {sources} k "
+            "WHERE k.project_id = (SELECT project_id FROM {translations} WHERE id = %s) "
+            "AND NOT EXISTS (SELECT 1 FROM {strings} s WHERE s.translation_id = %s AND s.key_id = k.id) "
+            "AND NOT EXISTS (SELECT 1 FROM {queue} q WHERE q.translation_id = %s AND q.key_id = k.id) "
+            "ORDER BY k.id"
+        ).format(queue=quote_name(self.model._meta.db_table), sources=quote_name(SourceString._meta.db_table),
+                 translations=quote_name(Translation._meta.db_table),
+                 strings=quote_name(TranslatedString._meta.db_table))
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, [translation_id] * 4)
+            return cursor.rowcount
+
+    def claim(self, translation, translator, limit=CLAIM_BATCH_SIZE):
+        """
+        Claims the next strings of the work queue of a translation for a translator and
+        returns them with their source strings. Claims expire after
+        ``ROCKPILE_CLAIM_LEASE`` seconds (ten minutes), then the strings are handed to
+        other translators again.
+
+        Concurrent claims never wait for each other nor get the same strings, and only
+        the claimed rows are read and written. On PostgreSQL the rows being claimed by
+        other transactions are skipped (``SELECT ... FOR UPDATE SKIP LOCKED``), other
+        databases update the rows only if they are still available, so a claim may
+        return fewer strings when it loses a race.
+
+        Usage:
+
+        >>> [queued.key.value for queued in QueuedString.objects.claim(translation, translator, limit=2)]
+        ['Hello world', 'Testing string']
+
+        :param translation: Translation instance or primary key
+        :type translation: rockpile.models.Translation or int
+        :param translator: Translator that claims the strings
+        :type translator: rockpile.models.Translator
+        :param limit: Maximum number of strings to claim
+        :type limit: int
+        """
+
+        now = timezone.now()
+        lease = timedelta(seconds=getattr(settings, 'ROCKPILE_CLAIM_LEASE', 60 * 10))
+        claim = uuid.uuid4().hex
+
+        available = self.get_queryset().filter(translation=translation).filter(
+            Q(lease_expires__isnull=True) | Q(lease_expires__lte=now))
+
+        with transaction.atomic(using=self.db):
+            candidates = available.order_by('pk')
+            if connections[self.db].features.has_select_for_update_skip_locked:
+                candidates = candidates.select_for_update(skip_locked=True)
+            pks = list(candidates.values_list('pk', flat=True)[:limit])
+
+            # The rows claimed meanwhile by other translators are no longer available
+            available.filter(pk__in=pks).update(claimed_by=translator, claim=claim, lease_expires=now + lease)
+
+        return list(self.get_queryset().filter(pk__in=pks, claim=claim).select_related('key').order_by('pk'))
+
+    def release(self, translation, translator):
+        """
+        Hands the strings of a translation claimed by a translator back to the work
+        queue, returns how many were released
+
+        :param translation: Translation instance or primary key
+        :type translation: rockpile.models.Translation or int
+        :param translator: Translator that claimed the strings
+        :type translator: rockpile.models.Translator
+        """
+
+        return self.get_queryset().filter(translation=translation, claimed_by=translator).update(
+            claimed_by=None, claim='', lease_expires=None)
+
+    def complete(self, translation, keys):
+        """
+        Removes translated source strings from the work queue of a translation
+
+        :param translation: Translation instance or primary key
+        :type translation: rockpile.models.Translation or int
+        :param keys: Source strings or their primary keys
+        :type keys: django.db.models.query.QuerySet or list
+        """
+
+        queryset = self.get_queryset().filter(translation=translation, key__in=keys)
+        queryset._raw_delete(queryset.db)
+
+
+class QueuedString(models.Model):
+    """
+    Entry of the work queue of a translation, a source string that is not translated
+    yet. Translators claim batches of them, see ``QueuedStringManager.claim``.
+    """
+
+    translation = models.ForeignKey(Translation, verbose_name=_("Translation"))
+    key = models.ForeignKey(SourceString, verbose_name=_("Translation key"))
+    claimed_by = models.ForeignKey(Translator, verbose_name=_("Claimed by"), null=True, on_delete=models.SET_NULL)
+    # Identifies the strings taken by one claim
+    claim = models.CharField(_("Claim"), max_length=32, blank=True, editable=False)
+    lease_expires = models.DateTimeField(_("Lease expires"), null=True, editable=False)
+    objects = QueuedStringManager()
+
+    class Meta:
+        unique_together = [['translation', 'key']]
+        # Claims scan the queue of a translation in order, only the strings claimed by
+        # others are skipped before the batch is found
+        index_together = [['translation', 'id']]
+
+
+class StringChangeManager(models.Manager):
+
+    def record(self, translation, changes):
+        """
+        Appends changes of translated strings to the revision log of a translation, each
+        one gets the next revision. Returns the last revision.
+
+        Signal receivers record the changes of single strings, bulk operations call it
+        by themselves.
+
+        :param translation: Translation instance or primary key
+        :type translation: rockpile.models.Translation or int
+        :param changes: ``(source value, translated value)`` pairs, the translated value is
+                        None for removed strings
+        :type changes: list
+        """
+
+        if not changes:
+            return None
+
+        translation_id = getattr(translation, 'pk', translation)
+        return self.record_many({translation_id: changes})[translation_id]
+
+    def record_many(self, changes):
+        """
+        Appends changes to the revision logs of many translations with the same queries
+        as a single one, see ``record``. Returns the last revision of every translation.
+
+        :param changes: Translation primary keys mapped to their ``(source value, translated value)`` pairs
+        :type changes: dict
+        """
+
+        changes = dict((translation_id, pairs) for translation_id, pairs in changes.items() if pairs)
+        if not changes:
+            return {}
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            # The translations stay locked until the end of the transaction, so revisions
+            # are committed in order and clients never skip one
+            Translation.objects.filter(pk__in=changes).update(revision=F('revision') + Case(
+                *[When(pk=translation_id, then=Value(len(pairs))) for translation_id, pairs in changes.items()],
+                output_field=models.BigIntegerField()))
+            revisions = dict(Translation.objects.filter(pk__in=changes).values_list('pk', 'revision'))
+
+            self.bulk_create([
+                StringChange(translation_id=translation_id, revision=revisions[translation_id] - len(pairs) + index + 1,
+                             key=key, value=value)
+                for translation_id, pairs in changes.items()
+                for index, (key, value) in enumerate(pairs)
+            ])
+
+        return revisions
+
+    def delta(self, translation, since=0):
+        """
+        Returns the changes of the catalog of a translation after a revision, reading only
+        the changes after it. ``strings`` maps the source strings that changed to their
+        translated value, or to None when they were removed.
+
+        When ``since`` is older than the last compaction the changes are incomplete, then
+        ``reset`` is True and ``strings`` is the whole catalog, which replaces the one of
+        the client.
+
+        Usage:
+
+        >>> StringChange.objects.delta(translation, since=41)
+        Delta(revision=43, reset=False, strings={'Hello world': 'Hola mundo', 'Old string': None})
+
+        :param translation: Translation instance or primary key
+        :type translation: rockpile.models.Translation or int
+        :param since: Last revision known by the client, 0 for none
+        :type since: int
+        """
+
+        translation_id = getattr(translation, 'pk', translation)
+        revision, compacted_revision = Translation.objects.filter(pk=translation_id).values_list(
+            'revision', 'compacted_revision').get()
+
+        reset = since < compacted_revision or since > revision
+        if reset:
+            since = 0
+
+        strings = {}
+        for change_revision, key, value in self.get_queryset().filter(
+                translation=translation_id, revision__gt=since).order_by('revision').values_list(
+                'revision', 'key', 'value').iterator():
+            strings[key] = value
+            # Changes committed after reading the translation are included too
+            revision = max(revision, change_revision)
+
+        if reset:
+            strings = dict((key, value) for key, value in strings.items() if value is not None)
+
+        return Delta(revision, reset, strings)
+
+    def compact(self, translation, revision=None):
+        """
+        Compacts the changes of a translation up to a revision, the last one by default,
+        into a snapshot: only the last change of the strings that were not removed is
+        kept. Clients that synced before that revision get the whole catalog from
+        ``delta``. Returns the number of deleted changes.
+
+        :param translation: Translation instance or primary key
+        :type translation: rockpile.models.Translation or int
+        :param revision: Last revision to compact
+        :type revision: int
+        """
+
+        translation_id = getattr(translation, 'pk', translation)
+        with transaction.atomic(using=self.db):
+            # Locks the translation, so no change is recorded meanwhile
+            last_revision, compacted_revision = Translation.objects.select_for_update().filter(
+                pk=translation_id).values_list('revision', 'compacted_revision').get()
+            revision = last_revision if revision is None else min(revision, last_revision)
+            if revision <= compacted_revision:
+                return 0
+
+            # Newest first, so a change is obsolete when its string was already seen
+            seen = set()
+            obsolete = []
+            for pk, change_revision, key, value in self.get_queryset().filter(translation=translation_id).order_by(
+                    '-revision').values_list('pk', 'revision', 'key', 'value').iterator():
+                if change_revision <= revision and (key in seen or value is None):
+                    obsolete.append(pk)
+                seen.add(key)
+
+            for start in range(0, len(obsolete), COMPACT_BATCH_SIZE):
+                queryset = self.get_queryset().filter(pk__in=obsolete[start:start + COMPACT_BATCH_SIZE])
+                queryset._raw_delete(queryset.db)
+
+            Translation.objects.filter(pk=translation_id).update(compacted_revision=revision)
+
+        return len(obsolete)
+
+
+class StringChange(models.Model):
+    """
+    Entry of the append-only revision log of a translation: the new translated value of
+    a source string, or None when it was removed. See ``StringChangeManager.delta``.
+    """
+
+    # Changes are recorded while the strings of a deleted translation are deleted, the
+    # log is deleted afterwards by a receiver, see rockpile.receivers
+    translation = models.ForeignKey(Translation, verbose_name=_("Translation"), on_delete=models.DO_NOTHING,
+                                    db_constraint=False)
+    revision = models.BigIntegerField(_("Revision"))
+    # The source value instead of a foreign key, deltas do not need a join and the
+    # changes outlive deleted source strings
+    key = models.TextField(_("Translation key"))
+    value = models.TextField(_("Translation value"), null=True)
+    objects = StringChangeManager()
+
+    class Meta:
+        ordering = ('revision',)
+        unique_together = [['translation', 'revision']]
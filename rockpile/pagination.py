@@ -0,0 +1,88 @@
+'''
+Pagination for the rockpile API
+=================================
+
+Translations may have hundreds of thousands of strings, so they are paginated with
+a keyset (cursor) on ``(translation, position, id)`` instead of ``OFFSET``: every page
+is a range scan over the index no matter how deep it is.
+
+'''
+
+import base64
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class TranslatedStringKeysetPagination(BasePagination):
+    """
+    Keyset pagination for translated strings, the cursor encodes the translation,
+    position and id of the last string of the page
+    """
+
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        """
+        Returns the ``(translation_id, position, id)`` of the request cursor or None
+        """
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            cursor = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            translation_id, position, pk = cursor.split(':')
+            return int(translation_id), int(position), int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, string):
+        cursor = '%d:%d:%d' % (string.translation_id, string.position, string.pk)
+        return base64.urlsafe_b64encode(cursor.encode('ascii')).decode('ascii')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by('translation', 'position', 'pk')
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            translation_id, position, pk = cursor
+            queryset = queryset.filter(Q(translation_id__gt=translation_id) |
+                                       Q(translation_id=translation_id, position__gt=position) |
+                                       Q(translation_id=translation_id, position=position, pk__gt=pk))
+
+        # Fetches one more string to know if there is a next page
+        strings = list(queryset[:page_size + 1])
+        self.has_next = len(strings) > page_size
+        self.page = strings[:page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
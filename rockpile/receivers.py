@@ -0,0 +1,157 @@
+'''
+Signal receivers for rockpile
+=================================
+
+Keeps denormalized data in sync when single strings are saved or deleted. Bulk
+operations (see :mod:`rockpile.importers`) update that data by themselves.
+
+'''
+
+from collections import defaultdict
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from rockpile.catalog import invalidate_catalog
+from rockpile.models import (MemoryTrigram, QueuedString, SourceString, StringChange, Translation, TranslatedString,
+                             counted_state)
+
+
+def _update_counters(instance, old_state, new_state):
+    """
+    Applies the difference between two ``TranslatedString.counted_state`` tuples to
+    the progress counters of the affected translations
+    """
+
+    deltas = defaultdict(lambda: [0, 0, 0])
+    if old_state is not None:
+        for index, value in enumerate(old_state[1:]):
+            deltas[old_state[0]][index] -= value
+    if new_state is not None:
+        for index, value in enumerate(new_state[1:]):
+            deltas[new_state[0]][index] += value
+
+    # Updates the cached translation too, so it does not show stale counters
+    cached_translation = getattr(instance, TranslatedString.translation.field.get_cache_name(), None)
+
+    for translation_id, (strings, validated_strings, content_hash) in deltas.items():
+        if cached_translation is not None and cached_translation.pk == translation_id:
+            translation = cached_translation
+        else:
+            translation = translation_id
+        Translation.objects.update_counters(translation, strings, validated_strings, content_hash)
+
+
+@receiver(pre_save, sender=TranslatedString)
+def fetch_counted_state(sender, instance, raw, **kwargs):
+    """
+    Fetches the stored state of strings that were not loaded from the database
+    """
+
+    if instance.pk is not None and not hasattr(instance, '_counted_state'):
+        stored = sender.objects.filter(pk=instance.pk).values_list('translation_id', 'key_id', 'validated_by_id',
+                                                                   'value').first()
+        if stored is not None:
+            instance._counted_state = counted_state(*stored)
+            instance._stored_key = stored[:2]
+
+
+@receiver(post_save, sender=TranslatedString)
+def update_memory_on_save(sender, instance, created, raw, **kwargs):
+    """
+    Adds strings to the translation memory when they are validated and removes them
+    when they lose their validation. Validated strings moved to another translation or
+    key are indexed again. It runs before ``record_change_on_save`` and
+    ``update_counters_on_save``, which replace the stored key and counted state.
+    """
+
+    old_state = None if created else getattr(instance, '_counted_state', None)
+    new_state = instance.counted_state
+    was_validated = old_state is not None and old_state[2]
+    stored_key = None if created else getattr(instance, '_stored_key', None)
+    moved = stored_key is not None and stored_key != (instance.translation_id, instance.key_id)
+
+    if new_state[2] and (not was_validated or old_state[0] != new_state[0] or moved):
+        MemoryTrigram.objects.index(sender.objects.filter(pk=instance.pk))
+    elif was_validated and not new_state[2]:
+        MemoryTrigram.objects.unindex([instance.pk])
+
+
+def _source_value(instance, key_id):
+    """
+    Returns the value of a source string, without a query when it is the cached key
+    of the string
+    """
+
+    cached_key = getattr(instance, TranslatedString.key.field.get_cache_name(), None)
+    if cached_key is not None and cached_key.pk == key_id:
+        return cached_key.value
+    return SourceString.objects.filter(pk=key_id).values_list('value', flat=True).get()
+
+
+@receiver(post_save, sender=TranslatedString)
+def record_change_on_save(sender, instance, created, raw, **kwargs):
+    """
+    Appends new and changed strings to the revision log of their translation. It runs
+    before ``update_counters_on_save``, which replaces the stored counted state.
+    """
+
+    old_state = None if created else getattr(instance, '_counted_state', None)
+    if old_state == instance.counted_state:
+        return
+
+    stored_key = None if created else getattr(instance, '_stored_key', None)
+    if stored_key is not None and stored_key != (instance.translation_id, instance.key_id):
+        StringChange.objects.record(stored_key[0], [(_source_value(instance, stored_key[1]), None)])
+
+    StringChange.objects.record(instance.translation_id, [(_source_value(instance, instance.key_id), instance.value)])
+    instance._stored_key = (instance.translation_id, instance.key_id)
+
+
+@receiver(post_save, sender=TranslatedString)
+def update_counters_on_save(sender, instance, created, raw, **kwargs):
+    old_state = None if created else getattr(instance, '_counted_state', None)
+    new_state = instance.counted_state
+
+    if old_state != new_state:
+        _update_counters(instance, old_state, new_state)
+
+    instance._counted_state = new_state
+
+
+@receiver(post_delete, sender=TranslatedString)
+def update_counters_on_delete(sender, instance, **kwargs):
+    _update_counters(instance, getattr(instance, '_counted_state', instance.counted_state), None)
+
+
+@receiver(post_delete, sender=TranslatedString)
+def record_change_on_delete(sender, instance, **kwargs):
+    translation_id, key_id = getattr(instance, '_stored_key', (instance.translation_id, instance.key_id))
+    StringChange.objects.record(translation_id, [(_source_value(instance, key_id), None)])
+
+
+@receiver(post_delete, sender=Translation)
+def delete_revision_log(sender, instance, **kwargs):
+    """
+    Deletes the revision log of deleted translations, including the changes recorded
+    while their strings were deleted
+    """
+
+    queryset = StringChange.objects.filter(translation=instance.pk)
+    queryset._raw_delete(queryset.db)
+
+
+@receiver(post_save, sender=TranslatedString)
+@receiver(post_delete, sender=TranslatedString)
+def invalidate_catalog_on_change(sender, instance, **kwargs):
+    invalidate_catalog(instance.translation_id)
+
+
+@receiver(post_save, sender=TranslatedString)
+def complete_queued_string_on_create(sender, instance, created, raw, **kwargs):
+    """
+    Removes new strings from the work queue of their translation
+    """
+
+    if created:
+        QueuedString.objects.complete(instance.translation_id, [instance.key_id])
@@ -0,0 +1,164 @@
+'''
+Full-text search for rockpile
+=================================
+
+Searches the values of translated strings with the full-text engine of the database
+instead of ``icontains`` scans:
+
+* PostgreSQL: ``to_tsvector('simple', value)`` with a GIN expression index, results
+  are ranked with ``ts_rank`` and highlighted with ``ts_headline``. ``<`` and ``>``
+  are replaced by control characters first, so words inside markup are searchable.
+* SQLite: an FTS5 external content table kept in sync with triggers, results are
+  ranked with ``bm25`` and highlighted with ``highlight``.
+* Other databases fall back to ``icontains`` without ranking.
+
+The indexes are maintained by the database (see ``migrations/_search.py``), so strings
+saved one by one and bulk imports are searchable right away.
+
+'''
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from rockpile.instrumentation import instrument
+from rockpile.models import DISPLAY_RELATED_FIELDS, Translation, TranslatedString
+
+
+# Marks around the matched terms of the highlighted values, which are HTML escaped
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+
+# Control characters marking the matched terms in SQL, replaced by the marks once the
+# values are escaped
+START_SENTINEL = u'\x02'
+END_SENTINEL = u'\x03'
+
+# Control characters replacing < and > in the PostgreSQL documents, it must match the
+# expression of the search index (see migrations/_search.py)
+LT_SENTINEL = u'\x0e'
+GT_SENTINEL = u'\x0f'
+POSTGRESQL_DOCUMENT = "translate({value}, '<>', chr(14) || chr(15))"
+
+# FTS5 table of the SQLite search index
+SEARCH_TABLE_NAME = 'rockpile_translatedstring_fts'
+
+
+def _filters(translation, project):
+    """
+    Returns the SQL conditions and parameters that restrict a search to a translation
+    or project
+    """
+
+    conditions, params = [], []
+    if translation is not None:
+        conditions.append('s.translation_id = %s')
+        params.append(getattr(translation, 'pk', translation))
+    if project is not None:
+        conditions.append('s.translation_id IN (SELECT id FROM %s WHERE project_id = %%s)' % (
+            connection.ops.quote_name(Translation._meta.db_table)))
+        params.append(getattr(project, 'pk', project))
+    return ''.join(' AND ' + condition for condition in conditions), params
+
+
+def _search_postgresql(query, translation, project, limit):
+    conditions, params = _filters(translation, project)
+    # The vector expression must match the one of the GIN index
+    sql = (
+        "SELECT s.id, ts_rank(to_tsvector('simple', {document}), query) AS rank, "
+        "ts_headline('simple', {document}, query, %s) "
+        "FROM {table} s, plainto_tsquery('simple', {query}) query "
+        "WHERE to_tsvector('simple', {document}) @@ query{conditions} "
+        "ORDER BY rank DESC, s.id LIMIT %s"
+    ).format(document=POSTGRESQL_DOCUMENT.format(value='s.value'), query=POSTGRESQL_DOCUMENT.format(value='%s'),
+             table=connection.ops.quote_name(TranslatedString._meta.db_table), conditions=conditions)
+
+    options = 'StartSel=%s, StopSel=%s, HighlightAll=true' % (START_SENTINEL, END_SENTINEL)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [options, query] + params + [limit])
+        return cursor.fetchall()
+
+
+def _search_sqlite(query, translation, project, limit):
+    # Every word is quoted, so FTS5 operators in the query are searched literally
+    match = ' '.join('"%s"' % word.replace('"', '""') for word in query.split())
+
+    # FTS5 functions and MATCH take the table name, it can not be aliased
+    conditions, params = _filters(translation, project)
+    sql = (
+        "SELECT s.id, -bm25({fts}) AS rank, highlight({fts}, 0, %s, %s) "
+        "FROM {fts} JOIN {table} s ON s.id = {fts}.rowid "
+        "WHERE {fts} MATCH %s{conditions} "
+        "ORDER BY rank DESC, s.id LIMIT %s"
+    ).format(fts=connection.ops.quote_name(SEARCH_TABLE_NAME),
+             table=connection.ops.quote_name(TranslatedString._meta.db_table), conditions=conditions)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [START_SENTINEL, END_SENTINEL, match] + params + [limit])
+        return cursor.fetchall()
+
+
+def _search_fallback(query, translation, project, limit):
+    queryset = TranslatedString.objects.filter(value__icontains=query)
+    if translation is not None:
+        queryset = queryset.filter(translation=translation)
+    if project is not None:
+        queryset = queryset.filter(translation__project=project)
+    return [(pk, 0.0, value) for pk, value in queryset.order_by('pk').values_list('pk', 'value')[:limit]]
+
+
+def _highlight(value):
+    """
+    Escapes a value highlighted with the sentinels and marks its matched terms
+    """
+
+    # Sentinels typed in the value itself would leave marks unbalanced
+    value = escape(value).replace(LT_SENTINEL, '&lt;').replace(GT_SENTINEL, '&gt;')
+    return mark_safe(value.replace(START_SENTINEL, HIGHLIGHT_START).replace(END_SENTINEL, HIGHLIGHT_END))
+
+
+SEARCH_BACKENDS = {
+    'postgresql': _search_postgresql,
+    'sqlite': _search_sqlite,
+}
+
+
+def search_strings(query, translation=None, project=None, limit=20):
+    """
+    Returns the translated strings whose value matches a full-text query, best first.
+    Every string has a ``rank`` attribute (higher is better) and a ``highlight`` one,
+    its HTML escaped value with the matched terms between ``HIGHLIGHT_START`` and
+    ``HIGHLIGHT_END``.
+
+    Usage:
+
+    >>> [string.highlight for string in search_strings('hola', project=project)]
+    ['<mark>Hola</mark> mundo']
+
+    :param query: Words to look for, all of them must match
+    :type query: str
+    :param translation: Only search this translation
+    :type translation: rockpile.models.Translation or int
+    :param project: Only search the translations of this project
+    :type project: rockpile.models.TranslationProject or int
+    :param limit: Maximum number of results
+    :type limit: int
+    """
+
+    if not query.split():
+        return []
+
+    with instrument('search', vendor=connection.vendor) as operation:
+        search = SEARCH_BACKENDS.get(connection.vendor, _search_fallback)
+        rows = search(query, translation, project, limit)
+
+        strings = TranslatedString.objects.select_related(*DISPLAY_RELATED_FIELDS).in_bulk([row[0] for row in rows])
+        results = []
+        for pk, rank, highlight in rows:
+            string = strings[pk]
+            string.rank = rank
+            string.highlight = _highlight(highlight)
+            results.append(string)
+        operation.rows = len(results)
+
+    return results
@@ -0,0 +1,95 @@
+'''
+Serializers for the rockpile API
+=================================
+
+'''
+
+from rest_framework import serializers
+
+from rockpile.models import CLAIM_BATCH_SIZE, QueuedString, Translation, TranslatedString
+
+
+class TranslationSerializer(serializers.ModelSerializer):
+    percentage_completed = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Translation
+        fields = ('id', 'language', 'project', 'num_strings', 'num_validated_strings', 'percentage_completed')
+
+
+class TranslatedStringSerializer(serializers.ModelSerializer):
+    key_value = serializers.SerializerMethodField()
+    validated_by_username = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TranslatedString
+        fields = ('id', 'translation', 'key', 'key_value', 'value', 'validated_by', 'validated_by_username',
+                  'is_validated')
+
+    def get_key_value(self, obj):
+        """
+        Returns the value of the source string, it expects ``key`` to be selected
+        """
+
+        return obj.key.value
+
+    def get_validated_by_username(self, obj):
+        """
+        Returns the username of the validator, it expects ``validated_by__user`` to be selected
+        """
+
+        return obj.validated_by.user.get_username() if obj.validated_by_id is not None else None
+
+
+class TranslatedStringSearchSerializer(TranslatedStringSerializer):
+    rank = serializers.FloatField(read_only=True)
+    highlight = serializers.CharField(read_only=True)
+
+    class Meta(TranslatedStringSerializer.Meta):
+        fields = TranslatedStringSerializer.Meta.fields + ('rank', 'highlight')
+
+
+class ValidationSerializer(serializers.Serializer):
+    """
+    Strings to validate or unvalidate in bulk
+    """
+
+    max_ids = 1000
+
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1))
+
+    def validate_ids(self, value):
+        if not value or len(value) > self.max_ids:
+            raise serializers.ValidationError('Between 1 and %d ids are required' % self.max_ids)
+        return value
+
+
+class QueuedStringSerializer(serializers.ModelSerializer):
+    key_value = serializers.SerializerMethodField()
+
+    class Meta:
+        model = QueuedString
+        fields = ('id', 'translation', 'key', 'key_value', 'lease_expires')
+
+    def get_key_value(self, obj):
+        """
+        Returns the value of the source string, it expects ``key`` to be selected
+        """
+
+        return obj.key.value
+
+
+class ClaimSerializer(serializers.Serializer):
+    """
+    Number of strings to claim from the work queue
+    """
+
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=CLAIM_BATCH_SIZE)
+
+
+class ChangesSerializer(serializers.Serializer):
+    """
+    Last revision known by a client of the revision log
+    """
+
+    since = serializers.IntegerField(min_value=0, default=0)
@@ -0,0 +1,302 @@
+'''
+Translation layer for rockpile
+=================================
+
+Translates the messages of a Django site with the catalogs of a rockpile project
+instead of compiled ``.mo`` files:
+
+::
+    from rockpile.translation import gettext, gettext_lazy, ngettext
+
+    gettext('Hello world')  # in the active language of Django
+
+``RockpileTranslations`` offers the same lookups as the objects of the ``gettext``
+module, so it can also be plugged in as the fallback of Django's own catalogs:
+
+::
+    trans_real.translation('es').add_fallback(RockpileTranslations('es'))
+
+Messages missing from the catalog are returned untranslated (or looked up in the
+fallback). The project is set with the ``ROCKPILE_TRANSLATION_PROJECT`` setting,
+languages without a translation fall back to their generic language (``es`` for
+``es-ar``).
+
+
+Caching
+++++++++++++++
+
+Catalogs are cached on two tiers:
+
+* Every process keeps the catalogs it uses in a thread-safe LRU dictionary, up to
+  ``ROCKPILE_TRANSLATION_CATALOGS`` (100) of them.
+* The shared cache of :mod:`rockpile.catalog`, so a catalog is built from the database
+  once for all the processes.
+
+A process checks the version of a catalog in the shared cache at most once every
+``ROCKPILE_TRANSLATION_CHECK_INTERVAL`` seconds (5), so translating a message costs at
+most one cache hit and usually no I/O at all. When the version changed, the catalog is
+reloaded by a background thread and the previous one is served meanwhile: rendering
+never waits for a reload, only for the first load of a catalog in the process.
+
+'''
+
+import gettext as gettext_module
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections
+from django.dispatch import receiver
+from django.utils import six
+from django.utils.functional import lazy
+from django.utils.translation import get_language
+
+from rockpile.catalog import get_version, get_versioned_catalog
+from rockpile.models import Translation
+
+
+class CatalogCache(object):
+    """
+    Thread-safe LRU dictionary of the catalogs used by a process, kept up to date with
+    rate-limited version checks, see the module documentation
+
+    :param max_size: Maximum number of catalogs
+    :type max_size: int
+    :param check_interval: Seconds between version checks of a catalog
+    :type check_interval: float
+    """
+
+    def __init__(self, max_size=100, check_interval=5):
+        self.max_size = max_size
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        # Translation id: [version, catalog, time of the last version check], least
+        # recently used first
+        self._entries = OrderedDict()
+        # Translation id: thread reloading its catalog
+        self._reloading = {}
+
+    def get(self, translation_id):
+        """
+        Returns the catalog of a translation, it only waits for the database or the
+        shared cache when the process did not load the catalog yet
+
+        :param translation_id: Translation primary key
+        :type translation_id: int
+        """
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.pop(translation_id, None)
+            if entry is None:
+                check = False
+            else:
+                self._entries[translation_id] = entry
+                check = now - entry[2] >= self.check_interval
+                if check:
+                    # Other threads do not check it again meanwhile
+                    entry[2] = now
+
+        if entry is None:
+            return self.load(translation_id)
+
+        if check and get_version(translation_id) != entry[0]:
+            self.reload_in_background(translation_id)
+
+        return entry[1]
+
+    def load(self, translation_id):
+        """
+        Loads the current catalog of a translation and returns it
+
+        :param translation_id: Translation primary key
+        :type translation_id: int
+        """
+
+        version, catalog = get_versioned_catalog(translation_id)
+
+        with self._lock:
+            # Entries are replaced instead of updated, threads that already read the
+            # previous one keep a consistent version and catalog
+            self._entries.pop(translation_id, None)
+            self._entries[translation_id] = [version, catalog, time.time()]
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+        return catalog
+
+    def reload_in_background(self, translation_id):
+        """
+        Reloads the catalog of a translation in a new thread, unless it is being
+        reloaded already. Returns the reloading thread.
+
+        :param translation_id: Translation primary key
+        :type translation_id: int
+        """
+
+        with self._lock:
+            thread = self._reloading.get(translation_id)
+            if thread is None:
+                thread = threading.Thread(target=self._reload, args=(translation_id,),
+                                          name='rockpile-catalog-%s' % translation_id)
+                thread.daemon = True
+                self._reloading[translation_id] = thread
+                thread.start()
+
+        return thread
+
+    def _reload(self, translation_id):
+        try:
+            self.load(translation_id)
+        finally:
+            with self._lock:
+                self._reloading.pop(translation_id, None)
+            # The thread ends here, its connections would be left open
+            connections.close_all()
+
+
+_catalogs = None
+_catalogs_lock = threading.Lock()
+
+# (project id, language): (translation id or None, time of the lookup)
+_translation_ids = {}
+
+
+def get_catalogs():
+    """
+    Returns the catalog cache of the process
+    """
+
+    global _catalogs
+
+    with _catalogs_lock:
+        if _catalogs is None:
+            _catalogs = CatalogCache(getattr(settings, 'ROCKPILE_TRANSLATION_CATALOGS', 100),
+                                     getattr(settings, 'ROCKPILE_TRANSLATION_CHECK_INTERVAL', 5))
+        return _catalogs
+
+
+@receiver(setting_changed)
+def reset_catalogs(setting, **kwargs):
+    global _catalogs
+    if setting.startswith('ROCKPILE_TRANSLATION_') or setting.startswith('ROCKPILE_CATALOG_'):
+        _catalogs = None
+        _translation_ids.clear()
+
+
+def get_translation_id(language, project=None):
+    """
+    Returns the primary key of the translation of a project for a language, or of its
+    generic language, or None. Lookups are cached in the process, the missing ones
+    only for ``ROCKPILE_TRANSLATION_CHECK_INTERVAL`` seconds.
+
+    :param language: Language code
+    :type language: str
+    :param project: Project primary key, ``ROCKPILE_TRANSLATION_PROJECT`` by default
+    :type project: int
+    """
+
+    if project is None:
+        project = settings.ROCKPILE_TRANSLATION_PROJECT
+    project = getattr(project, 'pk', project)
+    language = language.lower()
+
+    cached = _translation_ids.get((project, language))
+    if cached is not None and (cached[0] is not None or
+                               time.time() - cached[1] < get_catalogs().check_interval):
+        return cached[0]
+
+    translation_ids = dict(Translation.objects.filter(
+        project=project, language__in=[language, language.split('-')[0]]).values_list('language', 'pk'))
+    translation_id = translation_ids.get(language, translation_ids.get(language.split('-')[0]))
+
+    # Replacing a dictionary item is atomic, threads may only look it up twice
+    _translation_ids[(project, language)] = (translation_id, time.time())
+    return translation_id
+
+
+def get_language_catalog(language, project=None):
+    """
+    Returns the catalog of a language, empty when the project has no translation for it
+
+    :param language: Language code
+    :type language: str
+    :param project: Project primary key, ``ROCKPILE_TRANSLATION_PROJECT`` by default
+    :type project: int
+    """
+
+    translation_id = get_translation_id(language, project)
+    if translation_id is None:
+        return {}
+    return get_catalogs().get(translation_id)
+
+
+class RockpileTranslations(gettext_module.NullTranslations):
+    """
+    ``gettext`` translations of a language read from the rockpile catalogs, every
+    lookup sees the current catalog
+
+    :param language: Language code
+    :type language: str
+    :param project: Project primary key, ``ROCKPILE_TRANSLATION_PROJECT`` by default
+    :type project: int
+    """
+
+    def __init__(self, language, project=None):
+        # NullTranslations is an old-style class on Python 2
+        gettext_module.NullTranslations.__init__(self)
+        self.language = language
+        self.project = project
+
+    def lookup(self, message):
+        """
+        Returns the translation of a message or None, untranslated (empty) strings are missing
+        """
+
+        return get_language_catalog(self.language, self.project).get(message) or None
+
+    def _fallback_call(self, name, *args):
+        # The unicode lookups of Python 2 are the u-prefixed ones
+        return getattr(self._fallback, 'u' + name if six.PY2 else name)(*args)
+
+    def gettext(self, message):
+        translated = self.lookup(message)
+        if translated is not None:
+            return translated
+        if self._fallback:
+            return self._fallback_call('gettext', message)
+        return message
+
+    def ngettext(self, singular, plural, n):
+        # Catalogs have no plural forms, each form is a message
+        translated = self.lookup(singular if n == 1 else plural)
+        if translated is not None:
+            return translated
+        if self._fallback:
+            return self._fallback_call('ngettext', singular, plural, n)
+        return singular if n == 1 else plural
+
+    if six.PY2:
+        ugettext = gettext
+        ungettext = ngettext
+
+
+def gettext(message):
+    """
+    Translates a message to the active language
+    """
+
+    return RockpileTranslations(get_language() or settings.LANGUAGE_CODE).gettext(message)
+
+
+def ngettext(singular, plural, number):
+    """
+    Translates the singular or plural form of a message to the active language
+    """
+
+    return RockpileTranslations(get_language() or settings.LANGUAGE_CODE).ngettext(singular, plural, number)
+
+
+gettext_lazy = lazy(gettext, six.text_type)
@@ -0,0 +1,11 @@
+from rest_framework.routers import DefaultRouter
+
+from rockpile import views
+
+
+router = DefaultRouter()
+router.register(r'translations', views.TranslationViewSet)
+router.register(r'strings', views.TranslatedStringViewSet, basename='translatedstring')
+router.register(r'search', views.SearchViewSet, basename='search')
+
+urlpatterns = router.urls
@@ -0,0 +1,233 @@
+'''
+Views for rockpile
+=================================
+
+'''
+
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from rockpile.exports import EXPORT_FORMATS, bundle_etag, get_bundle
+from rockpile.models import DISPLAY_RELATED_FIELDS, QueuedString, StringChange, Translation, TranslatedString, Translator
+from rockpile.pagination import TranslatedStringKeysetPagination
+from rockpile.search import search_strings
+from rockpile.serializers import (ChangesSerializer, ClaimSerializer, QueuedStringSerializer,
+                                  TranslatedStringSearchSerializer, TranslatedStringSerializer, TranslationSerializer,
+                                  ValidationSerializer)
+
+
+def accepts_gzip(request):
+    """
+    Returns whether the ``Accept-Encoding`` header of a request accepts gzip, codings
+    with ``q=0`` are refused and ``gzip`` takes precedence over ``*``
+    """
+
+    qvalues = {}
+    for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        params = coding.split(';')
+        qvalue = 1.0
+        for param in params[1:]:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    qvalue = float(value)
+                except ValueError:
+                    qvalue = 0.0
+        qvalues[params[0].strip().lower()] = qvalue
+
+    return qvalues.get('gzip', qvalues.get('*', 0.0)) > 0
+
+
+class ExportContentNegotiation(BaseContentNegotiation):
+    """
+    Exports are rendered by their own writers, whatever the ``Accept`` header asks for
+    """
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class TranslationViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Translations with their progress, read from the stored counters.
+
+    Clients keep their catalogs in sync with ``changes/?since=<revision>``, which returns
+    the strings changed after the revision, see ``StringChangeManager.delta``.
+
+    Translators of a translation take the next untranslated strings of its work queue
+    posting ``{"limit": 20}`` to ``claim/``, and hand back the strings they did not
+    translate posting to ``release/``.
+
+    ``export/<format>/`` downloads the translation as an Android ``strings.xml``
+    (``android``) or a gettext ``po``/``mo`` file. The ``ETag`` comes from the content
+    hash and order revision of the translation, so requests with a matching
+    ``If-None-Match`` get a ``304`` without reading or rendering the strings. The
+    cached gzip compressed body is sent to clients accepting it.
+    """
+
+    queryset = Translation.objects.all()
+    serializer_class = TranslationSerializer
+
+    @action(detail=True)
+    def changes(self, request, pk=None):
+        serializer = ChangesSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        delta = StringChange.objects.delta(self.get_object(), serializer.validated_data['since'])
+        return Response(delta._asdict())
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def claim(self, request, pk=None):
+        translation, translator = self.get_translation_and_translator(request)
+
+        serializer = ClaimSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        strings = QueuedString.objects.claim(translation, translator, serializer.validated_data['limit'])
+        return Response(QueuedStringSerializer(strings, many=True).data)
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def release(self, request, pk=None):
+        translation, translator = self.get_translation_and_translator(request)
+        return Response({'released': QueuedString.objects.release(translation, translator)})
+
+    # The "format" keyword argument is reserved for the format suffixes of the API
+    @action(detail=True, url_path=r'export/(?P<export_format>\w+)', url_name='export',
+            content_negotiation_class=ExportContentNegotiation)
+    def export(self, request, pk=None, export_format=None):
+        if export_format not in EXPORT_FORMATS:
+            raise Http404('Unknown export format')
+
+        translation = self.get_object()
+        gzipped = accepts_gzip(request)
+        etag = bundle_etag(translation, export_format, gzipped)
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            bundle = get_bundle(translation, export_format)
+            writer = EXPORT_FORMATS[export_format]
+
+            response = HttpResponse(bundle.gzipped_body if gzipped else bundle.body, content_type=writer.content_type)
+            response['Content-Length'] = len(response.content)
+            response['Content-Disposition'] = 'attachment; filename="%s"' % writer.filename.format(
+                language=translation.language)
+            if gzipped:
+                response['Content-Encoding'] = 'gzip'
+
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    def get_translation_and_translator(self, request):
+        translation = self.get_object()
+        translator = Translator.objects.filter(user=request.user, translation=translation).first()
+        if translator is None:
+            raise PermissionDenied('Only the translators of the translation can claim its strings')
+        return translation, translator
+
+
+class TranslatedStringViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Translated strings, paginated with a keyset on ``(translation, position, id)``.
+
+    Query parameters:
+
+    * ``translation``: only strings of this translation
+    * ``category``: one of the ``TranslatedStringManager`` lists (``strings``, ``validated``,
+      ``not_validated``), it requires ``translation``
+
+    Translators validate strings in bulk posting ``{"ids": [...]}`` to ``validate/`` or
+    ``unvalidate/``, only the strings of their translations are updated. The response
+    has the number of updated strings and the new counters of their translations.
+    """
+
+    serializer_class = TranslatedStringSerializer
+    pagination_class = TranslatedStringKeysetPagination
+
+    categories = ('strings', 'validated', 'not_validated')
+
+    def get_queryset(self):
+        translation = self.request.query_params.get('translation')
+        category = self.request.query_params.get('category')
+
+        if translation is not None and not translation.isdigit():
+            raise ValidationError({'translation': 'A translation id is required'})
+
+        if category is not None:
+            if category not in self.categories:
+                raise ValidationError({'category': 'Must be one of: %s' % ', '.join(self.categories)})
+            if translation is None:
+                raise ValidationError({'translation': 'Filtering by category requires a translation'})
+            queryset = getattr(TranslatedString.objects, category)(translation)
+        elif translation is not None:
+            return TranslatedString.objects.for_display(translation)
+        else:
+            queryset = TranslatedString.objects.all()
+
+        return queryset.select_related(*DISPLAY_RELATED_FIELDS)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def validate(self, request):
+        return self.set_validated_by(request, TranslatedString.objects.validate)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def unvalidate(self, request):
+        return self.set_validated_by(request, TranslatedString.objects.unvalidate)
+
+    def set_validated_by(self, request, method):
+        translator = Translator.objects.filter(user=request.user).first()
+        if translator is None:
+            raise PermissionDenied('Only translators can validate strings')
+
+        serializer = ValidationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        result = method(serializer.validated_data['ids'], translator)
+        return Response({
+            'updated': result.updated,
+            'translations': TranslationSerializer(result.translations, many=True).data,
+        })
+
+
+class SearchViewSet(viewsets.ViewSet):
+    """
+    Full-text search of translated strings, best matches first.
+
+    Query parameters:
+
+    * ``q``: words to look for, all of them must match
+    * ``translation`` or ``project``: only search this translation or project
+    * ``limit``: maximum number of results
+    """
+
+    default_limit = 20
+    max_limit = 100
+
+    def get_id(self, name):
+        value = self.request.query_params.get(name)
+        if value is not None and not value.isdigit():
+            raise ValidationError({name: 'A %s id is required' % name})
+        return value
+
+    def list(self, request):
+        query = request.query_params.get('q', '')
+        if not query.split():
+            raise ValidationError({'q': 'A search query is required'})
+
+        try:
+            limit = min(max(int(request.query_params['limit']), 1), self.max_limit)
+        except (KeyError, ValueError):
+            limit = self.default_limit
+
+        strings = search_strings(query, translation=self.get_id('translation'), project=self.get_id('project'),
+                                 limit=limit)
+        return Response(TranslatedStringSearchSerializer(strings, many=True).data)
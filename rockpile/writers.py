@@ -0,0 +1,246 @@
+'''
+Writers for rockpile
+=================================
+
+Serialize a translation, or any mapping of translation keys to values such as the
+adapters in :mod:`rockpile.adapters`, to the formats of the supported translation
+systems:
+
+* Android ``strings.xml`` (``write_android_strings``)
+* Gettext ``.po`` (``write_po``) and ``.mo`` (``write_mo``)
+
+Translations are streamed from the database with ``.iterator()`` and written
+incrementally, so the whole document is never built in memory.
+
+'''
+
+import struct
+import sys
+from array import array
+from functools import wraps
+from itertools import chain
+
+from django.utils import six
+from lxml import etree
+
+from rockpile.adapters import MO_HEADER_SIZE, MO_MAGIC, hashpjw
+from rockpile.instrumentation import instrument
+from rockpile.models import Translation, TranslatedString
+
+
+# Number of PO entries joined in a single write
+PO_CHUNK_SIZE = 1000
+
+
+def iter_strings(strings):
+    """
+    Yields the ``(key, value)`` pairs to write
+
+    :param strings: Translation or mapping of translation keys to values
+    :type strings: rockpile.models.Translation or rockpile.adapters.TranslatableStrings
+    """
+
+    if isinstance(strings, Translation):
+        pairs = TranslatedString.objects.strings(strings).values_list('key__value', 'value').iterator()
+    else:
+        pairs = strings.items()
+
+    for key, value in pairs:
+        yield key, value or u''
+
+
+def _gettext_header(strings):
+    """
+    Returns the metadata stored as the translation of the empty msgid
+    """
+
+    header = u'Content-Type: text/plain; charset=UTF-8\nContent-Transfer-Encoding: 8bit\n'
+    if isinstance(strings, Translation):
+        header += u'Language: %s\n' % strings.language
+    return header
+
+
+def instrumented(file_format):
+    """
+    Decorator that reports a writer as an ``export`` operation, the writer returns
+    the number of strings written
+    """
+
+    def decorator(writer):
+        @wraps(writer)
+        def wrapper(strings, file_obj):
+            tags = {'format': file_format}
+            if isinstance(strings, Translation):
+                tags['translation'] = strings.pk
+
+            with instrument('export', **tags) as operation:
+                operation.rows = writer(strings, file_obj)
+            return operation.rows
+        return wrapper
+    return decorator
+
+
+@instrumented('android')
+def write_android_strings(strings, file_obj):
+    """
+    Writes an Android ``strings.xml`` file and returns the number of strings written
+
+    Usage:
+
+    >>> with open('res/values-es/strings.xml', 'wb') as file_obj:
+    ...     write_android_strings(translation, file_obj)
+
+    :param strings: Translation or mapping of translation keys to values
+    :type strings: rockpile.models.Translation or rockpile.adapters.TranslatableStrings
+    :param file_obj: Binary file-like object
+    :type file_obj: file-like obj
+    """
+
+    num_strings = 0
+    with etree.xmlfile(file_obj, encoding='utf-8') as xml_file:
+        xml_file.write_declaration()
+        with xml_file.element('resources'):
+            for key, value in iter_strings(strings):
+                element = etree.Element('string', name=key)
+                element.text = value
+                xml_file.write(u'\n    ', element)
+                num_strings += 1
+            xml_file.write(u'\n')
+
+    return num_strings
+
+
+def _po_quote(text):
+    """
+    Returns the text as a quoted PO string
+    """
+
+    text = text.replace(u'\\', u'\\\\').replace(u'"', u'\\"')
+    text = text.replace(u'\n', u'\\n').replace(u'\r', u'\\r').replace(u'\t', u'\\t')
+    return u'"%s"' % text
+
+
+@instrumented('po')
+def write_po(strings, file_obj):
+    """
+    Writes a gettext ``.po`` file encoded in UTF-8 and returns the number of strings written
+
+    :param strings: Translation or mapping of translation keys to values
+    :type strings: rockpile.models.Translation or rockpile.adapters.TranslatableStrings
+    :param file_obj: Binary file-like object
+    :type file_obj: file-like obj
+    """
+
+    entries = chain([(u'', _gettext_header(strings))], iter_strings(strings))
+
+    chunk = []
+    num_entries = 0
+    for key, value in entries:
+        chunk.append(u'msgid %s\nmsgstr %s\n\n' % (_po_quote(key), _po_quote(value)))
+        num_entries += 1
+        if len(chunk) >= PO_CHUNK_SIZE:
+            file_obj.write(u''.join(chunk).encode('utf-8'))
+            chunk = []
+
+    file_obj.write(u''.join(chunk).encode('utf-8'))
+
+    # The header is not a string
+    return num_entries - 1
+
+
+def _next_prime(number):
+    """
+    Returns the smallest odd prime greater or equal than the number
+    """
+
+    number |= 1
+    while any(number % divisor == 0 for divisor in range(3, int(number ** 0.5) + 1, 2)):
+        number += 2
+    return number
+
+
+def mo_hash_table_size(num_strings):
+    """
+    Returns the size of the hash table for a number of strings (same as GNU msgfmt)
+    """
+
+    return max(_next_prime(num_strings * 4 // 3), 3)
+
+
+def _write_uint32_array(file_obj, values):
+    """
+    Writes an array of unsigned ints as little endian
+    """
+
+    if sys.byteorder == 'big':
+        values = array('I', values)
+        values.byteswap()
+    file_obj.write(values.tostring() if six.PY2 else values.tobytes())
+
+
+@instrumented('mo')
+def write_mo(strings, file_obj):
+    """
+    Writes a gettext ``.mo`` file with a hash table for fast lookups and returns the
+    number of strings written.
+
+    Strings are written as they are read and the tables go at the end of the file, so
+    only the msgids and a few integers per string are kept in memory to sort the
+    tables by msgid, as gettext expects. The file object has to be seekable because
+    the header is written last.
+
+    :param strings: Translation or mapping of translation keys to values
+    :type strings: rockpile.models.Translation or rockpile.adapters.TranslatableStrings
+    :param file_obj: Binary seekable file-like object
+    :type file_obj: file-like obj
+    """
+
+    start = file_obj.tell()
+    file_obj.write(b'\0' * MO_HEADER_SIZE)
+    offset = MO_HEADER_SIZE
+
+    # Encoded msgids and (length, offset) of every msgid and msgstr, in reading order
+    keys, originals, translations = [], array('I'), array('I')
+
+    entries = chain([(u'', _gettext_header(strings))], iter_strings(strings))
+    for key, value in entries:
+        key, value = key.encode('utf-8'), value.encode('utf-8')
+        file_obj.write(key + b'\0' + value + b'\0')
+
+        keys.append(key)
+        originals.extend((len(key), offset))
+        translations.extend((len(value), offset + len(key) + 1))
+        offset += len(key) + len(value) + 2
+
+    # The tables are sorted by msgid, the strings stay in reading order
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    originals = array('I', chain.from_iterable(originals[2 * index:2 * index + 2] for index in order))
+    translations = array('I', chain.from_iterable(translations[2 * index:2 * index + 2] for index in order))
+
+    # Tables are aligned to 4 bytes
+    padding = -offset % 4
+    file_obj.write(b'\0' * padding)
+    offset += padding
+
+    num_strings = len(keys)
+    hash_table_size = mo_hash_table_size(num_strings)
+    hash_table = array('I', [0]) * hash_table_size
+    for index, key_index in enumerate(order):
+        value = hashpjw(keys[key_index])
+        position = value % hash_table_size
+        increment = 1 + value % (hash_table_size - 2)
+        while hash_table[position]:
+            position = (position + increment) % hash_table_size
+        hash_table[position] = index + 1
+
+    for table in (originals, translations, hash_table):
+        _write_uint32_array(file_obj, table)
+
+    end = file_obj.tell()
+    file_obj.seek(start)
+    file_obj.write(struct.pack('<7I', MO_MAGIC, 0, num_strings, offset, offset + 8 * num_strings,
+                               hash_table_size, offset + 16 * num_strings))
+    file_obj.seek(end)
+
+    # The header is not a string
+    return num_strings - 1
@@ -0,0 +1,73 @@
+import sys
+from optparse import OptionParser
+
+try:
+    from django.conf import settings
+
+    settings.configure(
+        DEBUG=False,
+        USE_TZ=True,
+        DATABASES={
+            "default": {
+                "ENGINE": "django.db.backends.sqlite3",
+                "NAME": ":memory:",
+            }
+        },
+        ROOT_URLCONF="rockpile.urls",
+        INSTALLED_APPS=[
+            "django.contrib.auth",
+            "django.contrib.contenttypes",
+            "django.contrib.sites",
+            "rockpile",
+        ],
+        SITE_ID=1,
+    )
+
+    import django
+    django.setup()
+except ImportError:
+    raise ImportError("To fix this error, run: pip install -r requirements-test.txt")
+
+
+def format_memory(value):
+    return '-' if value is None else '%.1f MB' % (value / 1024.0 / 1024.0)
+
+
+def run_benchmarks(xml_sizes, num_locales, num_strings):
+    from django.core.management import call_command
+    from benchmarks import cases
+
+    call_command('migrate', verbosity=0)
+
+    results = list(cases.bench_android_parsing(xml_sizes))
+    results += list(cases.bench_project(num_locales, num_strings))
+
+    print('%-45s %10s %10s %20s %10s' % ('Operation', 'Size', 'Seconds', 'Peak memory (RSS)', 'Queries'))
+    failures = 0
+    for result in results:
+        queries = '%d' % result.queries
+        if result.max_queries is not None and result.queries > result.max_queries:
+            queries += ' > %d' % result.max_queries
+            failures += 1
+        memory = format_memory(result.peak_memory)
+        if None not in (result.max_memory, result.peak_memory) and result.peak_memory > result.max_memory:
+            memory += ' > %s' % format_memory(result.max_memory)
+            failures += 1
+        print('%-45s %10d %10.3f %20s %10s' % (result.name, result.size, result.seconds, memory, queries))
+
+    return failures
+
+
+if __name__ == '__main__':
+    parser = OptionParser()
+    parser.add_option('--xml-sizes', default='1000,10000,100000',
+                      help='Comma separated number of keys of the parsed strings.xml files (up to 1000000)')
+    parser.add_option('--locales', type='int', default=10, help='Number of locales of the benchmark project')
+    parser.add_option('--strings', type='int', default=5000, help='Number of strings per locale')
+    (options, args) = parser.parse_args()
+
+    xml_sizes = [int(size) for size in options.xml_sizes.split(',')]
+    failures = run_benchmarks(xml_sizes, options.locales, options.strings)
+    if failures:
+        print('%d operation(s) exceeded their query or memory budget' % failures)
+        sys.exit(1)
@@ -1,6 +1,19 @@
+import os
 import sys
 from optparse import OptionParser
 
+# Tests run on SQLite, or on the PostgreSQL database named by ROCKPILE_TEST_POSTGRESQL
+# (the connection is configured with the usual PGHOST, PGUSER... variables)
+if os.environ.get("ROCKPILE_TEST_POSTGRESQL"):
+    DATABASE = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.environ["ROCKPILE_TEST_POSTGRESQL"],
+    }
+else:
+    DATABASE = {
+        "ENGINE": "django.db.backends.sqlite3",
+    }
+
 try:
     from django.conf import settings
 
@@ -8,9 +21,7 @@ try:
         DEBUG=True,
         USE_TZ=True,
         DATABASES={
-            "default": {
-                "ENGINE": "django.db.backends.sqlite3",
-            }
+            "default": DATABASE,
         },
         ROOT_URLCONF="rockpile.urls",
         INSTALLED_APPS=[
@@ -33,6 +33,9 @@ setup(
     url='https://github.com/rockpile-it/django-rockpile',
     packages=[
         'rockpile',
+        'rockpile.management',
+        'rockpile.management.commands',
+        'rockpile.migrations',
     ],
     include_package_data=True,
     install_requires=[
@@ -7,11 +7,14 @@ Test adapters
 
 Tests for `django-rockpile` adapters module.
 """
+import struct
 import tempfile
+from collections import OrderedDict
 
 from django.test import TestCase
 
-from rockpile.adapters import AndroidStrings
+from rockpile.adapters import AndroidStrings, MoStrings, PoStrings
+from rockpile.writers import write_mo
 
 
 class AndroidStringsTest(TestCase):
@@ -46,3 +49,117 @@ class AndroidStringsTest(TestCase):
     def test_iter(self):
         expected_value = [('app_name', 'Hola rockpile'), ('info_text', 'probando android')]
         self.assertEqual(expected_value, list(self.android_strings.items()))
+
+
+class AndroidStringsStreamingTest(TestCase):
+
+    def setUp(self):
+        input_data = u'''<?xml version="1.0" encoding="utf-8"?>
+                         <resources xmlns:xliff="urn:oasis:names:tc:xliff:document:1.2">
+                            <string name="app_name">Hola rockpile</string>
+                            <color name="White">#ffffff</color>
+                            <string name="welcome">Hola <xliff:g id="name">%s</xliff:g></string>
+                            <string name="empty"/>
+                         </resources>'''
+        self.file_obj = tempfile.TemporaryFile()
+        self.file_obj.write(input_data.encode('utf-8'))
+        self.file_obj.seek(0)
+
+    def tearDown(self):
+        self.file_obj.close()
+
+    def test_iter_strings(self):
+        expected_value = [('app_name', 'Hola rockpile'), ('welcome', 'Hola '), ('empty', None)]
+        self.assertEqual(expected_value, list(AndroidStrings.iter_strings(self.file_obj)))
+
+    def test_iter_strings_is_lazy(self):
+        strings = AndroidStrings.iter_strings(self.file_obj)
+        self.assertEqual(next(strings), ('app_name', 'Hola rockpile'))
+
+
+class PoStringsTest(TestCase):
+
+    def setUp(self):
+        input_data = u'''msgid ""
+msgstr ""
+"Content-Type: text/plain; charset=UTF-8\\n"
+
+msgid "Hello world"
+msgstr "Hola mundo"
+
+msgid "Open file"
+msgstr "Abrir archivo"
+
+#~ msgid "Obsolete"
+#~ msgstr "Obsoleta"
+'''
+        file_obj = tempfile.TemporaryFile()
+        file_obj.write(input_data.encode('utf-8'))
+        file_obj.seek(0)
+        self.po_strings = PoStrings(file_obj)
+        file_obj.close()
+
+    def test_len(self):
+        self.assertEqual(len(self.po_strings), 2)
+
+    def test_iter(self):
+        expected_value = [('Hello world', 'Hola mundo'), ('Open file', 'Abrir archivo')]
+        self.assertEqual(expected_value, list(self.po_strings.items()))
+
+
+class MoStringsTest(TestCase):
+
+    def setUp(self):
+        self.strings = OrderedDict(('key %d' % i, u'valor ñ %d' % i) for i in range(100))
+        self.file_obj = tempfile.TemporaryFile()
+        write_mo(self.strings, self.file_obj)
+        self.file_obj.seek(0)
+        self.mo_strings = MoStrings(self.file_obj)
+
+    def tearDown(self):
+        self.mo_strings.close()
+        self.file_obj.close()
+
+    def test_len(self):
+        self.assertEqual(len(self.mo_strings), 100)
+
+    def test_read(self):
+        for key, value in self.strings.items():
+            self.assertEqual(self.mo_strings[key], value)
+
+    def test_missing_key(self):
+        self.assertNotIn('missing', self.mo_strings)
+        self.assertNotIn('', self.mo_strings)
+
+    def test_iter(self):
+        # Strings are read in the order of the msgid table, which is sorted
+        self.assertEqual(list(self.mo_strings.items()), sorted(self.strings.items()))
+
+    def test_read_only(self):
+        with self.assertRaises(TypeError):
+            self.mo_strings['key 1'] = 'changed'
+        with self.assertRaises(TypeError):
+            del self.mo_strings['key 1']
+
+    def test_read_without_hash_table(self):
+        # Same format without hash table, msgfmt -s output uses sorted originals
+        file_obj = tempfile.TemporaryFile()
+        keys, values = [b'', b'a', b'b'], [b'Content-Type: text/plain; charset=UTF-8\n', b'A', b'B']
+        offset = 28 + 16 * len(keys)
+        originals, translations, data = [], [], b''
+        for key, value in zip(keys, values):
+            originals += [len(key), offset + len(data)]
+            data += key + b'\0'
+            translations += [len(value), offset + len(data)]
+            data += value + b'\0'
+        file_obj.write(struct.pack('<7I', 0x950412de, 0, len(keys), 28, 28 + 8 * len(keys), 0, offset))
+        file_obj.write(struct.pack('<%dI' % len(originals), *originals))
+        file_obj.write(struct.pack('<%dI' % len(translations), *translations))
+        file_obj.write(data)
+        file_obj.seek(0)
+
+        mo_strings = MoStrings(file_obj)
+        self.assertEqual((mo_strings['a'], mo_strings['b']), ('A', 'B'))
+        self.assertNotIn('c', mo_strings)
+        mo_strings.close()
+        file_obj.close()
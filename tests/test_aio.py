@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test aio
+--------------
+
+Tests for `django-rockpile` asynchronous API.
+"""
+
+from unittest import skipIf
+
+from django.test import TransactionTestCase
+
+from rockpile import models
+from tests.test_models import FewStringsProjectMixin
+
+try:
+    import asyncio
+except ImportError:  # Python 2
+    asyncio = None
+
+
+# The calls run in other threads with their own connections, they only see committed data
+@skipIf(asyncio is None, 'The asynchronous API requires Python 3.4')
+class TestAsyncAPI(FewStringsProjectMixin, TransactionTestCase):
+
+    def setUp(self):
+        super(TestAsyncAPI, self).setUp()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.other_translation = models.Translation.objects.create(project=self.translation_project, language='fr')
+        self.other_translation.import_strings({'Hello world': 'Bonjour le monde'})
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+        super(TestAsyncAPI, self).tearDown()
+
+    def run_async(self, *awaitables):
+        return self.loop.run_until_complete(asyncio.gather(*awaitables))
+
+    def test_apercentage_completed(self):
+        models.Translation.objects.filter(pk=self.translation.pk).update(num_validated_strings=2)
+
+        percentages = self.run_async(self.translation.apercentage_completed(),
+                                     self.other_translation.apercentage_completed())
+        self.assertEqual(percentages, [100.0, 0.0])
+
+    def test_manager_methods(self):
+        manager = models.TranslatedString.objects
+        strings, validated, not_validated, for_display = self.run_async(
+            manager.astrings(self.translation), manager.avalidated(self.translation),
+            manager.anot_validated(self.translation), manager.afor_display(self.other_translation))
+
+        self.assertEqual(strings, [self.translated_string1, self.translated_string2])
+        self.assertEqual(validated, [self.translated_string1])
+        self.assertEqual(not_validated, [self.translated_string2])
+        self.assertEqual(for_display[0].key.value, 'Hello world')
+
+    def test_awith_completion(self):
+        translations, = self.run_async(models.Translation.objects.awith_completion())
+        self.assertEqual(sorted(translation.completion for translation in translations), [0.0, 50.0])
+
+    def test_aget_catalog_per_locale(self):
+        from rockpile.aio import aget_catalog
+
+        catalogs = self.run_async(*[aget_catalog(translation) for translation in (self.translation,
+                                                                                  self.other_translation.pk)])
+        self.assertEqual([catalog['Hello world'] for catalog in catalogs], ['Hola mundo', 'Bonjour le monde'])
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test catalog
+--------------
+
+Tests for `django-rockpile` catalog module.
+"""
+
+from django.test import TestCase
+
+from rockpile import catalog, models
+from tests.test_models import FewStringsProjectMixin
+
+
+class TestCatalog(FewStringsProjectMixin, TestCase):
+
+    def setUp(self):
+        catalog.get_cache().clear()
+        super(TestCatalog, self).setUp()
+
+    def test_get_catalog(self):
+        expected_value = {'Hello world': 'Hola mundo', 'Testing string': 'Probando cadena'}
+        self.assertEqual(catalog.get_catalog(self.translation), expected_value)
+
+    def test_cached_catalog_does_not_query(self):
+        catalog.get_catalog(self.translation)
+        with self.assertNumQueries(0):
+            catalog.get_catalog(self.translation.pk)
+
+    def test_save_invalidates_catalog(self):
+        version = catalog.get_version(self.translation)
+        catalog.get_catalog(self.translation)
+
+        self.translated_string1.value = 'Hola a todos'
+        self.translated_string1.save()
+
+        self.assertGreater(catalog.get_version(self.translation), version)
+        self.assertEqual(catalog.get_catalog(self.translation)['Hello world'], 'Hola a todos')
+
+    def test_delete_invalidates_catalog(self):
+        catalog.get_catalog(self.translation)
+        self.translated_string2.delete()
+        self.assertNotIn('Testing string', catalog.get_catalog(self.translation))
+
+    def test_import_invalidates_catalog(self):
+        catalog.get_catalog(self.translation)
+        self.translation.import_strings({'New string': 'Cadena nueva'})
+        self.assertEqual(catalog.get_catalog(self.translation)['New string'], 'Cadena nueva')
+
+    def test_evicted_version_is_not_reused(self):
+        version = catalog.get_version(self.translation)
+        catalog.get_cache().delete(catalog.version_key(self.translation))
+        self.assertGreater(catalog.bump_version(self.translation), version)
+
+    def test_cache_keys(self):
+        self.assertEqual(catalog.version_key(7), 'rockpile:catalog:7:version')
+        self.assertEqual(catalog.catalog_key(models.Translation(pk=7), 3), 'rockpile:catalog:7:3')
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test cloning
+--------------
+
+Tests for `django-rockpile` cloning module.
+"""
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from rockpile import models
+from rockpile.search import search_strings
+from tests.test_models import FewStringsProjectMixin
+
+
+class TestCloneTranslation(FewStringsProjectMixin, TestCase):
+
+    def setUp(self):
+        super(TestCloneTranslation, self).setUp()
+        self.translated_string1.move_after(self.translated_string2)
+
+    def test_clone(self):
+        clone = self.translation.clone('pt-br')
+
+        self.assertEqual(clone.project, self.translation_project)
+        self.assertEqual(clone.language, 'pt-br')
+        self.assertEqual(list(models.TranslatedString.objects.strings(clone).values_list('key', 'value', 'validated_by')),
+                         [(self.source_string2.pk, 'Probando cadena', None),
+                          (self.source_string1.pk, 'Hola mundo', None)])
+        self.assertFalse(clone.translators.exists())
+
+        # The denormalized data matches the copied strings
+        stored = models.Translation.objects.get(pk=clone.pk)
+        self.assertEqual((stored.num_strings, stored.num_validated_strings, stored.content_hash),
+                         (2, 0, self.translation.content_hash))
+        self.assertEqual(models.Translation.objects.rebuild_counters(models.Translation.objects.filter(pk=clone.pk)), 0)
+        self.assertEqual(models.StringChange.objects.delta(clone).strings,
+                         {'Hello world': 'Hola mundo', 'Testing string': 'Probando cadena'})
+        self.assertEqual([string.translation_id for string in search_strings('cadena')],
+                         [self.translation.pk, clone.pk])
+
+        clone.translatedstring_set.get(key=self.source_string1).delete()
+        self.assertEqual(models.StringChange.objects.delta(clone, stored.revision),
+                         (stored.revision + 1, False, {'Hello world': None}))
+
+    def test_clone_query_count(self):
+        for index in range(10):
+            source_string = models.SourceString.objects.create(value='String %d' % index,
+                                                               project=self.translation_project)
+            models.TranslatedString.objects.create(key=source_string, value='Cadena %d' % index,
+                                                   translation=self.translation)
+
+        # The same queries for any number of strings
+        with self.assertNumQueries(11):
+            clone = self.translation.clone('pt-br', translators=True)
+
+        self.assertEqual(clone.num_strings, 12)
+        self.assertEqual(list(clone.translators.all()), [self.translator])
+
+
+class TestAddLanguage(FewStringsProjectMixin, TestCase):
+
+    def setUp(self):
+        super(TestAddLanguage, self).setUp()
+        user = User.objects.create_user(username='jane', email='jane_doe@fake.com', password='top_secret')
+        self.other_translator = models.Translator.objects.create(user=user)
+
+    def test_add_language(self):
+        translation = self.translation_project.add_language('fr', translators=[self.other_translator])
+
+        self.assertEqual(list(translation.translators.all()), [self.other_translator])
+        self.assertEqual(translation.num_strings, 0)
+        self.assertEqual([queued.key for queued in models.QueuedString.objects.claim(translation, self.other_translator)],
+                         [self.source_string1, self.source_string2])
+
+    def test_add_language_from_source(self):
+        models.SourceString.objects.create(value='Third string', project=self.translation_project)
+        translation = self.translation_project.add_language('fr', source=self.translation)
+
+        self.assertEqual(translation.num_strings, 2)
+        self.assertEqual([queued.key.value for queued in models.QueuedString.objects.filter(translation=translation)],
+                         ['Third string'])
+
+    def test_source_of_another_project(self):
+        other_project = models.TranslationProject.objects.create(name='Other project', owner=self.owner)
+
+        with self.assertRaises(ValueError):
+            other_project.add_language('fr', source=self.translation)
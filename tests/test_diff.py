@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test diff
+--------------
+
+Tests for `django-rockpile` diff module.
+"""
+
+from django.test import TestCase
+
+from rockpile import models
+from rockpile.diff import apply_changeset, diff_strings
+from tests.test_models import FewStringsProjectMixin
+
+
+class TestDiff(FewStringsProjectMixin, TestCase):
+
+    def setUp(self):
+        super(TestDiff, self).setUp()
+        self.source_string3 = models.SourceString.objects.create(value='Third string', project=self.translation_project)
+        self.translated_string3 = models.TranslatedString.objects.create(key=self.source_string3, value='Tercera cadena',
+                                                                         translation=self.translation,
+                                                                         validated_by=self.translator)
+
+    def test_diff_strings(self):
+        strings = {'Hello world': 'Hola mundo', 'Testing string': 'Cadena de prueba', 'New string': 'Cadena nueva'}
+
+        with self.assertNumQueries(1):
+            changeset = diff_strings(self.translation, strings)
+
+        self.assertEqual(dict(changeset.added), {'New string': 'Cadena nueva'})
+        self.assertEqual(changeset.removed, frozenset(['Third string']))
+        self.assertEqual(changeset.modified, {'Testing string': 'Cadena de prueba'})
+
+    def test_diff_without_changes(self):
+        strings = {'Hello world': 'Hola mundo', 'Testing string': 'Probando cadena', 'Third string': 'Tercera cadena'}
+        self.assertTrue(diff_strings(self.translation, strings).is_empty)
+
+    def test_apply_changeset(self):
+        strings = {'Hello world': 'Hola a todos', 'Testing string': 'Probando cadena', 'New string': 'Cadena nueva'}
+        apply_changeset(self.translation, diff_strings(self.translation, strings))
+
+        self.assertTrue(diff_strings(self.translation, strings).is_empty)
+        self.assertFalse(models.TranslatedString.objects.filter(pk=self.translated_string3.pk).exists())
+        self.assertTrue(models.SourceString.objects.filter(pk=self.source_string3.pk).exists())
+
+        # Only the modified string loses its validation
+        self.assertIsNone(models.TranslatedString.objects.get(pk=self.translated_string1.pk).validated_by)
+
+        translation = models.Translation.objects.get(pk=self.translation.pk)
+        self.assertEqual((translation.num_strings, translation.num_validated_strings), (3, 0))
+
+    def test_apply_changeset_keeps_unchanged_validation(self):
+        strings = {'Hello world': 'Hola mundo', 'Testing string': 'Cadena de prueba'}
+        apply_changeset(self.translation, diff_strings(self.translation, strings))
+
+        self.assertEqual(models.TranslatedString.objects.get(pk=self.translated_string1.pk).validated_by, self.translator)
+        translation = models.Translation.objects.get(pk=self.translation.pk)
+        self.assertEqual((translation.num_strings, translation.num_validated_strings), (2, 1))
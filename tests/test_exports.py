@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test exports
+--------------
+
+Tests for `django-rockpile` exports module and view.
+"""
+
+import gzip
+from io import BytesIO
+
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.test import APIClient
+
+from rockpile import catalog, models, views
+from rockpile.exports import bundle_etag, get_bundle
+from tests.test_models import FewStringsProjectMixin
+
+
+class TestContentHash(FewStringsProjectMixin, TestCase):
+
+    def content_hash(self):
+        return models.Translation.objects.get(pk=self.translation.pk).content_hash
+
+    def assertContentHashIsExact(self):
+        self.assertEqual(models.Translation.objects.rebuild_counters(), 0)
+
+    def test_content_hash_on_create(self):
+        self.assertEqual(self.content_hash(),
+                         models.string_content_hash(self.source_string1.pk, 'Hola mundo') +
+                         models.string_content_hash(self.source_string2.pk, 'Probando cadena'))
+        self.assertEqual(self.translation.content_hash, self.content_hash())
+
+    def test_content_hash_on_save(self):
+        content_hash = self.content_hash()
+
+        self.translated_string1.value = 'Hola a todos'
+        self.translated_string1.save()
+        self.assertNotEqual(self.content_hash(), content_hash)
+        self.assertContentHashIsExact()
+
+        self.translated_string1.value = 'Hola mundo'
+        self.translated_string1.save()
+        self.assertEqual(self.content_hash(), content_hash)
+
+    def test_validation_does_not_change_content_hash(self):
+        content_hash = self.content_hash()
+        self.translated_string2.validated_by = self.translator
+        self.translated_string2.save()
+        self.assertEqual(self.content_hash(), content_hash)
+
+    def test_content_hash_on_delete(self):
+        self.translated_string1.delete()
+        self.assertContentHashIsExact()
+
+    def test_content_hash_on_import(self):
+        self.translation.import_strings({'Hello world': 'Hola a todos', 'New string': 'Cadena nueva'})
+        self.assertContentHashIsExact()
+
+    def test_rebuild_content_hash(self):
+        content_hash = self.content_hash()
+        models.Translation.objects.filter(pk=self.translation.pk).update(content_hash=0)
+
+        self.assertEqual(models.Translation.objects.rebuild_counters(), 1)
+        self.assertEqual(self.content_hash(), content_hash)
+
+
+class TestExports(FewStringsProjectMixin, TestCase):
+
+    def setUp(self):
+        catalog.get_cache().clear()
+        super(TestExports, self).setUp()
+        self.url = reverse('translation-export', args=[self.translation.pk, 'android'])
+
+    def translation_from_db(self):
+        return models.Translation.objects.get(pk=self.translation.pk)
+
+    def test_get_bundle_is_cached(self):
+        bundle = get_bundle(self.translation, 'po')
+        self.assertIn(b'msgstr "Hola mundo"', bundle.body)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_bundle(self.translation, 'po'), bundle)
+
+    def test_gzipped_body(self):
+        bundle = get_bundle(self.translation, 'android')
+        self.assertEqual(gzip.GzipFile(fileobj=BytesIO(bundle.gzipped_body)).read(), bundle.body)
+
+    def test_etag_changes_with_content(self):
+        etag = bundle_etag(self.translation_from_db(), 'android')
+
+        self.translated_string1.value = 'Hola a todos'
+        self.translated_string1.save()
+        self.assertNotEqual(bundle_etag(self.translation_from_db(), 'android'), etag)
+        self.assertIn(b'Hola a todos', get_bundle(self.translation_from_db(), 'android').body)
+
+    def test_etag_changes_with_order(self):
+        etag = bundle_etag(self.translation_from_db(), 'android')
+        body = get_bundle(self.translation_from_db(), 'android').body
+
+        self.translated_string2.move_before(self.translated_string1)
+        self.assertNotEqual(bundle_etag(self.translation_from_db(), 'android'), etag)
+        self.assertNotEqual(get_bundle(self.translation_from_db(), 'android').body, body)
+
+        etag = bundle_etag(self.translation_from_db(), 'android')
+        models.TranslatedString.objects.renumber(self.translation)
+        self.assertNotEqual(bundle_etag(self.translation_from_db(), 'android'), etag)
+
+    def test_export_view(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], bundle_etag(self.translation_from_db(), 'android'))
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="strings.xml"')
+        self.assertIn(b'<string name="Hello world">Hola mundo</string>', response.content)
+        self.assertEqual(self.client.head(self.url).status_code, 200)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+
+        # Only the translation is read
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        self.translation.import_strings({'New string': 'Cadena nueva'})
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_cached_bundle_is_not_rendered(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_gzip(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].endswith('-gzip"'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn(b'Hola mundo', gzip.GzipFile(fileobj=BytesIO(response.content)).read())
+
+    def test_gzip_refused(self):
+        for accept_encoding in ('gzip;q=0, deflate', 'deflate, *;q=0', '*, gzip;q=0.0', 'identity'):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING=accept_encoding)
+            self.assertFalse(response.has_header('Content-Encoding'), accept_encoding)
+            self.assertIn(b'Hola mundo', response.content)
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='identity;q=0.5, *;q=0.1')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_export_permissions(self):
+        # The default permission classes are read when the views are defined
+        self.addCleanup(setattr, views.TranslationViewSet, 'permission_classes',
+                        views.TranslationViewSet.permission_classes)
+        views.TranslationViewSet.permission_classes = [IsAuthenticated]
+
+        client = APIClient()
+        self.assertEqual(client.get(self.url).status_code, 403)
+
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get(self.url).status_code, 200)
+
+    def test_export_ignores_accept(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='application/xml')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/xml; charset=utf-8')
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get(reverse('translation-export', args=[self.translation.pk, 'xls'])).status_code,
+                         404)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test importers
+--------------
+
+Tests for `django-rockpile` importers module.
+"""
+
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils.six import StringIO
+
+from rockpile import models
+from rockpile.importers import android_language, import_android_resources, import_strings
+from rockpile.writers import write_android_strings
+from tests.test_models import BasicProjectMixin, FewStringsProjectMixin
+
+
+class TestImportStrings(BasicProjectMixin, TestCase):
+
+    def test_import_new_strings(self):
+        strings = OrderedDict([('Hello world', 'Hola mundo'), ('Testing string', 'Probando cadena')])
+        result = import_strings(self.translation, strings)
+
+        self.assertEqual(result, (2, 0))
+        self.assertEqual(list(models.SourceString.objects.for_translation(self.translation).values_list('value', flat=True)),
+                         ['Hello world', 'Testing string'])
+        self.assertEqual(list(models.TranslatedString.objects.strings(self.translation).values_list('key__value', 'value')),
+                         [('Hello world', 'Hola mundo'), ('Testing string', 'Probando cadena')])
+
+    def test_import_query_count(self):
+        strings = OrderedDict(('key %d' % i, 'value %d' % i) for i in range(100))
+
+        with self.assertNumQueries(15):
+            import_strings(self.translation, strings)
+
+        self.assertEqual(models.TranslatedString.objects.strings(self.translation).count(), 100)
+
+    def test_import_from_translation(self):
+        self.translation.import_strings({'Hello world': 'Hola mundo'})
+        self.assertEqual(models.TranslatedString.objects.strings(self.translation).count(), 1)
+
+
+class TestImportExistingStrings(FewStringsProjectMixin, TestCase):
+
+    def test_import_changed_strings(self):
+        result = self.translation.import_strings({'Hello world': 'Hola a todos', 'Testing string': 'Probando cadena'})
+
+        self.assertEqual(result, (0, 1))
+        translated_string = models.TranslatedString.objects.get(pk=self.translated_string1.pk)
+        self.assertEqual(translated_string.value, 'Hola a todos')
+        self.assertFalse(translated_string.is_validated)
+
+    def test_import_matches_source_strings(self):
+        self.translation.import_strings({'Hello world': 'Hola mundo', 'New string': 'Cadena nueva'})
+
+        self.assertEqual(models.SourceString.objects.filter(project=self.translation_project).count(), 3)
+        self.assertEqual(models.TranslatedString.objects.get(pk=self.translated_string1.pk).validated_by, self.translator)
+
+    def test_import_shares_source_strings(self):
+        translation = models.Translation.objects.create(project=self.translation_project, language='fr')
+        translation.import_strings({'Hello world': 'Bonjour le monde', 'New string': u'Nouvelle chaîne'})
+
+        self.assertEqual(models.SourceString.objects.filter(project=self.translation_project).count(), 3)
+        self.assertEqual(models.TranslatedString.objects.get(translation=translation, value='Bonjour le monde').key,
+                         self.source_string1)
+
+    def test_import_updates_counters(self):
+        self.translation.import_strings({'Hello world': 'Hola a todos', 'New string': 'Cadena nueva'})
+
+        translation = models.Translation.objects.get(pk=self.translation.pk)
+        self.assertEqual((translation.num_strings, translation.num_validated_strings), (3, 0))
+
+
+class TestImportAndroidResources(BasicProjectMixin, TestCase):
+
+    def setUp(self):
+        super(TestImportAndroidResources, self).setUp()
+        self.res_dir = tempfile.mkdtemp()
+        files = {
+            'values': {'app_name': 'Hello rockpile'},
+            'values-es': {'app_name': 'Hola rockpile', 'info_text': 'probando android'},
+            'values-pt-rBR': {'app_name': u'Olá rockpile'},
+            'values-land': {'app_name': 'Landscape'},
+        }
+        for folder_name, strings in files.items():
+            os.mkdir(os.path.join(self.res_dir, folder_name))
+            with open(os.path.join(self.res_dir, folder_name, 'strings.xml'), 'wb') as file_obj:
+                write_android_strings(strings, file_obj)
+
+    def tearDown(self):
+        shutil.rmtree(self.res_dir)
+
+    def test_android_language(self):
+        self.assertEqual(android_language('values'), '')
+        self.assertEqual(android_language('values-es'), 'es')
+        self.assertEqual(android_language('values-pt-rBR'), 'pt-br')
+        self.assertEqual(android_language('values-b+sr+Latn'), 'sr-latn')
+        self.assertIsNone(android_language('values-land'))
+        self.assertIsNone(android_language('drawable'))
+
+    def test_import_android_resources(self):
+        progress = []
+        results = import_android_resources(self.translation_project, self.res_dir, workers=2,
+                                           progress=lambda *args: progress.append(args))
+
+        self.assertEqual(sorted(results), ['es', 'pt-br'])
+        self.assertEqual(sorted((language, total) for language, _, total, _ in progress), [('es', 2), ('pt-br', 2)])
+
+        translation = models.Translation.objects.get(project=self.translation_project, language='pt-br')
+        self.assertEqual(list(models.TranslatedString.objects.strings(translation).values_list('key__value', 'value')),
+                         [('app_name', u'Olá rockpile')])
+        self.assertEqual(models.TranslatedString.objects.strings(self.translation).count(), 2)
+
+    def test_default_language_of_another_folder(self):
+        with self.assertRaises(ValueError):
+            import_android_resources(self.translation_project, self.res_dir, workers=1, default_language='es')
+
+        self.assertEqual(models.TranslatedString.objects.strings(self.translation).count(), 0)
+        with self.assertRaises(CommandError):
+            call_command('rockpile_import_android', self.translation_project.pk, self.res_dir, workers=1,
+                         default_language='pt-br', stdout=StringIO())
+
+    def test_import_android_command(self):
+        stdout = StringIO()
+        call_command('rockpile_import_android', self.translation_project.pk, self.res_dir, workers=1,
+                     default_language='en', stdout=stdout)
+
+        self.assertEqual(models.Translation.objects.filter(project=self.translation_project).count(), 3)
+        self.assertIn('Imported 3 locale(s)', stdout.getvalue())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test instrumentation
+--------------
+
+Tests for `django-rockpile` instrumentation module.
+"""
+
+from io import BytesIO
+
+from django.db import connections
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from rockpile import catalog, instrumentation, models
+from rockpile.writers import write_po
+from tests.test_models import FewStringsProjectMixin
+
+
+@override_settings(ROCKPILE_INSTRUMENTATION_BACKEND='rockpile.instrumentation.MemoryBackend')
+class TestInstrumentation(FewStringsProjectMixin, TestCase):
+
+    def operations(self, name):
+        return [operation for operation in instrumentation.get_backend().operations if operation.name == name]
+
+    def test_import(self):
+        self.translation.import_strings({'Hello world': 'Hola a todos', 'New string': 'Cadena nueva'})
+
+        operation, = self.operations('import')
+        self.assertEqual(operation.tags, {'translation': self.translation.pk})
+        self.assertEqual(operation.rows, 2)
+        self.assertGreater(operation.queries, 0)
+        self.assertGreaterEqual(operation.duration, 0)
+
+    def test_export(self):
+        self.assertEqual(write_po(self.translation, BytesIO()), 2)
+
+        operation, = self.operations('export')
+        self.assertEqual(operation.tags, {'format': 'po', 'translation': self.translation.pk})
+        self.assertEqual((operation.rows, operation.queries), (2, 1))
+
+    def test_catalog_build(self):
+        catalog.get_cache().clear()
+        catalog.get_catalog(self.translation)
+        catalog.get_catalog(self.translation)
+
+        operation, = self.operations('catalog.build')
+        self.assertEqual((operation.rows, operation.queries), (2, 1))
+
+    def test_query_log_is_left_disabled(self):
+        connection = connections['default']
+        with instrumentation.instrument('import') as operation:
+            self.assertFalse(connection.queries_logged)
+            models.Translation.objects.count()
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+
+        self.assertEqual(operation.queries, 2)
+        self.assertNotIn('make_cursor', connection.__dict__)
+
+    def test_nested_operations(self):
+        with instrumentation.instrument('import') as outer:
+            models.Translation.objects.count()
+            with instrumentation.instrument('export') as inner:
+                models.Translation.objects.count()
+
+        self.assertEqual((outer.queries, inner.queries), (2, 1))
+
+    def test_null_backend_does_not_measure(self):
+        with override_settings(ROCKPILE_INSTRUMENTATION_BACKEND='rockpile.instrumentation.NullBackend'):
+            with instrumentation.instrument('import') as operation:
+                pass
+        self.assertIsNone(operation.duration)
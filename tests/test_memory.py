@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test memory
+--------------
+
+Tests for `django-rockpile` translation memory.
+"""
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.six import StringIO
+
+from rockpile import models
+from tests.test_models import FewStringsProjectMixin
+
+
+class TestTrigrams(TestCase):
+
+    def test_trigrams(self):
+        self.assertEqual(models.trigrams(u'Ok'), set([u' ok', u'ok ']))
+        self.assertEqual(models.trigrams(u'  Hello \n world'), models.trigrams(u'hello world'))
+        self.assertEqual(models.trigrams(u''), set())
+
+
+class TestTranslationMemory(FewStringsProjectMixin, TestCase):
+
+    def setUp(self):
+        super(TestTranslationMemory, self).setUp()
+        self.other_project = models.TranslationProject.objects.create(name='Other project', owner=self.owner)
+        self.other_translation = models.Translation.objects.create(project=self.other_project, language='es')
+        source_string = models.SourceString.objects.create(value='Hello big world', project=self.other_project)
+        self.other_string = models.TranslatedString.objects.create(key=source_string, value='Hola gran mundo',
+                                                                   translation=self.other_translation,
+                                                                   validated_by=self.translator)
+
+    def matches(self, value, **kwargs):
+        return [(string.value, round(string.similarity, 2))
+                for string in models.MemoryTrigram.objects.matches('es', value, **kwargs)]
+
+    def test_matches_across_projects(self):
+        with self.assertNumQueries(2):
+            matches = models.MemoryTrigram.objects.matches('es', 'Hello world!')
+
+        self.assertEqual([string.value for string in matches], ['Hola mundo', 'Hola gran mundo'])
+        self.assertGreater(matches[0].similarity, matches[1].similarity)
+        self.assertEqual(matches[1].key.value, 'Hello big world')
+
+    def test_exact_match(self):
+        self.assertEqual(self.matches('hello  WORLD', limit=1), [('Hola mundo', 1.0)])
+
+    def test_min_similarity(self):
+        self.assertEqual(self.matches('Hello world', min_similarity=0.9), [('Hola mundo', 1.0)])
+        self.assertEqual(self.matches('Goodbye'), [])
+        self.assertEqual(self.matches(''), [])
+
+    def test_only_language(self):
+        self.assertEqual(models.MemoryTrigram.objects.matches('fr', 'Hello world'), [])
+
+    def test_index_on_validation(self):
+        self.assertEqual(self.matches('Testing string'), [])
+
+        self.translated_string2.validated_by = self.translator
+        self.translated_string2.save()
+        self.assertEqual(self.matches('Testing string'), [('Probando cadena', 1.0)])
+
+        self.translated_string2.validated_by = None
+        self.translated_string2.save()
+        self.assertEqual(self.matches('Testing string'), [])
+
+    def test_index_on_key_change(self):
+        source_string = models.SourceString.objects.create(value='Goodbye world', project=self.translation_project)
+        self.translated_string1.key = source_string
+        self.translated_string1.save()
+
+        self.assertEqual(self.matches('Goodbye world', min_similarity=0.9), [('Hola mundo', 1.0)])
+        self.assertEqual(self.matches('Hello world'), [('Hola gran mundo', 0.77)])
+
+    def test_unindex_on_delete(self):
+        self.translated_string1.delete()
+        self.assertEqual(self.matches('Hello world'), [('Hola gran mundo', 0.77)])
+
+    def test_deleted_candidates_are_skipped(self):
+        manager = models.TranslatedString.objects
+
+        # The string is deleted between the queries of matches, once the candidates
+        # were read and before the strings are fetched
+        def select_related(*fields):
+            del manager.select_related
+            self.translated_string1.delete()
+            return manager.select_related(*fields)
+
+        manager.select_related = select_related
+        self.addCleanup(manager.__dict__.pop, 'select_related', None)
+
+        self.assertEqual(self.matches('Hello world'), [('Hola gran mundo', 0.77)])
+        self.assertNotIn('select_related', manager.__dict__)
+
+    def test_unindex_on_import(self):
+        self.translation.import_strings({'Hello world': 'Hola a todos'})
+        self.assertEqual(self.matches('Hello world'), [('Hola gran mundo', 0.77)])
+
+    def test_rebuild_memory_command(self):
+        models.MemoryTrigram.objects.all().delete()
+        stdout = StringIO()
+        call_command('rockpile_rebuild_memory', stdout=stdout)
+
+        self.assertIn('Indexed 2 validated string(s)', stdout.getvalue())
+        self.assertEqual(self.matches('Hello world', limit=1), [('Hola mundo', 1.0)])
@@ -8,9 +8,15 @@ test_django-rockpile
 Tests for `django-rockpile` modules module.
 """
 
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
 from django.contrib.auth.models import User
+from django.utils.six import StringIO
 from rockpile import models
+from rockpile.diff import apply_changeset, diff_strings
 
 
 class BasicProjectMixin(object):
@@ -30,12 +36,14 @@ class FewStringsProjectMixin(BasicProjectMixin):
     def setUp(self):
         super(FewStringsProjectMixin, self).setUp()
 
+        # Source strings
+        self.source_string1 = models.SourceString.objects.create(value='Hello world', project=self.translation_project)
+        self.source_string2 = models.SourceString.objects.create(value='Testing string', project=self.translation_project)
+
         # Translated strings
-        self.main_string1 = models.TranslatedString.objects.create(value='Hello world', translation=self.translation)
-        self.translated_string1 = models.TranslatedString.objects.create(key=self.main_string1, value='Hola mundo',
+        self.translated_string1 = models.TranslatedString.objects.create(key=self.source_string1, value='Hola mundo',
                                                                          translation=self.translation, validated_by=self.translator)
-        self.main_string2 = models.TranslatedString.objects.create(value='Testing string', translation=self.translation)
-        self.translated_string2 = models.TranslatedString.objects.create(key=self.main_string2, value='Probando cadena',
+        self.translated_string2 = models.TranslatedString.objects.create(key=self.source_string2, value='Probando cadena',
                                                                          translation=self.translation)
 
 
@@ -51,25 +59,87 @@ class TestTranslation(FewStringsProjectMixin, TestCase):
         self.assertEqual(self.translation.percentage_completed, 50.0)
 
 
+class TestTranslationCounters(FewStringsProjectMixin, TestCase):
+
+    def assertCounters(self, num_strings, num_validated_strings):
+        translation = models.Translation.objects.get(pk=self.translation.pk)
+        self.assertEqual((translation.num_strings, translation.num_validated_strings),
+                         (num_strings, num_validated_strings))
+
+    def test_counters_on_create(self):
+        self.assertCounters(2, 1)
+        self.assertEqual((self.translation.num_strings, self.translation.num_validated_strings), (2, 1))
+
+    def test_counters_on_validate(self):
+        translated_string = models.TranslatedString.objects.get(pk=self.translated_string2.pk)
+        translated_string.validated_by = self.translator
+        translated_string.save()
+        self.assertCounters(2, 2)
+
+        translated_string.validated_by = None
+        translated_string.save()
+        translated_string.save()
+        self.assertCounters(2, 1)
+
+    def test_counters_on_save_unloaded_instance(self):
+        models.TranslatedString(pk=self.translated_string1.pk, key=self.source_string1, value='Hola mundo',
+                                translation=self.translation, position=1).save()
+        self.assertCounters(2, 0)
+
+    def test_counters_on_delete(self):
+        self.translated_string1.delete()
+        self.assertCounters(1, 0)
+
+        # Deleting a source string also deletes its translated strings
+        models.SourceString.objects.get(pk=self.source_string2.pk).delete()
+        self.assertCounters(0, 0)
+
+    def test_percentage_completion_does_not_query(self):
+        translation = models.Translation.objects.get(pk=self.translation.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(translation.percentage_completed, 50.0)
+
+    def test_rebuild_counters_command(self):
+        models.Translation.objects.filter(pk=self.translation.pk).update(num_strings=10, num_validated_strings=0)
+        stdout = StringIO()
+        call_command('rockpile_rebuild_counters', stdout=stdout)
+
+        self.assertCounters(2, 1)
+        self.assertIn('Rebuilt counters of 1 translation(s)', stdout.getvalue())
+
+
 class TestTranslatedString(FewStringsProjectMixin, TestCase):
 
     def test_is_validated_property(self):
-        self.assertEqual(self.main_string1.is_validated, False)
         self.assertEqual(self.translated_string1.is_validated, True)
         self.assertEqual(self.translated_string2.is_validated, False)
 
-    def test_is_main_string_property(self):
-        self.assertEqual(self.main_string1.is_main_string, True)
-        self.assertEqual(self.translated_string1.is_main_string, False)
+    def test_properties_do_not_query(self):
+        string = models.TranslatedString.objects.get(pk=self.translated_string1.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(string.is_validated)
+            self.assertEqual(string.key_id, self.source_string1.pk)
+
+    def test_manager_for_display(self):
+        for index in range(20):
+            source_string = models.SourceString.objects.create(value='Key %d' % index, project=self.translation_project)
+            models.TranslatedString.objects.create(key=source_string, value='Valor %d' % index,
+                                                   translation=self.translation, validated_by=self.translator)
+
+        with self.assertNumQueries(1):
+            strings = list(models.TranslatedString.objects.for_display(self.translation))
+            for string in strings:
+                string.key.value
+                if string.is_validated:
+                    string.validated_by.user.get_username()
+
+        self.assertEqual(len(strings), 22)
+        self.assertEqual(strings[:2], [self.translated_string1, self.translated_string2])
 
     def test_manager_strings(self):
         expected_result = [self.translated_string1, self.translated_string2]
         self.assertEquals(list(models.TranslatedString.objects.strings(self.translation)), expected_result)
 
-    def test_manager_keys(self):
-        expected_result = [self.main_string1, self.main_string2]
-        self.assertEquals(list(models.TranslatedString.objects.keys(self.translation)), expected_result)
-
     def test_manager_validated(self):
         expected_result = [self.translated_string1]
         self.assertEquals(list(models.TranslatedString.objects.validated(self.translation)), expected_result)
@@ -77,3 +147,350 @@ class TestTranslatedString(FewStringsProjectMixin, TestCase):
     def test_manager_not_validated(self):
         expected_result = [self.translated_string2]
         self.assertEquals(list(models.TranslatedString.objects.not_validated(self.translation)), expected_result)
+
+
+class TestBulkValidation(FewStringsProjectMixin, TestCase):
+
+    def setUp(self):
+        super(TestBulkValidation, self).setUp()
+        user = User.objects.create_user(username='jane', email='jane_doe@fake.com', password='top_secret')
+        self.other_translator = models.Translator.objects.create(user=user)
+
+    def assertCounters(self, num_strings, num_validated_strings):
+        translation = models.Translation.objects.get(pk=self.translation.pk)
+        self.assertEqual((translation.num_strings, translation.num_validated_strings),
+                         (num_strings, num_validated_strings))
+
+    def test_validate(self):
+        pks = [self.translated_string1.pk, self.translated_string2.pk]
+        with self.assertNumQueries(13):
+            result = models.TranslatedString.objects.validate(pks, self.translator)
+
+        self.assertEqual(result.updated, 1)
+        self.assertEqual(result.translations, [self.translation])
+        self.assertEqual(result.translations[0].percentage_completed, 100.0)
+        self.assertCounters(2, 2)
+        self.assertEqual(models.TranslatedString.objects.validated(self.translation).count(), 2)
+        self.assertEqual([string.pk for string in models.MemoryTrigram.objects.matches('es', 'Testing string')],
+                         [self.translated_string2.pk])
+
+    def test_only_new_validations_are_indexed(self):
+        trigram_pks = set(models.MemoryTrigram.objects.filter(string=self.translated_string1).values_list('pk',
+                                                                                                         flat=True))
+        models.TranslatedString.objects.validate([self.translated_string1.pk, self.translated_string2.pk],
+                                                 self.translator)
+
+        self.assertEqual(set(models.MemoryTrigram.objects.filter(string=self.translated_string1).values_list(
+            'pk', flat=True)), trigram_pks)
+        self.assertEqual(list(models.StringChange.objects.filter(translation=self.translation).values_list(
+            'key', 'value'))[-1:], [('Testing string', 'Probando cadena')])
+
+    def test_validate_many_translations(self):
+        other_translation = models.Translation.objects.create(project=self.translation_project, language='fr')
+        other_translation.translators.add(self.translator)
+        other_string = models.TranslatedString.objects.create(key=self.source_string1, value='Bonjour le monde',
+                                                              translation=other_translation)
+        revision = models.Translation.objects.get(pk=other_translation.pk).revision
+
+        # The same queries as for a single translation
+        with self.assertNumQueries(13):
+            result = models.TranslatedString.objects.validate([self.translated_string2.pk, other_string.pk],
+                                                              self.translator)
+
+        self.assertEqual(result.updated, 2)
+        self.assertEqual([translation.num_validated_strings for translation in result.translations], [2, 1])
+        self.assertEqual(result.translations[1].revision, revision + 1)
+        self.assertEqual(models.StringChange.objects.delta(other_translation, revision).strings,
+                         {'Hello world': 'Bonjour le monde'})
+        self.assertEqual([string.pk for string in models.MemoryTrigram.objects.matches('fr', 'Hello world')],
+                         [other_string.pk])
+
+    def test_unvalidate(self):
+        pks = [self.translated_string1.pk, self.translated_string2.pk]
+        result = models.TranslatedString.objects.unvalidate(pks, self.translator)
+
+        self.assertEqual(result.updated, 1)
+        self.assertEqual(result.translations[0].percentage_completed, 0.0)
+        self.assertCounters(2, 0)
+        self.assertEqual(models.MemoryTrigram.objects.matches('es', 'Hello world'), [])
+
+    def test_requires_membership(self):
+        result = models.TranslatedString.objects.validate([self.translated_string2.pk], self.other_translator)
+
+        self.assertEqual(result, (0, []))
+        self.assertCounters(2, 1)
+
+        self.translation.translators.add(self.other_translator)
+        result = models.TranslatedString.objects.validate([self.translated_string2.pk], self.other_translator)
+        self.assertEqual(result.updated, 1)
+        self.assertEqual(models.TranslatedString.objects.get(pk=self.translated_string2.pk).validated_by,
+                         self.other_translator)
+
+
+class TestTranslatedStringPosition(FewStringsProjectMixin, TestCase):
+
+    def setUp(self):
+        super(TestTranslatedStringPosition, self).setUp()
+        self.source_string3 = models.SourceString.objects.create(value='Third string', project=self.translation_project)
+        self.translated_string3 = models.TranslatedString.objects.create(key=self.source_string3, value='Tercera cadena',
+                                                                         translation=self.translation)
+
+    def ordered(self):
+        return list(models.TranslatedString.objects.filter(translation=self.translation))
+
+    def test_new_strings_are_appended(self):
+        self.assertEqual(self.ordered(), [self.translated_string1, self.translated_string2, self.translated_string3])
+        self.assertEqual(self.translated_string3.position, 3 * models.POSITION_GAP)
+
+    def test_move_after_updates_one_row(self):
+        # One string and the order revision of its translation are updated
+        with self.assertNumQueries(4):
+            self.translated_string3.move_after(self.translated_string1)
+
+        self.assertEqual(self.ordered(), [self.translated_string1, self.translated_string3, self.translated_string2])
+        self.assertEqual(models.TranslatedString.objects.get(pk=self.translated_string2.pk).position,
+                         2 * models.POSITION_GAP)
+
+    def test_move_to_the_beginning(self):
+        self.translated_string3.move_after(None)
+        self.assertEqual(self.ordered()[0], self.translated_string3)
+
+    def test_move_before(self):
+        self.translated_string3.move_before(self.translated_string2)
+        self.assertEqual(self.ordered(), [self.translated_string1, self.translated_string3, self.translated_string2])
+
+    def test_insert_unsaved_string_between(self):
+        source_string = models.SourceString.objects.create(value='Inserted', project=self.translation_project)
+        string = models.TranslatedString(key=source_string, value='Insertada', translation=self.translation)
+        string.move_after(self.translated_string1)
+        string.save()
+        self.assertEqual(self.ordered()[:3], [self.translated_string1, string, self.translated_string2])
+
+    def test_renumber_when_gap_is_exhausted(self):
+        models.TranslatedString.objects.filter(pk=self.translated_string2.pk).update(
+            position=self.translated_string1.position + 1)
+
+        self.translated_string3.move_after(self.translated_string1)
+
+        self.assertEqual(self.ordered(), [self.translated_string1, self.translated_string3, self.translated_string2])
+        positions = [string.position for string in self.ordered()]
+        self.assertTrue(all(following - previous > 1 for previous, following in zip(positions, positions[1:])))
+
+    def test_renumber(self):
+        models.TranslatedString.objects.filter(translation=self.translation).update(position=1)
+        models.TranslatedString.objects.renumber(self.translation)
+
+        self.assertEqual([string.position for string in self.ordered()],
+                         [models.POSITION_GAP * index for index in range(1, 4)])
+
+
+class TestSourceString(FewStringsProjectMixin, TestCase):
+
+    def setUp(self):
+        super(TestSourceString, self).setUp()
+        self.other_translation = models.Translation.objects.create(project=self.translation_project, language='fr')
+        models.TranslatedString.objects.create(key=self.source_string2, value=u'Chaîne de test',
+                                               translation=self.other_translation)
+
+    def test_hash(self):
+        self.assertEqual(self.source_string1.hash, models.source_hash('Hello world'))
+        self.assertEqual(len(self.source_string1.hash), 40)
+
+    def test_value_is_immutable(self):
+        self.source_string1.value = 'Goodbye world'
+        with self.assertRaises(ValueError):
+            self.source_string1.save()
+        self.assertEqual(models.SourceString.objects.get(pk=self.source_string1.pk).value, 'Hello world')
+
+        self.source_string1.value = 'Hello world'
+        self.source_string1.save()
+
+    def test_manager_for_translation(self):
+        self.assertEqual(list(models.SourceString.objects.for_translation(self.translation)),
+                         [self.source_string1, self.source_string2])
+        self.assertEqual(list(models.SourceString.objects.for_translation(self.other_translation)),
+                         [self.source_string2])
+
+    def test_manager_untranslated(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(list(models.SourceString.objects.untranslated(self.other_translation)),
+                             [self.source_string1])
+        self.assertEqual(list(models.SourceString.objects.untranslated(self.translation)), [])
+
+    def test_manager_for_values(self):
+        sources = models.SourceString.objects.for_values(self.translation_project, [u'Hello world', u'New string'])
+
+        self.assertEqual(sources[u'Hello world'], self.source_string1.pk)
+        self.assertEqual(models.SourceString.objects.get(pk=sources[u'New string']).value, u'New string')
+        self.assertEqual(models.SourceString.objects.filter(project=self.translation_project).count(), 3)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(models.SourceString.objects.for_values(self.translation_project, [u'New string']),
+                             {u'New string': sources[u'New string']})
+
+    def test_unique_per_project(self):
+        other_project = models.TranslationProject.objects.create(name='Other project', owner=self.owner)
+        models.SourceString.objects.create(value='Hello world', project=other_project)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            models.SourceString.objects.create(value='Hello world', project=self.translation_project)
+
+
+class TestWorkQueue(FewStringsProjectMixin, TestCase):
+
+    def setUp(self):
+        super(TestWorkQueue, self).setUp()
+        user = User.objects.create_user(username='jane', email='jane_doe@fake.com', password='top_secret')
+        self.other_translator = models.Translator.objects.create(user=user)
+        self.other_translation = models.Translation.objects.create(project=self.translation_project, language='fr')
+        self.source_string3 = models.SourceString.objects.create(value='Third string', project=self.translation_project)
+        models.TranslatedString.objects.create(key=self.source_string2, value=u'Chaîne de test',
+                                               translation=self.other_translation)
+
+    def claimed_keys(self, translator, limit=models.CLAIM_BATCH_SIZE):
+        return [queued.key for queued in models.QueuedString.objects.claim(self.other_translation, translator, limit)]
+
+    def test_enqueue(self):
+        self.assertEqual(models.QueuedString.objects.enqueue(self.other_translation), 2)
+        self.assertEqual(models.QueuedString.objects.enqueue(self.other_translation), 0)
+        self.assertEqual(models.QueuedString.objects.enqueue(self.translation), 1)
+
+    def test_claim(self):
+        models.QueuedString.objects.enqueue(self.other_translation)
+
+        # Select, update and fetch, plus the savepoint
+        with self.assertNumQueries(5):
+            self.assertEqual(self.claimed_keys(self.translator, limit=1), [self.source_string1])
+        self.assertEqual(self.claimed_keys(self.other_translator), [self.source_string3])
+        self.assertEqual(self.claimed_keys(self.other_translator), [])
+
+    def test_expired_claims_are_claimed_again(self):
+        models.QueuedString.objects.enqueue(self.other_translation)
+
+        with self.settings(ROCKPILE_CLAIM_LEASE=-1):
+            self.assertEqual(len(self.claimed_keys(self.translator)), 2)
+        self.assertEqual(len(self.claimed_keys(self.other_translator)), 2)
+        self.assertEqual(self.claimed_keys(self.translator), [])
+
+    def test_release(self):
+        models.QueuedString.objects.enqueue(self.other_translation)
+        self.claimed_keys(self.translator)
+
+        self.assertEqual(models.QueuedString.objects.release(self.other_translation, self.other_translator), 0)
+        self.assertEqual(models.QueuedString.objects.release(self.other_translation, self.translator), 2)
+        self.assertEqual(self.claimed_keys(self.other_translator), [self.source_string1, self.source_string3])
+
+    def test_translated_strings_leave_the_queue(self):
+        models.QueuedString.objects.enqueue(self.other_translation)
+        self.claimed_keys(self.translator)
+
+        models.TranslatedString.objects.create(key=self.source_string1, value='Bonjour le monde',
+                                               translation=self.other_translation)
+        self.other_translation.import_strings({'Third string': u'Troisième chaîne'})
+
+        self.assertFalse(models.QueuedString.objects.filter(translation=self.other_translation).exists())
+
+
+class TestRevisionLog(FewStringsProjectMixin, TestCase):
+
+    def delta(self, since):
+        return models.StringChange.objects.delta(self.translation, since)
+
+    def test_changes_are_recorded(self):
+        self.assertEqual(self.delta(0), (2, False, {'Hello world': 'Hola mundo', 'Testing string': 'Probando cadena'}))
+
+        self.translated_string1.value = 'Hola mundo!'
+        self.translated_string1.save()
+        self.translated_string2.validated_by = self.translator
+        self.translated_string2.save()
+        self.translated_string1.delete()
+        self.assertEqual(self.delta(2), (5, False, {'Hello world': None, 'Testing string': 'Probando cadena'}))
+
+        # Saving without changes records nothing
+        self.translated_string2.save()
+        self.assertEqual(self.delta(5), (5, False, {}))
+
+    def test_bulk_changes_are_recorded(self):
+        models.TranslatedString.objects.unvalidate([self.translated_string1.pk], self.translator)
+        self.assertEqual(self.delta(2), (3, False, {'Hello world': 'Hola mundo'}))
+
+        strings = {'Hello world': 'Hola', 'New string': 'Nueva cadena'}
+        apply_changeset(self.translation, diff_strings(self.translation, strings))
+        self.assertEqual(self.delta(3), (6, False, {'Hello world': 'Hola', 'New string': 'Nueva cadena',
+                                                    'Testing string': None}))
+
+    def test_compact(self):
+        self.translated_string1.value = 'Hola mundo!'
+        self.translated_string1.save()
+        self.translated_string2.delete()
+
+        self.assertEqual(models.StringChange.objects.compact(self.translation, 3), 2)
+        self.assertEqual(models.StringChange.objects.filter(translation=self.translation).count(), 2)
+
+        # Clients that synced before the compaction get the whole catalog
+        self.assertEqual(self.delta(2), (4, True, {'Hello world': 'Hola mundo!'}))
+        self.assertEqual(self.delta(3), (4, False, {'Testing string': None}))
+
+        self.assertEqual(models.StringChange.objects.compact(self.translation), 1)
+        self.assertEqual(self.delta(0), (4, True, {'Hello world': 'Hola mundo!'}))
+
+    def test_compact_changes_command(self):
+        stdout = StringIO()
+        call_command('rockpile_compact_changes', '--keep=0', stdout=stdout)
+
+        self.assertIn('Deleted 0 obsolete change(s)', stdout.getvalue())
+        self.assertEqual(self.delta(1), (2, True, {'Hello world': 'Hola mundo', 'Testing string': 'Probando cadena'}))
+
+    def test_deleting_the_translation_deletes_the_log(self):
+        self.translation.delete()
+        self.assertFalse(models.StringChange.objects.exists())
+
+
+class TestTranslationManager(FewStringsProjectMixin, TestCase):
+
+    def setUp(self):
+        super(TestTranslationManager, self).setUp()
+        self.empty_translation = models.Translation.objects.create(project=self.translation_project, language='fr')
+
+    def test_with_completion(self):
+        with self.assertNumQueries(1):
+            translations = list(models.Translation.objects.with_completion().order_by('pk'))
+            self.assertEqual([translation.percentage_completed for translation in translations], [50.0, 0.0])
+
+        self.assertEqual((translations[0].total_strings, translations[0].validated_strings), (2, 1))
+        self.assertEqual((translations[1].total_strings, translations[1].validated_strings), (0, 0))
+
+
+class TestTranslatedStringIndexes(FewStringsProjectMixin, TestCase):
+
+    def rockpile_indexes(self):
+        """
+        Returns the names of the composite and partial indexes on translated strings
+        """
+
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, models.TranslatedString._meta.db_table)
+        names = set(name for name, constraint in constraints.items()
+                    if constraint['index'] and len(constraint['columns']) > 1)
+        return names | set(['rockpile_ts_not_validated_idx'])
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql, params)
+            else:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return ' '.join(str(column) for row in cursor.fetchall() for column in row)
+
+    def assertUsesRockpileIndex(self, queryset):
+        plan = self.query_plan(queryset)
+        self.assertTrue(any(name in plan for name in self.rockpile_indexes()), plan)
+
+    @skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'Query plans are only checked on SQLite and PostgreSQL')
+    def test_manager_queries_use_indexes(self):
+        manager = models.TranslatedString.objects
+        for queryset in (manager.strings(self.translation), manager.validated(self.translation),
+                         manager.not_validated(self.translation)):
+            self.assertUsesRockpileIndex(queryset)
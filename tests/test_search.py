@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test search
+--------------
+
+Tests for `django-rockpile` search module.
+"""
+
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from rockpile import models
+from rockpile.search import search_strings
+from tests.test_models import FewStringsProjectMixin
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'Full-text search is only indexed on SQLite and PostgreSQL')
+class TestSearch(FewStringsProjectMixin, TestCase):
+
+    def values(self, query, **kwargs):
+        return [string.value for string in search_strings(query, **kwargs)]
+
+    def test_search(self):
+        with self.assertNumQueries(2):
+            strings = search_strings('mundo')
+
+        self.assertEqual(strings, [self.translated_string1])
+        self.assertEqual(strings[0].highlight, 'Hola <mark>mundo</mark>')
+        self.assertEqual(strings[0].key.value, 'Hello world')
+
+    def test_highlight_is_escaped(self):
+        source_string = models.SourceString.objects.create(value='Script', project=self.translation_project)
+        models.TranslatedString.objects.create(key=source_string, value='<script>alert("mundo")</script> & mundo',
+                                               translation=self.translation)
+
+        self.assertEqual(search_strings('alert')[0].highlight,
+                         '&lt;script&gt;<mark>alert</mark>(&quot;mundo&quot;)&lt;/script&gt; &amp; mundo')
+
+    def test_words_inside_markup(self):
+        source_string = models.SourceString.objects.create(value='Bold', project=self.translation_project)
+        models.TranslatedString.objects.create(key=source_string, value='Hola <b>negrita</b>',
+                                               translation=self.translation)
+
+        self.assertEqual(search_strings('negrita')[0].highlight, 'Hola &lt;b&gt;<mark>negrita</mark>&lt;/b&gt;')
+
+    def test_all_words_must_match(self):
+        self.assertEqual(self.values('hola mundo'), ['Hola mundo'])
+        self.assertEqual(self.values('hola cadena'), [])
+        self.assertEqual(self.values('   '), [])
+
+    def test_operators_are_searched_literally(self):
+        self.assertEqual(self.values('mundo OR cadena'), [])
+        self.assertEqual(self.values('"mundo'), ['Hola mundo'])
+
+    def test_ranking(self):
+        source_string = models.SourceString.objects.create(value='Hello hello', project=self.translation_project)
+        string = models.TranslatedString.objects.create(key=source_string, value='Hola hola hola, mundo',
+                                                        translation=self.translation)
+
+        strings = search_strings('hola')
+        self.assertEqual(strings, [string, self.translated_string1])
+        self.assertGreater(strings[0].rank, strings[1].rank)
+
+    def test_filters(self):
+        other_project = models.TranslationProject.objects.create(name='Other project', owner=self.owner)
+        other_translation = models.Translation.objects.create(project=other_project, language='es')
+        other_translation.import_strings({'Hello world': 'Hola mundo'})
+
+        self.assertEqual(len(search_strings('mundo')), 2)
+        self.assertEqual(search_strings('mundo', translation=self.translation), [self.translated_string1])
+        self.assertEqual(search_strings('mundo', project=self.translation_project.pk), [self.translated_string1])
+
+    def test_index_follows_changes(self):
+        self.translated_string1.value = 'Hola a todos'
+        self.translated_string1.save()
+        self.assertEqual(self.values('mundo'), [])
+        self.assertEqual(self.values('todos'), ['Hola a todos'])
+
+        self.translated_string1.delete()
+        self.assertEqual(self.values('todos'), [])
+
+    def test_index_follows_imports(self):
+        self.translation.import_strings({'Testing string': 'Cadena de prueba', 'New string': 'Cadena nueva'})
+
+        self.assertEqual(sorted(self.values('cadena')), ['Cadena de prueba', 'Cadena nueva'])
+        self.assertEqual(self.values('probando'), [])
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test translation
+--------------
+
+Tests for `django-rockpile` translation module.
+"""
+
+import gettext as gettext_module
+
+from django.test import TestCase, override_settings
+from django.utils import translation as django_translation
+
+from rockpile import catalog, models, translation
+from tests.test_models import FewStringsProjectMixin
+
+
+class TranslationLayerMixin(FewStringsProjectMixin):
+
+    def setUp(self):
+        catalog.get_cache().clear()
+        super(TranslationLayerMixin, self).setUp()
+        settings_override = override_settings(ROCKPILE_TRANSLATION_PROJECT=self.translation_project.pk)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class TestGettext(TranslationLayerMixin, TestCase):
+
+    def test_gettext(self):
+        with django_translation.override('es'):
+            self.assertEqual(translation.gettext('Hello world'), 'Hola mundo')
+            self.assertEqual(translation.gettext('Unknown string'), 'Unknown string')
+            self.assertEqual(translation.ngettext('Hello world', 'Testing string', 2), 'Probando cadena')
+
+        with django_translation.override('es-ar'):
+            self.assertEqual(translation.gettext('Hello world'), 'Hola mundo')
+
+        with django_translation.override('fr'):
+            self.assertEqual(translation.gettext('Hello world'), 'Hello world')
+
+    def test_gettext_lazy(self):
+        message = translation.gettext_lazy('Hello world')
+        with django_translation.override('es'):
+            self.assertEqual(u'%s' % message, 'Hola mundo')
+
+    def test_loaded_catalog_does_not_query(self):
+        with django_translation.override('es'):
+            translation.gettext('Hello world')
+            with self.assertNumQueries(0):
+                self.assertEqual(translation.gettext('Testing string'), 'Probando cadena')
+
+    def test_fallback(self):
+        translations = translation.RockpileTranslations('es')
+        fallback = gettext_module.NullTranslations()
+        fallback.gettext = fallback.ugettext = lambda message: message.upper()
+        translations.add_fallback(fallback)
+
+        self.assertEqual(translations.gettext('Hello world'), 'Hola mundo')
+        self.assertEqual(translations.gettext('Unknown string'), 'UNKNOWN STRING')
+
+    def test_untranslated_strings_are_missing(self):
+        self.translated_string1.value = ''
+        self.translated_string1.save()
+
+        self.assertEqual(translation.RockpileTranslations('es').gettext('Hello world'), 'Hello world')
+
+
+class TestCatalogCache(TranslationLayerMixin, TestCase):
+
+    def test_stale_catalog_is_served_while_reloading(self):
+        catalogs = translation.CatalogCache(check_interval=0)
+        self.assertEqual(catalogs.get(self.translation.pk)['Hello world'], 'Hola mundo')
+
+        self.translated_string1.value = 'Hola a todos'
+        self.translated_string1.save()
+        # The new catalog is built here, the thread only reads it from the shared cache
+        catalog.get_catalog(self.translation)
+
+        self.assertEqual(catalogs.get(self.translation.pk)['Hello world'], 'Hola mundo')
+        catalogs.reload_in_background(self.translation.pk).join()
+        self.assertEqual(catalogs.get(self.translation.pk)['Hello world'], 'Hola a todos')
+
+    def test_version_checks_are_rate_limited(self):
+        catalogs = translation.CatalogCache(check_interval=60)
+        catalogs.get(self.translation.pk)
+
+        self.translated_string1.value = 'Hola a todos'
+        self.translated_string1.save()
+
+        self.assertEqual(catalogs.get(self.translation.pk)['Hello world'], 'Hola mundo')
+        self.assertEqual(catalogs._reloading, {})
+
+    def test_least_recently_used_catalog_is_evicted(self):
+        other_translation = models.Translation.objects.create(project=self.translation_project, language='fr')
+        catalogs = translation.CatalogCache(max_size=1)
+
+        catalogs.get(self.translation.pk)
+        catalogs.get(other_translation.pk)
+        self.assertEqual(list(catalogs._entries), [other_translation.pk])
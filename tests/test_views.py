@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test views
+--------------
+
+Tests for `django-rockpile` API views.
+"""
+
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from rockpile import models
+from tests.test_models import FewStringsProjectMixin
+
+
+class TestTranslationViewSet(FewStringsProjectMixin, TestCase):
+
+    def test_list(self):
+        response = APIClient().get(reverse('translation-list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['percentage_completed'], 50.0)
+
+    def test_changes(self):
+        url = reverse('translation-changes', args=[self.translation.pk])
+
+        response = APIClient().get(url, {'since': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'revision': 2, 'reset': False, 'strings': {'Testing string': 'Probando cadena'}})
+
+        self.assertEqual(APIClient().get(url, {'since': 'last'}).status_code, 400)
+        self.assertEqual(APIClient().get(url, {'since': u'\u00b2'}).status_code, 400)
+        self.assertEqual(APIClient().get(url, {'since': -1}).status_code, 400)
+
+    def test_claim(self):
+        source_string = models.SourceString.objects.create(value='Third string', project=self.translation_project)
+        models.QueuedString.objects.enqueue(self.translation)
+        client = APIClient()
+        url = reverse('translation-claim', args=[self.translation.pk])
+
+        self.assertEqual(client.post(url).status_code, 403)
+
+        client.force_authenticate(self.user)
+        response = client.post(url, {'limit': 5}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(string['key'], string['key_value']) for string in response.data],
+                         [(source_string.pk, 'Third string')])
+
+        response = client.post(reverse('translation-release', args=[self.translation.pk]))
+        self.assertEqual(response.data, {'released': 1})
+
+        self.translation.translators.clear()
+        self.assertEqual(client.post(url).status_code, 403)
+
+
+class TestTranslatedStringViewSet(FewStringsProjectMixin, TestCase):
+
+    def setUp(self):
+        super(TestTranslatedStringViewSet, self).setUp()
+        self.client = APIClient()
+        self.url = reverse('translatedstring-list')
+
+    def test_keyset_pagination(self):
+        response = self.client.get(self.url, {'page_size': 1})
+        self.assertEqual([string['id'] for string in response.data['results']], [self.translated_string1.pk])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([string['id'] for string in response.data['results']], [self.translated_string2.pk])
+        self.assertIsNone(response.data['next'])
+
+    def test_page_query_count(self):
+        for i in range(10):
+            source_string = models.SourceString.objects.create(value='Key %d' % i, project=self.translation_project)
+            models.TranslatedString.objects.create(key=source_string, value='Value %d' % i, translation=self.translation,
+                                                   validated_by=self.translator)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'translation': self.translation.pk, 'category': 'validated'})
+
+        self.assertEqual(len(response.data['results']), 11)
+        self.assertEqual(response.data['results'][0]['key_value'], 'Hello world')
+        self.assertEqual(response.data['results'][0]['validated_by_username'], 'john')
+
+    def test_category_filters(self):
+        expected_values = {
+            'strings': [self.translated_string1.pk, self.translated_string2.pk],
+            'validated': [self.translated_string1.pk],
+            'not_validated': [self.translated_string2.pk],
+        }
+        for category, expected_value in expected_values.items():
+            response = self.client.get(self.url, {'translation': self.translation.pk, 'category': category})
+            self.assertEqual([string['id'] for string in response.data['results']], expected_value)
+
+    def test_category_requires_translation(self):
+        self.assertEqual(self.client.get(self.url, {'category': 'strings'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'translation': 1, 'category': 'unknown'}).status_code, 400)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'invalid'}).status_code, 404)
+
+    def test_validate(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse('translatedstring-validate'), {'ids': [self.translated_string2.pk]},
+                                    format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(response.data['translations'][0]['percentage_completed'], 100.0)
+
+        response = self.client.post(reverse('translatedstring-unvalidate'),
+                                    {'ids': [self.translated_string1.pk, self.translated_string2.pk]}, format='json')
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(response.data['translations'][0]['num_validated_strings'], 0)
+
+    def test_validate_requires_translator(self):
+        url = reverse('translatedstring-validate')
+        self.assertEqual(self.client.post(url, {'ids': [1]}, format='json').status_code, 403)
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.post(url, {'ids': []}, format='json').status_code, 400)
+
+        self.translator.delete()
+        self.assertEqual(self.client.post(url, {'ids': [1]}, format='json').status_code, 403)
+
+
+class TestSearchViewSet(FewStringsProjectMixin, TestCase):
+
+    def setUp(self):
+        super(TestSearchViewSet, self).setUp()
+        self.client = APIClient()
+        self.url = reverse('search-list')
+
+    def test_search(self):
+        response = self.client.get(self.url, {'q': 'cadena', 'project': self.translation_project.pk})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([string['id'] for string in response.data], [self.translated_string2.pk])
+        self.assertEqual(response.data[0]['key_value'], 'Testing string')
+        self.assertIn('highlight', response.data[0])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'q': 'cadena', 'translation': 'es'}).status_code, 400)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test writers
+--------------
+
+Tests for `django-rockpile` writers module.
+"""
+
+import gettext
+import struct
+from collections import OrderedDict
+from io import BytesIO
+
+from django.test import TestCase
+
+from rockpile.adapters import AndroidStrings
+from rockpile.writers import write_android_strings, write_mo, write_po
+from tests.test_models import FewStringsProjectMixin
+
+
+class TestWriters(FewStringsProjectMixin, TestCase):
+
+    def test_write_android_strings(self):
+        file_obj = BytesIO()
+        with self.assertNumQueries(1):
+            write_android_strings(self.translation, file_obj)
+
+        file_obj.seek(0)
+        expected_value = [('Hello world', 'Hola mundo'), ('Testing string', 'Probando cadena')]
+        self.assertEqual(list(AndroidStrings(file_obj).items()), expected_value)
+
+    def test_write_android_strings_from_adapter(self):
+        strings = OrderedDict([('app_name', u'Ñandú & <rockpile>'), ('empty', None)])
+        file_obj = BytesIO()
+        write_android_strings(strings, file_obj)
+
+        file_obj.seek(0)
+        self.assertEqual(list(AndroidStrings(file_obj).items()), [('app_name', u'Ñandú & <rockpile>'), ('empty', None)])
+
+    def test_write_po(self):
+        file_obj = BytesIO()
+        write_po(OrderedDict([('Hello "world"', u'Hola\nmundo')]), file_obj)
+
+        content = file_obj.getvalue().decode('utf-8')
+        self.assertTrue(content.startswith(u'msgid ""\nmsgstr "Content-Type: text/plain; charset=UTF-8\\n'))
+        self.assertTrue(content.endswith(u'msgid "Hello \\"world\\""\nmsgstr "Hola\\nmundo"\n\n'))
+
+    def test_write_mo(self):
+        file_obj = BytesIO()
+        write_mo(self.translation, file_obj)
+
+        file_obj.seek(0)
+        translations = gettext.GNUTranslations(file_obj)
+        self.assertEqual(translations.gettext('Hello world'), 'Hola mundo')
+        self.assertEqual(translations.gettext('Testing string'), 'Probando cadena')
+        self.assertEqual(translations.info()['language'], 'es')
+
+    def test_write_mo_sorts_msgids(self):
+        file_obj = BytesIO()
+        write_mo(OrderedDict([(u'zebra', u'cebra'), (u'Ñandú', u'ñandú'), (u'apple', u'manzana'), (u'Zoo', u'zoo')]),
+                 file_obj)
+
+        content = file_obj.getvalue()
+        num_strings, originals_offset = struct.unpack('<2I', content[8:16])
+        msgids = []
+        for index in range(num_strings):
+            length, offset = struct.unpack('<2I', content[originals_offset + 8 * index:originals_offset + 8 * index + 8])
+            msgids.append(content[offset:offset + length])
+        self.assertEqual(msgids, [b'', b'Zoo', b'apple', b'zebra', u'Ñandú'.encode('utf-8')])
+
+        translations = gettext.GNUTranslations(BytesIO(content))
+        self.assertEqual(translations.gettext('apple'), 'manzana')
+        self.assertEqual(translations.gettext('Zoo'), 'zoo')